@@ -0,0 +1,122 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib import animation
+from mpl_toolkits.mplot3d import Axes3D  # noqa: F401 (registers the 3d projection)
+import Calculations
+import Catalog
+
+# Output formats and the matplotlib movie writers that produce them
+VIDEO_WRITERS = {'.mp4': 'ffmpeg', '.gif': 'pillow'}
+
+
+def frame_indices(num_points, fps=30, duration=10.0):
+    """
+    Indices of the orbit points shown as frames when the orbit is played in duration seconds at fps.
+    Long orbits are decimated to fps * duration evenly spaced frames; short ones keep every point.
+    """
+    num_frames = int(min(num_points, max(2, round(fps * duration))))
+    return np.unique(np.linspace(0, num_points - 1, num_frames).round().astype(int))
+
+
+def _orbit_figure(positions, comet_name, figsize, dpi):
+    # Off-screen figure: a plain Figure with an Agg canvas never touches pyplot or a GUI backend
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111, projection='3d')
+    line, = ax.plot([], [], [], lw=2, color='blue', label='Orbit Path')
+    point, = ax.plot([], [], [], 'ro', label='Comet')
+
+    max_val = np.max(np.abs(positions)) * 1.1
+    ax.set_xlim(-max_val, max_val)
+    ax.set_ylim(-max_val, max_val)
+    ax.set_zlim(-max_val, max_val)
+    ax.set_xlabel('X (AU)')
+    ax.set_ylabel('Y (AU)')
+    ax.set_zlabel('Z (AU)')
+    ax.set_title(f"Orbit of {comet_name}")
+    ax.legend()
+
+    def draw(frame):
+        line.set_data(positions[:frame + 1, 0], positions[:frame + 1, 1])
+        line.set_3d_properties(positions[:frame + 1, 2])
+        point.set_data([positions[frame, 0]], [positions[frame, 1]])
+        point.set_3d_properties([positions[frame, 2]])
+
+    return fig, draw
+
+
+def export_animation(comet_name, output, fps=30, duration=10.0, num_points=1000, figsize=(8, 8), dpi=100,
+                     df=None):
+    """
+    Render the orbit animation of one comet off-screen.
+
+    Parameters:
+    - comet_name: Name of the comet (e.g., '1P/Halley')
+    - output: A .mp4 or .gif file, or a directory that receives a numbered PNG sequence
+    - fps: Frame rate of the output
+    - duration: Length of one orbit in the output (seconds); frames are decimated to fps * duration
+    - num_points: Number of points computed along the orbit
+    - figsize, dpi: Size of each frame
+    - df: CometCatalog (or DataFrame) containing comet data; the default catalog if None
+
+    Returns:
+    - output: The path that was written
+    """
+    catalog = Catalog.as_catalog(df)
+    e, q, i, w, Omega, TP = catalog.elements(comet_name)
+    positions = Calculations.cached_orbit_positions(e, q / (1 - e), i, w, Omega, TP, num_points)
+    if np.any(np.isnan(positions)) or np.any(np.isinf(positions)):
+        raise ValueError(f"Invalid positions calculated for {comet_name}: contains NaN or inf values")
+
+    fig, draw = _orbit_figure(positions, comet_name, figsize, dpi)
+    frames = frame_indices(len(positions), fps, duration)
+    extension = os.path.splitext(output)[1].lower()
+
+    if extension in VIDEO_WRITERS:
+        writer_name = VIDEO_WRITERS[extension]
+        if not animation.writers.is_available(writer_name):
+            raise RuntimeError(f"Cannot write {extension} files: the '{writer_name}' movie writer is not available")
+        writer = animation.writers[writer_name](fps=fps)
+        with writer.saving(fig, output, dpi):
+            for frame in frames:
+                draw(frame)
+                writer.grab_frame()
+    else:
+        os.makedirs(output, exist_ok=True)
+        for number, frame in enumerate(frames):
+            draw(frame)
+            fig.savefig(os.path.join(output, f"frame_{number:05d}.png"))
+
+    return output
+
+
+def _export_job(job):
+    comet_name, output, kwargs = job
+    return export_animation(comet_name, output, **kwargs)
+
+
+def export_catalog(comet_names, output_dir, fmt="mp4", workers=None, **kwargs):
+    """
+    Render orbit animations for many comets in parallel worker processes.
+
+    Parameters:
+    - comet_names: Names of the comets to render
+    - output_dir: Directory receiving one file (or PNG directory, for fmt='png') per comet
+    - fmt: 'mp4', 'gif' or 'png'
+    - workers: Number of worker processes (None uses one per CPU, 1 renders in this process)
+    - kwargs: Passed on to export_animation (fps, duration, num_points, figsize, dpi)
+
+    Returns:
+    - paths: Output path for each comet, in the order of comet_names
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    suffix = "" if fmt == "png" else "." + fmt
+    jobs = [(name, os.path.join(output_dir, Catalog.safe_filename(name) + suffix), kwargs) for name in comet_names]
+
+    if workers == 1:
+        return [_export_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_export_job, jobs))
@@ -0,0 +1,149 @@
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function (by Job.check_cancelled) once the job has been cancelled."""
+
+
+class Job:
+    """
+    A unit of background work. The job function receives the Job as its first argument and can call
+    report() to publish progress and check_cancelled() to stop early when the user cancels.
+    """
+
+    def __init__(self, key, func, args, kwargs, on_done, on_error, on_progress, results):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self._results = results
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def report(self, fraction, message=""):
+        """
+        Publish progress (fraction between 0 and 1); delivered to on_progress on the Tk thread.
+        """
+        self._results.put(("progress", self, (fraction, message)))
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+
+class BackgroundRunner:
+    """
+    Runs orbit computations on worker threads so Tk callbacks return immediately.
+
+    Results travel back through a queue that is drained on the Tk main thread by polling with
+    root.after, so every callback (on_done, on_error, on_progress) runs on the Tk thread and may touch
+    widgets. Submitting a job whose key is already queued or running returns the existing job instead of
+    starting a second one, which coalesces repeated clicks for the same comet.
+
+    An exception raised by one of those callbacks is passed to on_callback_error (printed if None) and
+    never stops the polling, so later jobs are still delivered.
+    """
+
+    def __init__(self, root, max_workers=2, poll_interval=50, on_callback_error=None):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.on_callback_error = on_callback_error
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._results = queue.Queue()
+        self._active = {}
+        self._polling = False
+
+    def submit(self, key, func, *args, on_done=None, on_error=None, on_progress=None, **kwargs):
+        """
+        Run func(job, *args, **kwargs) in the background and return the Job.
+        """
+        existing = self._active.get(key)
+        if existing is not None and not existing.cancelled:
+            return existing
+
+        job = Job(key, func, args, kwargs, on_done, on_error, on_progress, self._results)
+        self._active[key] = job
+        self._executor.submit(self._run, job)
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+        return job
+
+    def _run(self, job):
+        # Worker thread: never touch Tk here, only the queue
+        try:
+            job.check_cancelled()
+            result = job.func(job, *job.args, **job.kwargs)
+            job.check_cancelled()
+            self._results.put(("done", job, result))
+        except JobCancelled:
+            self._results.put(("cancelled", job, None))
+        except Exception as error:
+            self._results.put(("error", job, error))
+
+    def _deliver(self, callback, *args):
+        # Tk thread: a failing callback must not take the polling loop down with it
+        try:
+            callback(*args)
+        except Exception as error:
+            if self.on_callback_error is None:
+                traceback.print_exc()
+                return
+            try:
+                self.on_callback_error(error)
+            except Exception:
+                traceback.print_exc()
+
+    def _poll(self):
+        # Tk thread: deliver everything that arrived since the last poll
+        try:
+            while True:
+                try:
+                    kind, job, payload = self._results.get_nowait()
+                except queue.Empty:
+                    break
+
+                if kind == "progress":
+                    if job.on_progress is not None and not job.cancelled:
+                        self._deliver(job.on_progress, *payload)
+                    continue
+
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+                if kind == "done" and job.on_done is not None and not job.cancelled:
+                    self._deliver(job.on_done, payload)
+                elif kind == "error" and job.on_error is not None:
+                    self._deliver(job.on_error, payload)
+        finally:
+            if self._active or not self._results.empty():
+                self.root.after(self.poll_interval, self._poll)
+            else:
+                self._polling = False
+
+    def busy(self):
+        return bool(self._active)
+
+    def cancel(self, key=None, keep=()):
+        """
+        Cancel one job by key, or every active job whose key is not in keep if key is None. Cancelled jobs
+        report no result.
+        """
+        for job_key, job in list(self._active.items()):
+            if (key is None and job_key not in keep) or job_key == key:
+                job.cancel()
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
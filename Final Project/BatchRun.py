@@ -0,0 +1,141 @@
+"""
+Headless batch runs of the orbit pipeline.
+
+For every requested comet this computes the actual orbit, a guessed orbit (GuessOrbit.guess_orbit) and
+their comparison (GuessOrbit.compare_orbits) in a pool of worker processes, and writes one JSON object per
+comet (JSON Lines) with the elements, the element differences and the error metrics. Nothing here imports
+Tk or selects a GUI backend, so it runs unattended, e.g. from cron on a server.
+
+Usage:
+    python BatchRun.py 1P/Halley 2P/Encke                # two comets, results on stdout
+    python BatchRun.py --all --output results.jsonl      # the whole catalog
+    python BatchRun.py --all --save-positions positions  # also keep the position arrays (.npz per comet)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import Catalog
+import GuessOrbit
+import OrbitCache
+
+
+def process_comet(comet_name, catalog_path=Catalog.CSV_PATH, num_points=1000, perturbation=0.05, noise_level=0.01,
+                  mode='index', positions_dir=None, use_cache=True):
+    """
+    Guess and compare the orbit of one comet.
+
+    Parameters:
+    - comet_name: Name of the comet (e.g., '1P/Halley')
+    - catalog_path: CSV file of the catalog
+    - num_points, perturbation: See GuessOrbit.guess_orbit
+    - noise_level, mode: See GuessOrbit.compare_orbits
+    - positions_dir: Directory receiving <comet>.npz with the actual and guessed positions, if not None
+    - use_cache: Whether orbit tracks may be read from and written to the on-disk track cache
+
+    Returns:
+    - record: Dictionary ready for json.dumps; failures are reported under 'error' instead of raised
+    """
+    start = time.perf_counter()
+    record = {'name': comet_name}
+    # Without the disk cache, this comet's tracks go through a private memory-only cache
+    cache = None if use_cache else OrbitCache.OrbitCache(cache_dir=None)
+    try:
+        catalog = Catalog.load_catalog(catalog_path)
+        actual_positions, guess_positions, actual_params, guess_params = GuessOrbit.guess_orbit(
+            comet_name, catalog, num_points=num_points, perturbation=perturbation, cache=cache)
+        _, error_metrics = GuessOrbit.compare_orbits(actual_positions, guess_positions, noise_level, mode=mode)
+
+        record['actual_params'] = dict(zip(Catalog.ELEMENT_COLUMNS, map(float, actual_params)))
+        record['guess_params'] = dict(zip(Catalog.ELEMENT_COLUMNS, map(float, guess_params)))
+        record['param_diff'] = {name: float(guess - actual)
+                                for name, actual, guess in zip(Catalog.ELEMENT_COLUMNS, actual_params, guess_params)}
+        record['metrics'] = {name: float(value) for name, value in error_metrics.items()}
+
+        if positions_dir is not None:
+            path = os.path.join(positions_dir, Catalog.safe_filename(comet_name) + ".npz")
+            np.savez(path, actual_positions=actual_positions, guess_positions=guess_positions)
+            record['positions'] = path
+    except Exception as error:
+        record['error'] = f"{type(error).__name__}: {error}"
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+
+def _process_job(job):
+    comet_name, kwargs = job
+    return process_comet(comet_name, **kwargs)
+
+
+def run(comet_names, output, workers=None, **kwargs):
+    """
+    process_comet for many comets in worker processes, writing each record to output as one JSON line, in
+    the order of comet_names, as soon as it is ready.
+
+    Returns:
+    - failures: Number of comets whose record holds an error
+    """
+    if kwargs.get('positions_dir') is not None:
+        os.makedirs(kwargs['positions_dir'], exist_ok=True)
+    jobs = [(name, kwargs) for name in comet_names]
+
+    failures = 0
+    if workers == 1:
+        records = map(_process_job, jobs)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        records = pool.map(_process_job, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1))))
+    try:
+        for record in records:
+            failures += 'error' in record
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Guess and compare comet orbits in parallel, without any GUI.")
+    parser.add_argument("names", nargs="*", help="comet names (Object or Object_name)")
+    parser.add_argument("--all", action="store_true", help="process every comet in the catalog")
+    parser.add_argument("--catalog", default=Catalog.CSV_PATH, help="catalog CSV file")
+    parser.add_argument("--output", default="-", help="JSON Lines output file (default: stdout)")
+    parser.add_argument("--save-positions", metavar="DIR", help="save the position arrays as DIR/<comet>.npz")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: one per CPU)")
+    parser.add_argument("--num-points", type=int, default=1000, help="points per orbit (default 1000)")
+    parser.add_argument("--perturbation", type=float, default=0.05,
+                        help="fractional perturbation of the guessed elements (default 0.05)")
+    parser.add_argument("--noise-level", type=float, default=0.01, help="positional noise level in AU")
+    parser.add_argument("--mode", choices=["index", "geometric"], default="index", help="comparison mode")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the on-disk track cache")
+    args = parser.parse_args(argv)
+
+    if args.all:
+        names = [str(name) for name in Catalog.load_catalog(args.catalog)["Object"]]
+    elif args.names:
+        names = args.names
+    else:
+        parser.error("give comet names or --all")
+
+    kwargs = dict(catalog_path=args.catalog, num_points=args.num_points, perturbation=args.perturbation,
+                  noise_level=args.noise_level, mode=args.mode, positions_dir=args.save_positions,
+                  use_cache=not args.no_cache)
+    if args.output == "-":
+        failures = run(names, sys.stdout, args.workers, **kwargs)
+    else:
+        with open(args.output, "w") as output:
+            failures = run(names, output, args.workers, **kwargs)
+
+    if failures:
+        print(f"{failures} of {len(names)} comets failed", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Headless benchmark suite for the orbit pipeline.
+
+Runs sweeps over num_points, eccentricity and number of comets, records wall time, peak memory and
+Kepler solver iterations, and compares them with a stored baseline JSON. A case that is slower or needs
+more memory than the baseline by more than the tolerances fails the run (exit status 1).
+
+Timings only mean something on the machine that recorded them, so the baseline is not part of the
+repository: the first run on a machine (or any run with --update-baseline) stores its results as that
+machine's baseline, and later runs compare against it.
+
+Usage:
+    python Benchmark.py                    # full sweep, compare with (or create) benchmark_baseline.json
+    python Benchmark.py --quick            # smaller sweep for a fast check
+    python Benchmark.py --update-baseline  # store the current results as the new baseline
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Never open a window: force a non-interactive backend before anything imports pyplot
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+import Calculations
+import Catalog
+import GuessOrbit
+import OrbitCache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "benchmark_baseline.json")
+CSV_PATH = os.path.join(HERE, Catalog.CSV_PATH)
+
+# Halley's elements, used wherever a single representative comet is needed
+HALLEY = [0.9671429085, 0.5859781115, 162.2626906, 111.3324851, 58.42008098, 2446467.395]
+
+NUM_POINTS = [100, 1000, 10000, 100000, 1000000]
+ECCENTRICITIES = [0.0, 0.3, 0.6, 0.9, 0.967, 0.99, 0.999]
+NUM_COMETS = [1, 10, 160, 1000]
+QUICK_NUM_POINTS = [100, 1000, 10000]
+QUICK_NUM_COMETS = [1, 160]
+
+
+def measure(func, repeat=5, min_sample=0.02):
+    """
+    Best wall time per call (s) over repeat samples and peak traced memory (bytes) of one extra call.
+    Fast cases are called several times per sample, so every sample lasts at least min_sample seconds
+    and timer and scheduler noise stay small against it.
+    """
+    start = time.perf_counter()
+    func()
+    loops = max(1, int(min_sample / max(time.perf_counter() - start, 1e-9)))
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        times.append((time.perf_counter() - start) / loops)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def kepler_iterations(e, num_points):
+    M_vals = np.linspace(0, 2 * np.pi, num_points)
+    return Calculations.solve_kepler(M_vals, e, return_iterations=True)[1]
+
+
+def run_cases(quick=False):
+    """
+    Run every benchmark case and return {case name: {'time', 'peak_bytes'[, 'iterations']}}.
+    """
+    num_points_sweep = QUICK_NUM_POINTS if quick else NUM_POINTS
+    num_comets_sweep = QUICK_NUM_COMETS if quick else NUM_COMETS
+    e, q, i, w, Omega, TP = HALLEY
+    a = q / (1 - e)
+    results = {}
+
+    def record(name, func, **extra):
+        wall, peak = measure(func)
+        results[name] = {'time': wall, 'peak_bytes': peak, **extra}
+        print(f"{name:45s} {wall * 1e3:10.3f} ms {peak / 2 ** 20:10.2f} MiB "
+              + " ".join(f"{k}={v}" for k, v in extra.items()))
+
+    for n in num_points_sweep:
+        record(f"orbit_positions/num_points={n}", lambda: Calculations.orbit_positions(e, a, i, w, Omega, TP, n),
+               iterations=kepler_iterations(e, n))
+
+    for ecc in ECCENTRICITIES:
+        a_ecc = q / (1 - ecc)
+        record(f"orbit_positions/e={ecc}", lambda: Calculations.orbit_positions(ecc, a_ecc, i, w, Omega, TP, 10000),
+               iterations=kepler_iterations(ecc, 10000))
+
+    catalog = Catalog.CometCatalog.from_csv(CSV_PATH)
+    elements = np.array([catalog[k] for k in Catalog.ELEMENT_COLUMNS])
+    for count in num_comets_sweep:
+        batch = elements[:, np.arange(count) % elements.shape[1]]  # Repeat the catalog to reach larger counts
+        record(f"orbit_positions_batch/comets={count}", lambda: Calculations.orbit_positions_batch(*batch))
+
+    # guess_orbit goes through a track cache; benchmark the computation, not the cache
+    no_cache = OrbitCache.OrbitCache(max_entries=0, cache_dir=None)
+    for n in num_points_sweep:
+        record(f"guess_orbit/num_points={n}",
+               lambda: GuessOrbit.guess_orbit('1P/Halley', catalog, num_points=n, cache=no_cache))
+
+    for n in num_points_sweep:
+        actual, guess, _, _ = GuessOrbit.guess_orbit('1P/Halley', catalog, num_points=n, cache=no_cache)
+        record(f"compare_orbits/num_points={n}", lambda: GuessOrbit.compare_orbits(actual, guess))
+
+    record("catalog/from_csv", lambda: Catalog.CometCatalog.from_csv(CSV_PATH, use_cache=False))
+    record("catalog/from_npz_cache", lambda: Catalog.CometCatalog.from_csv(CSV_PATH))
+
+    return results
+
+
+def compare(results, baseline, tolerance, min_slowdown=2e-3, memory_tolerance=0.25, min_growth=2 ** 16):
+    """
+    Names of cases whose time exceeds the baseline by more than tolerance (fraction) and min_slowdown (s),
+    whose peak memory exceeds it by more than memory_tolerance (fraction) and min_growth (bytes), or whose
+    Kepler solver needs more iterations than it did for the baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        slower = result['time'] > base['time'] * (1 + tolerance) and result['time'] - base['time'] > min_slowdown
+        larger = ('peak_bytes' in base and result['peak_bytes'] > base['peak_bytes'] * (1 + memory_tolerance)
+                  and result['peak_bytes'] - base['peak_bytes'] > min_growth)
+        more_iterations = result.get('iterations', 0) > base.get('iterations', result.get('iterations', 0))
+        if slower or larger or more_iterations:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the orbit pipeline without opening any window.")
+    parser.add_argument("--quick", action="store_true", help="run a reduced sweep")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed fractional slowdown before a case fails (default 0.5 = 50%%)")
+    parser.add_argument("--min-slowdown", type=float, default=2e-3,
+                        help="slowdowns below this many seconds never fail a case (default 0.002)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25,
+                        help="allowed fractional growth of peak memory (default 0.25 = 25%%)")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_cases(quick=args.quick)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline for this machine written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.min_slowdown, args.memory_tolerance)
+    for name in regressions:
+        print(f"REGRESSION {name}: {results[name]['time'] * 1e3:.3f} ms, "
+              f"{results[name]['peak_bytes'] / 2 ** 20:.2f} MiB (baseline {baseline[name]['time'] * 1e3:.3f} ms, "
+              f"{baseline[name].get('peak_bytes', 0) / 2 ** 20:.2f} MiB), iterations "
+              f"{results[name].get('iterations', '-')} (baseline {baseline[name].get('iterations', '-')})")
+    if regressions:
+        return 1
+    print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,66 +1,449 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.optimize import newton
-from matplotlib.animation import FuncAnimation
-import pandas as pd
+import Catalog
+import Instrumentation
+import OrbitCache
 
 # Constants
 G = 1.32712440018e11  # Solar gravitational constant (km^3/s^2)
+AU_KM = 1.495978707e8  # Astronomical unit (km)
+SECONDS_PER_DAY = 86400.0
+GM_SUN = G / AU_KM ** 3 * SECONDS_PER_DAY ** 2  # Solar gravitational parameter (AU^3/day^2)
+
+# float32 keeps 24 significant bits, so rounding moves each coordinate by at most this fraction of its size
+FLOAT32_RELATIVE_ERROR = 2.0 ** -24
+
+
+def unpack_elements(e, q=None, i=None, w=None, Node=None, TP=None):
+    """
+    The element arrays (e, q, i, w, Node, TP). A structured array with Catalog.ELEMENT_DTYPE fields may be
+    passed as e alone; its fields are returned as views, without copying.
+    """
+    if getattr(getattr(e, 'dtype', None), 'names', None):
+        return tuple(e[name] for name in Catalog.ELEMENT_COLUMNS)
+    return e, q, i, w, Node, TP
+
+
+def compact_positions(positions):
+    """
+    positions stored as float32, halving their memory.
+
+    Every coordinate moves by at most FLOAT32_RELATIVE_ERROR (6e-8) times its own magnitude, so a position
+    at r AU is off by less than 1.1e-7 * r AU: about 16.5 km at 1 AU and under 580 km at 35 AU (Halley's
+    aphelion). Computations still run in float64; only storage is compact.
+
+    Returns:
+    - positions: float32 array of the same shape
+    - error_bound: Upper bound on the distance between any stored and exact position (AU)
+    """
+    positions = np.asarray(positions)
+    error_bound = float(np.sqrt(3) * FLOAT32_RELATIVE_ERROR * np.nanmax(np.abs(positions))) if positions.size else 0.0
+    return positions.astype(np.float32, copy=False), error_bound
 
 
 def kepler_eq(E, M, e):
     return E - e * np.sin(E) - M
 
 
+def solve_kepler(M, e, tol=1e-12, max_iter=50, return_iterations=False):
+    """
+    Solve Kepler's equation E - e*sin(E) = M for every mean anomaly at once.
+
+    Parameters:
+    - M: Mean anomaly or array of mean anomalies (radians)
+    - e: Eccentricity (0 <= e < 1), scalar or broadcastable against M
+    - tol: Convergence tolerance on the Newton step (radians)
+    - max_iter: Maximum number of Newton iterations
+    - return_iterations: Also return the number of Newton iterations used
+
+    Returns:
+    - E: Array of eccentric anomalies with the broadcast shape of M and e
+    - iterations: Number of iterations (only if return_iterations is True)
+    """
+    M = np.asarray(M, dtype=float)
+    e = np.asarray(e, dtype=float)
+
+    # Starting guess (Danby) that converges for every e < 1, including Halley-like comets
+    M_red = np.remainder(M + np.pi, 2 * np.pi) - np.pi
+    E = M_red + 0.85 * e * np.where(np.sin(M_red) >= 0, 1.0, -1.0)
+
+    # Per-point iteration counts, only kept while instrumentation is on
+    point_iterations = np.zeros(E.shape, dtype=int) if Instrumentation.enabled else None
+    converged = np.zeros(E.shape, dtype=bool)
+
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        delta = kepler_eq(E, M_red, e) / (1 - e * np.cos(E))
+        E = E - delta
+        if point_iterations is not None:
+            point_iterations += ~converged
+            converged |= np.abs(delta) < tol
+        if np.all(np.abs(delta) < tol):
+            break
+
+    if point_iterations is not None:
+        Instrumentation.record_iterations('solve_kepler', point_iterations, converged)
+
+    # Restore the full revolutions removed from M
+    E = E + (M - M_red)
+    if return_iterations:
+        return E, iterations
+    return E
+
+
 def true_anomaly(E, e):
     return 2 * np.arctan2(np.sqrt(1 + e) * np.sin(E / 2), np.sqrt(1 - e) * np.cos(E / 2))
 
 
-def orbit_positions(e, a, i, w, Omega, TP, num_points=1000):
+def perifocal_to_ecliptic(x_orb, y_orb, i, w, Omega):
+    """
+    Rotate orbital-plane coordinates into 3D space. Angles are in radians and broadcast against
+    the coordinates, so the same call handles one orbit or many.
+    """
+    cos_O, sin_O = np.cos(Omega), np.sin(Omega)
+    cos_w, sin_w = np.cos(w), np.sin(w)
+    cos_i, sin_i = np.cos(i), np.sin(i)
+
+    x = (cos_O * cos_w - sin_O * sin_w * cos_i) * x_orb + (-cos_O * sin_w - sin_O * cos_w * cos_i) * y_orb
+    y = (sin_O * cos_w + cos_O * sin_w * cos_i) * x_orb + (-sin_O * sin_w + cos_O * cos_w * cos_i) * y_orb
+    z = (sin_w * sin_i) * x_orb + (cos_w * sin_i) * y_orb
+    return np.stack([x, y, z], axis=-1)
+
+
+def orbit_positions(e, a, i, w, Omega, TP, num_points=1000, tol=1e-12, max_iter=50):
     i = np.radians(i)
     w = np.radians(w)
     Omega = np.radians(Omega)
 
     # Generate mean anomalies over one period
     M_vals = np.linspace(0, 2 * np.pi, num_points)
-    positions = []
 
-    for M in M_vals:
-        E = newton(kepler_eq, M, args=(M, e))
-        nu = true_anomaly(E, e)
-        r = a * (1 - e ** 2) / (1 + e * np.cos(nu))
+    # Solve Kepler's equation for the whole orbit in one vectorized pass
+    E = solve_kepler(M_vals, e, tol=tol, max_iter=max_iter)
+    nu = true_anomaly(E, e)
+    r = a * (1 - e ** 2) / (1 + e * np.cos(nu))
+
+    # Position in orbital plane
+    x_orb = r * np.cos(nu)
+    y_orb = r * np.sin(nu)
+
+    # Rotate to 3D space
+    return perifocal_to_ecliptic(x_orb, y_orb, i, w, Omega)
+
+
+def _chord_error(E, e, a, b, samples_per_segment=4):
+    # Largest distance between the ellipse and the polyline through the points at eccentric anomalies E.
+    # The ellipse is an affine image of a circle, so the arc point whose tangent is parallel to a chord,
+    # i.e. the farthest from it, sits exactly at the middle eccentric anomaly; that point is measured in
+    # closed form, and a few more per segment cover strongly curved arcs
+    start = np.stack([a * (np.cos(E[:-1]) - e), b * np.sin(E[:-1])], axis=-1)
+    end = np.stack([a * (np.cos(E[1:]) - e), b * np.sin(E[1:])], axis=-1)
+    fractions = np.append(np.arange(1, samples_per_segment + 1) / (samples_per_segment + 1), 0.5)
+    E_mid = E[:-1, None] + fractions * np.diff(E)[:, None]
+    mid = np.stack([a * (np.cos(E_mid) - e), b * np.sin(E_mid)], axis=-1)
+
+    chord = (end - start)[:, None, :]
+    t = np.sum((mid - start[:, None, :]) * chord, axis=-1) / np.maximum(np.sum(chord ** 2, axis=-1), 1e-300)
+    closest = start[:, None, :] + np.clip(t, 0, 1)[..., None] * chord
+    return np.max(np.linalg.norm(mid - closest, axis=-1))
+
+
+def adaptive_orbit_positions(e, a, i, w, Omega, TP, tolerance=1e-3, max_points=100000):
+    """
+    Sample an orbit with points placed by curvature instead of uniformly in mean anomaly.
+
+    A chord across an arc of length s with curvature k deviates from the arc by about k * s**2 / 8, so
+    the points are spread to give every segment the same integral of sqrt(k) ds. That packs points into
+    the perihelion passage and thins them out near aphelion, meeting the tolerance with few points.
+
+    Parameters:
+    - e, a, i, w, Omega, TP: Orbital elements as in orbit_positions
+    - tolerance: Target maximum distance between the true orbit and the sampled polyline (AU)
+    - max_points: Upper limit on the number of points
+
+    Returns:
+    - positions: Array of [x, y, z] positions starting and ending at perihelion
+    - achieved_error: Measured maximum distance between the orbit and the polyline (AU)
+    """
+    b = a * np.sqrt(1 - e ** 2)
+
+    # sqrt(curvature) * ds/dE of the ellipse, integrated on a fine grid of eccentric anomaly
+    E_fine = np.linspace(0, 2 * np.pi, 16385)
+    density = np.sqrt(a * b) / (a ** 2 * np.sin(E_fine) ** 2 + b ** 2 * np.cos(E_fine) ** 2) ** 0.25
+    cumulative = np.concatenate([[0], np.cumsum((density[1:] + density[:-1]) / 2 * np.diff(E_fine))])
+
+    target = tolerance
+    for _ in range(5):
+        num_segments = int(np.clip(np.ceil(cumulative[-1] / np.sqrt(8 * target)), 4, max_points - 1))
+        E = np.interp(np.linspace(0, cumulative[-1], num_segments + 1), cumulative, E_fine)
+        achieved_error = _chord_error(E, e, a, b)
+        if achieved_error <= tolerance or num_segments == max_points - 1:
+            break
+        # The error scales with the square of the segment length; aim slightly below the tolerance
+        target *= 0.9 * tolerance / achieved_error
+
+    x_orb = a * (np.cos(E) - e)
+    y_orb = b * np.sin(E)
+    positions = perifocal_to_ecliptic(x_orb, y_orb, np.radians(i), np.radians(w), np.radians(Omega))
+    return positions, achieved_error
+
+
+# Shared cache for orbit tracks, reused across button clicks and process restarts
+track_cache = OrbitCache.OrbitCache()
+
+
+def cached_orbit_positions(e, a, i, w, Omega, TP, num_points=1000, cache=None):
+    """
+    Same as orbit_positions, but served from cache (an OrbitCache.OrbitCache, track_cache if None) when this
+    orbit has been computed before. The returned array is read-only (a memory map when it comes from the
+    disk tier); copy it to modify it.
+    """
+    cache = track_cache if cache is None else cache
+    key = cache.make_key("orbit_positions", e, a, i, w, Omega, TP, num_points)
+    return cache.get_or_compute(key, lambda: orbit_positions(e, a, i, w, Omega, TP, num_points))
+
+
+def mean_motion(e, q):
+    """
+    Mean motion (radians/day) of an elliptic orbit with eccentricity e and perihelion distance q (AU).
+    """
+    a_km = np.asarray(q, dtype=float) / (1 - np.asarray(e, dtype=float)) * AU_KM
+    return np.sqrt(G / a_km ** 3) * SECONDS_PER_DAY
+
+
+def positions_at_mean_anomaly(M, e, q, i, w, Node, tol=1e-12, max_iter=50):
+    """
+    Heliocentric [x, y, z] positions (AU) at the given mean anomalies (radians). All arguments broadcast
+    against each other; angles are in degrees like the CSV columns. Returns an array of shape (..., 3).
+    """
+    e = np.asarray(e, dtype=float)
+    a = np.asarray(q, dtype=float) / (1 - e)
+
+    E = solve_kepler(M, e, tol=tol, max_iter=max_iter)
+    nu = true_anomaly(E, e)
+    r = a * (1 - e ** 2) / (1 + e * np.cos(nu))
+
+    return perifocal_to_ecliptic(r * np.cos(nu), r * np.sin(nu), np.radians(i), np.radians(w), np.radians(Node))
+
+
+def max_true_anomaly(e):
+    """
+    Largest true anomaly (radians) an orbit of eccentricity e reaches: pi for ellipses, just short of the
+    asymptote angle arccos(-1/e) for parabolas and hyperbolas.
+    """
+    e = np.asarray(e, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        limit = np.arccos(-1 / np.maximum(e, 1)) * (1 - 1e-6)
+    return np.where(e < 1, np.pi, limit)
+
+
+def conic_positions(nu, e, q, i, w, Node):
+    """
+    Heliocentric [x, y, z] positions (AU) at the given true anomalies for any conic (every e >= 0). All
+    arguments broadcast against each other; unlike positions_at_mean_anomaly, angles are in radians.
+    """
+    r = q * (1 + e) / (1 + e * np.cos(nu))
+    return perifocal_to_ecliptic(r * np.cos(nu), r * np.sin(nu), i, w, Node)
+
+
+def orbit_positions_batch(e, q=None, i=None, w=None, Node=None, TP=None, num_points=1000, chunk_size=None,
+                          max_chunk_bytes=256 * 2 ** 20, tol=1e-12, max_iter=50, dtype=np.float64):
+    """
+    Compute the orbits of many comets at once by broadcasting over comets and points.
+
+    Parameters:
+    - e, q, i, w, Node, TP: Arrays (length N) of orbital elements, in the same units as the CSV columns,
+      or a structured array of Catalog.ELEMENT_DTYPE records passed as e alone
+    - num_points: Number of points in each orbit
+    - chunk_size: Number of comets propagated per pass (derived from max_chunk_bytes if None)
+    - max_chunk_bytes: Rough memory budget for the temporaries of a single pass
+    - tol, max_iter: Kepler solver settings, see solve_kepler
+    - dtype: Storage type of the result; np.float32 halves it within the bound given in compact_positions
+
+    Returns:
+    - positions: Array of shape (N, num_points, 3) with [x, y, z] positions (AU)
+    """
+    e, q, i, w, Node, TP = (np.atleast_1d(np.asarray(x, dtype=float))
+                            for x in unpack_elements(e, q, i, w, Node, TP))
+    num_comets = len(e)
+
+    if chunk_size is None:
+        # About a dozen float64 temporaries of shape (chunk, num_points) are alive at once
+        chunk_size = max(1, int(max_chunk_bytes // (12 * 8 * num_points)))
+
+    M_vals = np.linspace(0, 2 * np.pi, num_points)
+    positions = np.empty((num_comets, num_points, 3), dtype=dtype)
+
+    for start in range(0, num_comets, chunk_size):
+        stop = min(start + chunk_size, num_comets)
+        # Elements become (chunk, 1) columns so they broadcast against the (num_points,) anomalies
+        chunk = slice(start, stop)
+        positions[chunk] = positions_at_mean_anomaly(M_vals, e[chunk, None], q[chunk, None], i[chunk, None],
+                                                     w[chunk, None], Node[chunk, None], tol=tol, max_iter=max_iter)
+
+    return positions
+
+
+def ephemeris(jd, e, q=None, i=None, w=None, Node=None, TP=None, tol=1e-12, max_iter=50, dtype=np.float64):
+    """
+    Heliocentric positions of one or many comets at the given epochs.
+
+    Parameters:
+    - jd: Julian date or array of Julian dates (length T)
+    - e, q, i, w, Node, TP: Orbital elements of one comet (scalars) or N comets (arrays), or
+      Catalog.ELEMENT_DTYPE records passed as e alone
+    - tol, max_iter: Kepler solver settings, see solve_kepler
+    - dtype: Storage type of the result, see orbit_positions_batch
+
+    Returns:
+    - positions: Array of shape (T, 3) for a single comet or (N, T, 3) for N comets (AU)
+    """
+    jd = np.atleast_1d(np.asarray(jd, dtype=float))
+    single = np.ndim(e) == 0
+    e, q, i, w, Node, TP = unpack_elements(e, q, i, w, Node, TP)
+
+    e, q, i, w, Node, TP = (np.atleast_1d(np.asarray(x, dtype=float))[:, None] for x in (e, q, i, w, Node, TP))
+
+    # Mean anomaly of every comet at every epoch, measured from the time of perihelion
+    M = mean_motion(e, q) * (jd - TP)
+    M = np.remainder(M, 2 * np.pi)
+
+    positions = positions_at_mean_anomaly(M, e, q, i, w, Node, tol=tol, max_iter=max_iter).astype(dtype, copy=False)
+    return positions[0] if single else positions
+
+
+def stumpff(z):
+    """
+    Stumpff functions C(z) and S(z) for any real z (elliptic z > 0, parabolic z = 0, hyperbolic z < 0).
+    """
+    z = np.asarray(z, dtype=float)
+    small = np.abs(z) < 1e-3
+    # Evaluate each branch on safe arguments so np.where never sees warnings from the unused branch
+    s_pos = np.sqrt(np.where(z > 0, z, 1.0))
+    s_neg = np.sqrt(np.where(z < 0, -z, 1.0))
+    z_safe = np.where(small, 1.0, z)
+
+    C = np.where(z > 0, (1 - np.cos(s_pos)) / z_safe, (np.cosh(s_neg) - 1) / -z_safe)
+    S = np.where(z > 0, (s_pos - np.sin(s_pos)) / s_pos ** 3, (np.sinh(s_neg) - s_neg) / s_neg ** 3)
+
+    # Series near z = 0, where the closed forms lose all precision
+    C = np.where(small, 1 / 2 - z / 24 + z ** 2 / 720 - z ** 3 / 40320, C)
+    S = np.where(small, 1 / 6 - z / 120 + z ** 2 / 5040 - z ** 3 / 362880, S)
+    return C, S
+
+
+def universal_ephemeris(jd, e, q=None, i=None, w=None, Node=None, TP=None, tol=1e-12, max_iter=50,
+                        return_velocity=False):
+    """
+    Heliocentric positions at the given epochs for elliptic, parabolic and hyperbolic orbits alike.
+
+    Uses the universal-variable formulation of Kepler's problem, starting from perihelion, so one code
+    path covers every e >= 0 and batches may mix orbit types freely. The universal Kepler equation is
+    solved with a Laguerre-Conway iteration, started from the parabolic solution or, for hyperbolas far
+    from perihelion, from the hyperbolic anomaly. Entries that do not converge within max_iter come back
+    as NaN.
+
+    Parameters:
+    - jd: Julian date or array of Julian dates (length T)
+    - e, q, i, w, Node, TP: Orbital elements of one comet (scalars) or N comets (arrays), or
+      Catalog.ELEMENT_DTYPE records passed as e alone
+    - tol, max_iter: Convergence tolerance and iteration cap for the universal anomaly
+    - return_velocity: Also return the heliocentric velocities
+
+    Returns:
+    - positions: Array of shape (T, 3) for a single comet or (N, T, 3) for N comets (AU)
+    - velocities: Array of the same shape (AU/day), only if return_velocity is True
+    """
+    jd = np.atleast_1d(np.asarray(jd, dtype=float))
+    single = np.ndim(e) == 0
+    e, q, i, w, Node, TP = unpack_elements(e, q, i, w, Node, TP)
+
+    e, q, i, w, Node, TP = (np.atleast_1d(np.asarray(x, dtype=float))[:, None] for x in (e, q, i, w, Node, TP))
+
+    mu = GM_SUN
+    sqrt_mu = np.sqrt(mu)
+    alpha = (1 - e) / q  # 1/a: positive for ellipses, zero for parabolas, negative for hyperbolas
+    v0 = np.sqrt(mu * (1 + e) / q)  # Speed at perihelion
+    dt = jd - TP
+
+    # Ellipses repeat: fold the time into the revolution around the nearest perihelion
+    elliptic = alpha > 0
+    period = 2 * np.pi / np.sqrt(mu * np.where(elliptic, alpha, 1.0) ** 3)
+    dt = np.where(elliptic, dt - period * np.round(dt / period), dt)
+
+    def residual(chi):
+        # Universal Kepler equation F(chi) = 0 with its first two derivatives
+        z = alpha * chi ** 2
+        C, S = stumpff(z)
+        F = (1 - alpha * q) * chi ** 3 * S + q * chi - sqrt_mu * dt
+        dF = (1 - alpha * q) * chi ** 2 * C + q  # Equals the radius r
+        ddF = (1 - alpha * q) * chi * (1 - z * S)
+        return F, dF, ddF
+
+    # Starting value: the exact parabolic solution of chi^3 / 6 + q * chi = sqrt(mu) * dt (Cardano)
+    half = 3 * sqrt_mu * dt
+    root = np.sqrt(half ** 2 + (2 * q) ** 3)
+    chi = np.cbrt(half + root) + np.cbrt(half - root)
+
+    hyperbolic = alpha < 0
+    if np.any(hyperbolic):
+        # Far from perihelion the parabolic root is hopeless for hyperbolas; start from the hyperbolic
+        # anomaly H of e*sinh(H) - H = M (Danby's guess), chi = H * sqrt(-a), wherever that fits better
+        scale = np.sqrt(np.where(hyperbolic, -alpha, 1.0))
+        M = np.sqrt(mu) * scale ** 3 * dt
+        chi_h = np.sign(M) * np.log(2 * np.abs(M) / e + 1.8) / scale
+        with np.errstate(over='ignore', invalid='ignore'):
+            better = hyperbolic & (np.abs(residual(chi_h)[0]) < np.abs(residual(chi)[0]))
+        chi = np.where(better, chi_h, chi)
+
+    point_iterations = np.zeros(chi.shape, dtype=int) if Instrumentation.enabled else None
+    converged = np.zeros(chi.shape, dtype=bool)
+
+    n = 5  # Laguerre-Conway order
+    with np.errstate(over='ignore', invalid='ignore'):
+        for _ in range(max_iter):
+            F, dF, ddF = residual(chi)
+            discriminant = np.sqrt(np.abs((n - 1) ** 2 * dF ** 2 - n * (n - 1) * F * ddF))
+            delta = n * F / (dF + np.where(dF >= 0, 1.0, -1.0) * discriminant)
+            chi = chi - delta
+            if point_iterations is not None:
+                point_iterations += ~converged
+            converged |= np.abs(delta) <= tol * (1 + np.abs(chi))
+            if np.all(converged):
+                break
 
-        # Position in orbital plane
-        x_orb = r * np.cos(nu)
-        y_orb = r * np.sin(nu)
-        z_orb = 0
+    if point_iterations is not None:
+        Instrumentation.record_iterations('universal_ephemeris', point_iterations, converged)
+    chi = np.where(converged, chi, np.nan)  # Never hand back an unconverged anomaly as a position
 
-        # Rotate to 3D space
-        x = r * (np.cos(Omega) * np.cos(w + nu) - np.sin(Omega) * np.sin(w + nu) * np.cos(i))
-        y = r * (np.sin(Omega) * np.cos(w + nu) + np.cos(Omega) * np.sin(w + nu) * np.cos(i))
-        z = r * (np.sin(w + nu) * np.sin(i))
-        positions.append([x, y, z])
+    # Lagrange coefficients from perihelion, where position and velocity are perpendicular
+    z = alpha * chi ** 2
+    C, S = stumpff(z)
+    f = 1 - chi ** 2 / q * C
+    g = dt - chi ** 3 * S / sqrt_mu
 
-    return np.array(positions)
+    i, w, Node = np.radians(i), np.radians(w), np.radians(Node)
+    positions = perifocal_to_ecliptic(f * q, g * v0, i, w, Node)
+    if not return_velocity:
+        return positions[0] if single else positions
 
+    r = (1 - alpha * q) * chi ** 2 * C + q
+    f_dot = sqrt_mu / (r * q) * chi * (z * S - 1)
+    g_dot = 1 - chi ** 2 / r * C
+    velocities = perifocal_to_ecliptic(f_dot * q, g_dot * v0, i, w, Node)
+    return (positions[0], velocities[0]) if single else (positions, velocities)
 
-def animate(cometName):
-    df = pd.read_csv("near-earth-comets.csv")
-    comet_row = df[(df["Object"].str.lower() == cometName.lower()) |
-                   (df["Object_name"].str.lower() == cometName.lower())]
 
-    if comet_row.empty:
-        raise ValueError(f"No comet found with name {cometName}")
+def animate(cometName, positions=None):
+    # Plotting modules are imported on first use to keep startup light
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
 
-    e = comet_row["e"].values[0]
-    a = comet_row["q"].values[0] / (1 - e)  # Compute semi-major axis from perihelion distance
-    i = comet_row["i"].values[0]
-    w = comet_row["w"].values[0]
-    Omega = comet_row["Node"].values[0]
-    TP = comet_row["TP"].values[0]
-    num_points = 1000
+    if positions is None:
+        e, q, i, w, Omega, TP = Catalog.load_catalog().elements(cometName)
+        a = q / (1 - e)  # Compute semi-major axis from perihelion distance
+        num_points = 1000
 
-    positions = orbit_positions(e, a, i, w, Omega, TP, num_points)
+        positions = cached_orbit_positions(e, a, i, w, Omega, TP, num_points)
 
     # Animation setup
     fig = plt.figure()
@@ -0,0 +1,170 @@
+import os
+import numpy as np
+
+CSV_PATH = "near-earth-comets.csv"
+
+# Column layout of near-earth-comets.csv
+COLUMNS = ["Object", "Epoch", "TP", "e", "i", "w", "Node", "q", "Q", "P", "MOID", "A1", "A2", "A3", "DT",
+           "ref", "Object_name"]
+TEXT_COLUMNS = ["Object", "ref", "Object_name"]
+NUMERIC_COLUMNS = [c for c in COLUMNS if c not in TEXT_COLUMNS]
+ELEMENT_COLUMNS = ["e", "q", "i", "w", "Node", "TP"]
+
+# The Epoch column (osculation epoch of the elements) is a Modified Julian Date; add this for a Julian date
+MJD_OFFSET = 2400000.5
+
+# One record of orbital elements; arrays of these can be passed to the Calculations entry points directly
+ELEMENT_DTYPE = np.dtype([(name, np.float64) for name in ELEMENT_COLUMNS])
+
+
+class CometCatalog:
+    """
+    Comet table held as typed NumPy arrays (one per column) with a case-insensitive name index.
+
+    Lookups by either the Object or Object_name column are O(1) dict hits instead of a scan over the
+    whole DataFrame. Numeric columns are float64 arrays (missing values are NaN) and text columns are
+    unicode arrays. The orbital elements live in one structured array (element_table, ELEMENT_DTYPE) and
+    their columns are views into it, so both forms share the same memory.
+    """
+
+    def __init__(self, columns):
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        self.element_table = np.empty(len(self.columns["Object"]), dtype=ELEMENT_DTYPE)
+        for name in ELEMENT_COLUMNS:
+            self.element_table[name] = self.columns[name]
+            self.columns[name] = self.element_table[name]
+        self._index = {}
+        for row, (obj, obj_name) in enumerate(zip(self.columns["Object"], self.columns["Object_name"])):
+            # First occurrence wins, matching the first row the old DataFrame filters returned
+            self._index.setdefault(str(obj).lower(), row)
+            self._index.setdefault(str(obj_name).lower(), row)
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Build a catalog from a DataFrame with the CSV columns (numbers may be stored as strings).
+        """
+        import pandas as pd
+
+        columns = {}
+        for name in COLUMNS:
+            if name in TEXT_COLUMNS:
+                columns[name] = df[name].fillna("").astype(str).to_numpy().astype(str)
+            else:
+                columns[name] = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+        return cls(columns)
+
+    @classmethod
+    def from_csv(cls, path=CSV_PATH, use_cache=True):
+        """
+        Load the catalog from a CSV file. When use_cache is set, a binary .npz sidecar next to the CSV is
+        reused as long as the CSV has not changed, so later startups skip CSV parsing.
+        """
+        cache_path = os.path.splitext(path)[0] + ".npz"
+        stat = os.stat(path)
+        stamp = np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+        if use_cache and os.path.exists(cache_path):
+            try:
+                with np.load(cache_path, allow_pickle=False) as cached:
+                    if np.array_equal(cached["_source_stamp"], stamp):
+                        return cls({name: cached[name] for name in COLUMNS})
+            except (OSError, KeyError, ValueError):
+                pass  # Unreadable or stale cache, fall back to the CSV
+
+        import pandas as pd
+
+        catalog = cls.from_frame(pd.read_csv(path))
+
+        if use_cache:
+            tmp_path = cache_path + ".tmp.npz"
+            try:
+                np.savez(tmp_path, _source_stamp=stamp, **catalog.columns)
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                pass  # Read-only location, the catalog still works without the sidecar
+        return catalog
+
+    @classmethod
+    def from_store(cls, path):
+        """
+        Load the catalog from a binary store written by Ingest.ingest. Where several rows share an Object
+        name the last one ingested wins, so re-ingested comets replace their older elements. Without such
+        duplicates the non-element numeric columns stay memory-mapped.
+        """
+        import Ingest
+
+        columns = Ingest.read_store(path)
+        rows = Ingest.latest_rows(columns)
+        if len(rows) < len(columns["Object"]):
+            columns = {name: values[rows] for name, values in columns.items()}
+        return cls(columns)
+
+    def __len__(self):
+        return len(self.columns["Object"])
+
+    def __contains__(self, name):
+        return str(name).strip().lower() in self._index
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def find(self, name):
+        """
+        Row number of the comet called name (Object or Object_name, any case), or None if it is unknown.
+        """
+        return self._index.get(str(name).strip().lower())
+
+    def lookup(self, name):
+        """
+        Row number of the comet called name. Raises ValueError if there is no such comet.
+        """
+        row = self.find(name)
+        if row is None:
+            raise ValueError(f"No comet found with name {name}")
+        return row
+
+    def elements(self, name):
+        """
+        Orbital elements [e, q, i, w, Omega, TP] of the comet called name as floats.
+        """
+        row = self.lookup(name)
+        return [float(self.columns[column][row]) for column in ELEMENT_COLUMNS]
+
+    def to_frame(self):
+        """
+        The catalog as a pandas DataFrame with the original CSV column order.
+        """
+        import pandas as pd
+
+        return pd.DataFrame({name: self.columns[name] for name in COLUMNS})
+
+
+def safe_filename(comet_name):
+    """
+    comet_name with every character other than letters, digits, '-', '_' and '.' replaced by '_'.
+    """
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in comet_name)
+
+
+_catalogs = {}
+
+
+def as_catalog(df=None):
+    """
+    A CometCatalog for df: the default catalog if None, df itself if it already is one, otherwise the
+    DataFrame converted with CometCatalog.from_frame.
+    """
+    if df is None:
+        return load_catalog()
+    return df if isinstance(df, CometCatalog) else CometCatalog.from_frame(df)
+
+
+def load_catalog(path=CSV_PATH):
+    """
+    Return the catalog for path, loading it only the first time it is requested in this process.
+    """
+    key = os.path.abspath(path)
+    if key not in _catalogs:
+        _catalogs[key] = CometCatalog.from_csv(path)
+    return _catalogs[key]
@@ -0,0 +1,227 @@
+import re
+import tkinter as tk
+import numpy as np
+import Catalog
+
+# One clause of a filter expression, e.g. "q < 1", "MOID<=0.05" or "Object == 1P/Halley"
+_CLAUSE = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>|=)\s*(.+?)\s*$")
+_SEPARATORS = re.compile(r"\s+and\s+|&|,", re.IGNORECASE)
+
+_COMPARISONS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '=': np.equal,
+    '!=': np.not_equal,
+}
+
+
+def filter_mask(catalog, expression):
+    """
+    Boolean mask over the catalog rows matching a filter expression.
+
+    The expression is one or more clauses "column op value" joined by "and", "&" or ",", for example
+    "q < 1 and MOID < 0.05". Numeric columns support <, <=, >, >=, == and !=; text columns support ==
+    and != (case-insensitive). An empty expression matches every row. Raises ValueError for clauses that
+    cannot be parsed.
+    """
+    mask = np.ones(len(catalog), dtype=bool)
+    for clause in _SEPARATORS.split(expression.strip()):
+        if not clause.strip():
+            continue
+        match = _CLAUSE.match(clause)
+        if match is None:
+            raise ValueError(f"Cannot parse filter clause '{clause.strip()}'")
+        column, op, value = match.groups()
+        if column not in catalog.columns:
+            raise ValueError(f"Unknown column '{column}'")
+
+        values = catalog[column]
+        if column in Catalog.TEXT_COLUMNS:
+            if op not in ('==', '=', '!='):
+                raise ValueError(f"Text column '{column}' only supports == and !=")
+            values = np.char.lower(values.astype(str))
+            value = value.strip("'\"").lower()
+        else:
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"'{value}' is not a number (column '{column}')")
+        # NaN compares False for every operator, so missing values never match
+        mask &= _COMPARISONS[op](values, value)
+    return mask
+
+
+def sort_rows(catalog, rows, column, descending=False):
+    """
+    rows (an array of row numbers) reordered by column. The sort is stable and missing numbers go last.
+    """
+    values = catalog[column][rows]
+    if column in Catalog.TEXT_COLUMNS:
+        order = np.argsort(np.char.lower(values.astype(str)), kind='stable')
+        return rows[order[::-1]] if descending else rows[order]
+
+    missing = np.isnan(values)
+    keys = -values if descending else values
+    order = np.lexsort((keys, missing))
+    return rows[order]
+
+
+class CatalogTable(tk.Frame):
+    """
+    Read-only table over a CometCatalog that draws only the rows currently visible.
+
+    The rows shown are kept as an array of row numbers into the catalog's typed column arrays, so
+    filtering and sorting are vectorized NumPy operations and scrolling costs the same for 160 rows or
+    a million. Click a column heading to sort by it (click again to reverse), type a filter expression
+    such as "q < 1 and MOID < 0.05" above the table, and click a row to select a comet.
+    """
+
+    def __init__(self, parent, catalog, columns=None, row_height=22, column_width=110, on_select=None,
+                 bg='#808080', fg='white', header_bg='#a68b8f', **kwargs):
+        super().__init__(parent, **kwargs)
+        self.catalog = catalog
+        self.columns = list(columns) if columns is not None else list(Catalog.COLUMNS)
+        self.row_height = row_height
+        self.column_width = column_width
+        self.on_select = on_select
+        self.bg, self.fg, self.header_bg = bg, fg, header_bg
+
+        self.rows = np.arange(len(catalog))
+        self.top = 0
+        self.sort_column = None
+        self.descending = False
+        self.selected = None
+
+        # Filter bar
+        bar = tk.Frame(self)
+        bar.pack(side="top", fill="x")
+        tk.Label(bar, text="Filter:").pack(side="left", padx=5)
+        self.filter_text = tk.Entry(bar, width=40)
+        self.filter_text.pack(side="left", padx=5)
+        self.filter_text.bind('<Return>', self._on_filter)
+        tk.Button(bar, text="Apply", command=self._on_filter).pack(side="left", padx=5)
+        self.count_label = tk.Label(bar, text="")
+        self.count_label.pack(side="left", padx=10)
+
+        # Header and body canvases share horizontal scrolling; vertical scrolling is virtual
+        width = self.column_width * len(self.columns)
+        grid = tk.Frame(self)
+        grid.pack(side="top", fill="both", expand=True)
+        self.header = tk.Canvas(grid, height=self.row_height, bg=self.header_bg, highlightthickness=0,
+                                scrollregion=(0, 0, width, self.row_height))
+        self.body = tk.Canvas(grid, bg=self.bg, highlightthickness=0, scrollregion=(0, 0, width, 1))
+        self.scroll_y = tk.Scrollbar(grid, orient="vertical", command=self._on_yview)
+        self.scroll_x = tk.Scrollbar(grid, orient="horizontal", command=self._on_xview)
+        self.body.configure(xscrollcommand=self.scroll_x.set)
+
+        self.header.grid(row=0, column=0, sticky="ew")
+        self.body.grid(row=1, column=0, sticky="nsew")
+        self.scroll_y.grid(row=1, column=1, sticky="ns")
+        self.scroll_x.grid(row=2, column=0, sticky="ew")
+        grid.rowconfigure(1, weight=1)
+        grid.columnconfigure(0, weight=1)
+
+        self.body.bind('<Configure>', lambda event: self.redraw())
+        self.body.bind('<MouseWheel>', self._on_wheel)
+        self.body.bind('<Button-4>', lambda event: self.scroll_rows(-3))
+        self.body.bind('<Button-5>', lambda event: self.scroll_rows(3))
+        self.body.bind('<Button-1>', self._on_click)
+        self.header.bind('<Button-1>', self._on_header_click)
+
+        self._draw_header()
+        self.redraw()
+
+    def visible_count(self):
+        return max(1, self.body.winfo_height() // self.row_height + 1)
+
+    def _format(self, column, row):
+        value = self.catalog[column][row]
+        if column in Catalog.TEXT_COLUMNS:
+            return str(value)
+        return "" if np.isnan(value) else f"{value:.10g}"
+
+    def _draw_header(self):
+        self.header.delete("all")
+        for k, column in enumerate(self.columns):
+            label = column
+            if column == self.sort_column:
+                label += " ▼" if self.descending else " ▲"
+            x = k * self.column_width
+            self.header.create_rectangle(x, 0, x + self.column_width, self.row_height, outline=self.bg)
+            self.header.create_text(x + 4, self.row_height / 2, text=label, anchor="w", fill=self.fg)
+
+    def redraw(self):
+        """
+        Draw the rows currently in view; nothing outside the window is ever created on the canvas.
+        """
+        self.body.delete("all")
+        count = self.visible_count()
+        self.top = int(np.clip(self.top, 0, max(0, len(self.rows) - count + 1)))
+
+        for offset, row in enumerate(self.rows[self.top:self.top + count]):
+            y = offset * self.row_height
+            if row == self.selected:
+                self.body.create_rectangle(0, y, self.column_width * len(self.columns), y + self.row_height,
+                                           fill=self.header_bg, outline="")
+            for k, column in enumerate(self.columns):
+                self.body.create_text(k * self.column_width + 4, y + self.row_height / 2,
+                                      text=self._format(column, row), anchor="w", fill=self.fg)
+
+        total = max(len(self.rows), 1)
+        self.scroll_y.set(self.top / total, min(1.0, (self.top + count) / total))
+        self.count_label.config(text=f"{len(self.rows)} of {len(self.catalog)} comets")
+
+    def scroll_rows(self, delta):
+        self.top += delta
+        self.redraw()
+
+    def _on_yview(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            step = self.visible_count() - 1 if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.redraw()
+
+    def _on_xview(self, *args):
+        self.body.xview(*args)
+        self.header.xview(*args)
+
+    def _on_wheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    def _on_click(self, event):
+        position = self.top + int(event.y // self.row_height)
+        if 0 <= position < len(self.rows):
+            self.selected = self.rows[position]
+            self.redraw()
+            if self.on_select is not None:
+                self.on_select(int(self.selected))
+
+    def _on_header_click(self, event):
+        k = int(self.header.canvasx(event.x) // self.column_width)
+        if 0 <= k < len(self.columns):
+            column = self.columns[k]
+            self.descending = (not self.descending) if column == self.sort_column else False
+            self.sort_column = column
+            self.rows = sort_rows(self.catalog, self.rows, column, self.descending)
+            self.top = 0
+            self._draw_header()
+            self.redraw()
+
+    def _on_filter(self, event=None):
+        try:
+            mask = filter_mask(self.catalog, self.filter_text.get())
+        except ValueError as error:
+            self.count_label.config(text=str(error))
+            return "break"
+        rows = np.nonzero(mask)[0]
+        if self.sort_column is not None:
+            rows = sort_rows(self.catalog, rows, self.sort_column, self.descending)
+        self.rows = rows
+        self.top = 0
+        self.redraw()
+        return "break"  # Keep Return from also triggering the window-wide shortcut
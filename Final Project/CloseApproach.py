@@ -0,0 +1,95 @@
+from collections import namedtuple
+import numpy as np
+import Calculations
+import Catalog
+
+# Circular stand-in for Earth's orbit: radius 1 AU in the ecliptic, sidereal year, J2000 mean longitude
+EARTH_PERIOD = 365.256363004  # days
+EARTH_LONGITUDE_J2000 = 100.46457166  # degrees
+J2000 = 2451545.0
+
+CloseApproach = namedtuple("CloseApproach", ["index", "name", "jd", "distance"])
+
+
+def earth_position(jd):
+    """
+    Heliocentric [x, y, z] position (AU) of Earth on a circular orbit at the given Julian dates.
+    """
+    jd = np.asarray(jd, dtype=float)
+    longitude = np.radians(EARTH_LONGITUDE_J2000) + 2 * np.pi * (jd - J2000) / EARTH_PERIOD
+    return np.stack([np.cos(longitude), np.sin(longitude), np.zeros_like(longitude)], axis=-1)
+
+
+def _earth_distance(jd, elements):
+    # Comet-Earth distance for matching arrays of epochs and element columns (all the same shape)
+    M = np.remainder(Calculations.mean_motion(elements[0], elements[1]) * (jd - elements[5]), 2 * np.pi)
+    comet = Calculations.positions_at_mean_anomaly(M, *elements[:5])
+    return np.linalg.norm(comet - earth_position(jd), axis=-1)
+
+
+def close_approaches(start_jd, end_jd, threshold, df=None, step=1.0, chunk_days=3650.0, refine_iter=60):
+    """
+    Find every close approach of the catalog comets to Earth between two dates.
+
+    The time span is walked in chunks of chunk_days. In each chunk the distances of all comets are
+    evaluated on a grid with the given step, local minima are bracketed between neighbouring samples and
+    then refined together with a golden-section search. Results are yielded as they are found, so memory
+    use does not grow with the length of the span.
+
+    Parameters:
+    - start_jd, end_jd: Julian dates bounding the search
+    - threshold: Report approaches closer than this distance (AU)
+    - df: CometCatalog (or DataFrame) containing comet data; the default catalog if None
+    - step: Sampling step (days); must be short compared with the time a comet spends near Earth
+    - chunk_days: Length of the time window evaluated at once
+    - refine_iter: Number of golden-section iterations
+
+    Yields:
+    - CloseApproach(index, name, jd, distance) tuples in chronological order within each chunk
+    """
+    catalog = Catalog.as_catalog(df)
+    elements = [catalog[k] for k in Catalog.ELEMENT_COLUMNS]
+    names = catalog['Object']
+    steps_per_chunk = max(1, int(chunk_days // step))
+    golden = (np.sqrt(5) - 1) / 2
+
+    chunk_start = start_jd
+    while chunk_start < end_jd:
+        num_steps = min(steps_per_chunk, int(np.ceil((end_jd - chunk_start) / step)))
+        # One extra sample on each side so minima at the chunk edges can still be bracketed
+        times = chunk_start + step * np.arange(-1, num_steps + 1)
+        comet = Calculations.ephemeris(times, *elements)
+        distance = np.linalg.norm(comet - earth_position(times), axis=-1)
+
+        interior = distance[:, 1:-1]
+        is_min = (interior < distance[:, :-2]) & (interior <= distance[:, 2:])
+        comet_idx, time_idx = np.nonzero(is_min)
+        time_idx = time_idx + 1
+
+        # Only keep minima that belong to this chunk; the threshold is applied after refinement
+        in_chunk = (times[time_idx] >= chunk_start) & (times[time_idx] < end_jd)
+        comet_idx, time_idx = comet_idx[in_chunk], time_idx[in_chunk]
+
+        if len(comet_idx):
+            cand = [x[comet_idx] for x in elements]
+            lo = times[time_idx - 1]
+            hi = times[time_idx + 1]
+            x1 = hi - golden * (hi - lo)
+            x2 = lo + golden * (hi - lo)
+            f1 = _earth_distance(x1, cand)
+            f2 = _earth_distance(x2, cand)
+            for _ in range(refine_iter):
+                # Keep the sub-interval that holds the smaller interior value, reuse one interior point
+                left = f1 < f2
+                hi, lo = np.where(left, x2, hi), np.where(left, lo, x1)
+                x1, x2 = np.where(left, hi - golden * (hi - lo), x2), np.where(left, x1, lo + golden * (hi - lo))
+                f_new = _earth_distance(np.where(left, x1, x2), cand)
+                f1, f2 = np.where(left, f_new, f2), np.where(left, f1, f_new)
+            jd_min = (lo + hi) / 2
+            d_min = _earth_distance(jd_min, cand)
+
+            hits = np.nonzero(d_min < threshold)[0]
+            for k in hits[np.argsort(jd_min[hits], kind="stable")]:
+                yield CloseApproach(int(comet_idx[k]), str(names[comet_idx[k]]), float(jd_min[k]), float(d_min[k]))
+
+        chunk_start += num_steps * step
@@ -0,0 +1,173 @@
+import json
+import os
+import numpy as np
+import Calculations
+import Catalog
+
+HEADER_VERSION = 1
+
+
+def header_path(path):
+    return path + ".json"
+
+
+def _write_header(path, header):
+    # Replace the header atomically so an interrupted export never leaves it half written
+    tmp_path = header_path(path) + ".tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(header, file, indent=1)
+    os.replace(tmp_path, header_path(path))
+
+
+def _read_header(path):
+    with open(header_path(path)) as file:
+        return json.load(file)
+
+
+def export_ephemeris(path, start_jd, end_jd, step=1 / 24, df=None, names=None, chunk_size=None,
+                     max_chunk_bytes=64 * 2 ** 20, progress=None, dtype=np.float64):
+    """
+    Write an ephemeris table for many comets straight to a memory-mapped .npy file.
+
+    The file holds an array of shape (comet, time, xyz) in AU and is preallocated on disk; positions
+    are computed one time chunk at a time with Calculations.universal_ephemeris and written into place, so
+    memory use stays bounded by the chunk size however long the table is. A JSON header next to the file
+    (path + ".json") records the elements of every comet, the time grid and how many chunks are complete.
+    Calling export_ephemeris again with the same arguments after an interruption resumes after the last
+    completed chunk; a finished export is returned as is.
+
+    Parameters:
+    - path: Output .npy file
+    - start_jd, end_jd: First and last Julian date (end_jd is included if it falls on the grid)
+    - step: Spacing of the time grid (days); hourly by default
+    - df: CometCatalog (or DataFrame) containing comet data; the default catalog if None
+    - names: Comets to export; every comet in the catalog if None
+    - chunk_size: Number of epochs computed per chunk (derived from max_chunk_bytes if None)
+    - max_chunk_bytes: Rough memory budget for the temporaries of a single chunk
+    - progress: Optional function progress(fraction) called after every chunk
+    - dtype: Storage type; np.float32 halves the file, within the error bound given in
+      Calculations.compact_positions (positions are still computed in float64)
+
+    Returns:
+    - table: An EphemerisTable opened read-only on the finished file
+    """
+    catalog = Catalog.as_catalog(df)
+    rows = np.arange(len(catalog)) if names is None else np.array([catalog.lookup(name) for name in names], dtype=int)
+
+    num_comets = len(rows)
+    num_times = int(np.floor((end_jd - start_jd) / step + 1e-9)) + 1
+    if chunk_size is None:
+        # About a dozen float64 temporaries of shape (comets, chunk) are alive at once
+        chunk_size = max(1, int(max_chunk_bytes // (12 * 8 * max(num_comets, 1))))
+    num_chunks = -(-num_times // chunk_size)
+
+    elements = {column: catalog[column][rows].tolist() for column in Catalog.ELEMENT_COLUMNS}
+    header = {
+        'version': HEADER_VERSION,
+        'names': [str(name) for name in catalog["Object"][rows]],
+        'elements': elements,
+        'start_jd': float(start_jd),
+        'step': float(step),
+        'num_times': num_times,
+        'shape': [num_comets, num_times, 3],
+        'dtype': np.dtype(dtype).name,
+        'chunk_size': chunk_size,
+        'chunks_done': 0,
+        'complete': False,
+    }
+
+    saved = _read_header(path) if os.path.exists(path) and os.path.exists(header_path(path)) else None
+    progress_keys = ('chunks_done', 'complete')
+    if saved is not None and all(saved.get(key) == header[key] for key in header if key not in progress_keys):
+        header = saved
+        positions = np.lib.format.open_memmap(path, mode='r+')
+    else:
+        positions = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(num_comets, num_times, 3))
+        _write_header(path, header)
+
+    element_arrays = [np.asarray(elements[column], dtype=float) for column in Catalog.ELEMENT_COLUMNS]
+    for chunk in range(header['chunks_done'], num_chunks):
+        start = chunk * chunk_size
+        stop = min(start + chunk_size, num_times)
+        jd = start_jd + step * np.arange(start, stop)
+        positions[:, start:stop] = Calculations.universal_ephemeris(jd, *element_arrays)
+        # Data reaches the disk before the header claims it is there
+        positions.flush()
+        header['chunks_done'] = chunk + 1
+        _write_header(path, header)
+        if progress is not None:
+            progress((chunk + 1) / num_chunks)
+
+    header['complete'] = True
+    _write_header(path, header)
+    del positions
+    return EphemerisTable(path)
+
+
+class EphemerisTable:
+    """
+    Read-only view of an exported ephemeris table.
+
+    The positions stay memory-mapped, so slicing one comet or one time window only reads those pages from
+    disk. Index by comet name or row number, then by time, e.g. table.window('1P/Halley', jd0, jd1).
+    """
+
+    def __init__(self, path, allow_partial=False):
+        self.path = path
+        self.header = _read_header(path)
+        if not self.header['complete'] and not allow_partial:
+            raise ValueError(f"Ephemeris export {path} is incomplete; run export_ephemeris again to finish it")
+        self.positions = np.load(path, mmap_mode='r')
+        self.names = self.header['names']
+        self.start_jd = self.header['start_jd']
+        self.step = self.header['step']
+        self._rows = {name.lower(): row for row, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def jd(self):
+        return self.start_jd + self.step * np.arange(self.header['num_times'])
+
+    def elements(self, comet):
+        """
+        Orbital elements (e, q, i, w, Node, TP) the table was computed from.
+        """
+        row = self.row(comet)
+        return [self.header['elements'][column][row] for column in Catalog.ELEMENT_COLUMNS]
+
+    def row(self, comet):
+        """
+        Row number of a comet given by name or row number. Raises ValueError for unknown names.
+        """
+        if isinstance(comet, (int, np.integer)):
+            return int(comet)
+        row = self._rows.get(comet.strip().lower())
+        if row is None:
+            raise ValueError(f"No comet found with name {comet}")
+        return row
+
+    def time_slice(self, start_jd=None, end_jd=None):
+        """
+        Slice of the time axis covering start_jd <= jd <= end_jd (either end open if None).
+        """
+        num_times = self.header['num_times']
+        start = 0 if start_jd is None else int(np.ceil((start_jd - self.start_jd) / self.step - 1e-9))
+        stop = num_times if end_jd is None else int(np.floor((end_jd - self.start_jd) / self.step + 1e-9)) + 1
+        return slice(min(max(start, 0), num_times), min(max(stop, 0), num_times))
+
+    def window(self, comet=None, start_jd=None, end_jd=None):
+        """
+        Positions of one comet (shape (T, 3)), or of every comet if comet is None (shape (N, T, 3)), between
+        start_jd and end_jd. The result is a memory-mapped view; copy it with np.array to keep it.
+
+        Returns:
+        - jd: Array of the Julian dates in the window
+        - positions: Positions at those dates (AU)
+        """
+        times = self.time_slice(start_jd, end_jd)
+        jd = self.start_jd + self.step * np.arange(times.start, times.stop)
+        if comet is None:
+            return jd, self.positions[:, times]
+        return jd, self.positions[self.row(comet), times]
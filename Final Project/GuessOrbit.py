@@ -1,24 +1,31 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.optimize import newton
-from matplotlib.animation import FuncAnimation
-import pandas as pd
-import matplotlib
 import Calculations
+import Catalog
+import Instrumentation
 
-# Set Matplotlib backend to TkAgg for compatibility with tkinter
-matplotlib.use('TkAgg')
 G = 1.32712440018e11
 
-def guess_orbit(comet_name, df, num_points=1000, perturbation=0.05):
+
+def _use_gui_backend():
+    # Set Matplotlib backend to TkAgg for compatibility with tkinter when a window is about to be shown,
+    # unless a backend was chosen explicitly (e.g. MPLBACKEND=Agg for headless runs)
+    import matplotlib
+
+    if "MPLBACKEND" not in os.environ:
+        matplotlib.use('TkAgg')
+
+def guess_orbit(comet_name, df, num_points=1000, perturbation=0.05, cache=None):
     """
     Generate an estimated (guessed) orbit by perturbing orbital elements and compare to actual orbit.
 
     Parameters:
     - comet_name: Name of the comet (e.g., '1P/Halley')
-    - df: DataFrame containing comet data
+    - df: CometCatalog (or DataFrame) containing comet data
     - num_points: Number of points in the orbit
     - perturbation: Fractional perturbation for orbital elements (e.g., 0.05 for ±5%)
+    - cache: OrbitCache.OrbitCache for both tracks; Calculations.track_cache if None
 
     Returns:
     - actual_positions: Array of [x, y, z] positions for the actual orbit
@@ -27,36 +34,28 @@ def guess_orbit(comet_name, df, num_points=1000, perturbation=0.05):
     - guess_params: Guessed orbital elements [e, q, i, w, Omega, TP]
     """
     # Find comet data
-    comet_row = df[(df["Object"].str.lower() == comet_name.lower()) |
-                   (df["Object_name"].str.lower() == comet_name.lower())]
-    if comet_row.empty:
-        raise ValueError(f"No comet found with name {comet_name}")
-
-    # Extract actual orbital elements
-    try:
-        e = float(comet_row["e"].values[0])
-        q = float(comet_row["q"].values[0])
-        i = float(comet_row["i"].values[0])
-        w = float(comet_row["w"].values[0])
-        Omega = float(comet_row["Node"].values[0])
-        TP = float(comet_row["TP"].values[0])
-    except (ValueError, TypeError) as e:
-        raise ValueError(f"Invalid data for comet {comet_name}: {str(e)}")
+    with Instrumentation.stage('catalog_lookup'):
+        catalog = Catalog.as_catalog(df)
+        e, q, i, w, Omega, TP = catalog.elements(comet_name)
+    if not np.all(np.isfinite([e, q, i, w, Omega, TP])):
+        raise ValueError(f"Invalid data for comet {comet_name}: missing orbital elements")
 
     actual_params = [e, q, i, w, Omega, TP]
     a = q / (1 - e)  # Semi-major axis
 
     # Generate actual orbit positions
-    actual_positions = Calculations.orbit_positions(e, a, i, w, Omega, TP, num_points)
+    with Instrumentation.stage('propagation'):
+        actual_positions = Calculations.cached_orbit_positions(e, a, i, w, Omega, TP, num_points, cache)
 
     # Perturb orbital elements for the guess
-    np.random.seed(42)  # For reproducibility
-    e_guess = e * (1 + np.random.uniform(-perturbation, perturbation))
-    q_guess = q * (1 + np.random.uniform(-perturbation, perturbation))
-    i_guess = i * (1 + np.random.uniform(-perturbation, perturbation))
-    w_guess = w * (1 + np.random.uniform(-perturbation, perturbation))
-    Omega_guess = Omega * (1 + np.random.uniform(-perturbation, perturbation))
-    TP_guess = TP + np.random.uniform(-10, 10)  # Perturb TP by ±10 days
+    # A private generator with the old global seed: same guesses, and safe on concurrent worker threads
+    rng = np.random.RandomState(42)
+    e_guess = e * (1 + rng.uniform(-perturbation, perturbation))
+    q_guess = q * (1 + rng.uniform(-perturbation, perturbation))
+    i_guess = i * (1 + rng.uniform(-perturbation, perturbation))
+    w_guess = w * (1 + rng.uniform(-perturbation, perturbation))
+    Omega_guess = Omega * (1 + rng.uniform(-perturbation, perturbation))
+    TP_guess = TP + rng.uniform(-10, 10)  # Perturb TP by ±10 days
     guess_params = [e_guess, q_guess, i_guess, w_guess, Omega_guess, TP_guess]
     a_guess = q_guess / (1 - e_guess)
 
@@ -66,12 +65,101 @@ def guess_orbit(comet_name, df, num_points=1000, perturbation=0.05):
     a_guess = max(a_guess, 0.01)  # Ensure positive semi-major axis
 
     # Generate guessed orbit positions
-    guess_positions = Calculations.orbit_positions(e_guess, a_guess, i_guess, w_guess, Omega_guess, TP_guess, num_points)
+    with Instrumentation.stage('propagation'):
+        guess_positions = Calculations.cached_orbit_positions(e_guess, a_guess, i_guess, w_guess, Omega_guess, TP_guess,
+                                                              num_points, cache)
 
     return actual_positions, guess_positions, actual_params, guess_params
 
 
-def compare_orbits(actual_positions, guess_positions, noise_level=0.01):
+def _track_segments(tracks):
+    # Start vertex, direction and inverse squared length of every segment of the closed tracks (S, P, 3),
+    # computed once per track instead of once per measured point
+    direction = np.roll(tracks, -1, axis=1) - tracks
+    length2 = np.einsum('...i,...i->...', direction, direction)
+    inverse = 1 / np.where(length2 > 0, length2, 1.0)
+    return tracks.reshape(-1, 3), direction.reshape(-1, 3), inverse.ravel()
+
+
+def _nearest_segment_distance(points, segments, nearest, num_vertices):
+    # Distance from points (Q, 3) to the segments on both sides of their nearest vertices, given as (Q, k)
+    # indices into segments, which stacks closed tracks of num_vertices vertices each
+    start, direction, inverse = segments
+    first = np.tile(nearest - nearest % num_vertices, 2)
+    index = np.concatenate([nearest - 1, nearest], axis=1)
+    index = first + (index - first) % num_vertices
+    offset = points[:, None, :] - start[index]
+    direction = direction[index]
+    t = np.clip(np.einsum('...i,...i->...', offset, direction) * inverse[index], 0, 1)
+    offset -= t[..., None] * direction
+    return np.sqrt(np.einsum('...i,...i->...', offset, offset).min(axis=1))
+
+
+def _pair_distance(points, tracks, owner, neighbours=4, chunk_size=2 ** 14):
+    """
+    Distance from each point to the closed polyline through its own track.
+
+    One KD-tree over the vertices of all tracks finds the nearest vertices of every point in one query;
+    an extra coordinate, spaced further apart between tracks than any point is from its own track, keeps
+    each point among the vertices of its owner. The distance is then measured to the segments on both
+    sides of those vertices, in one vectorized pass.
+
+    Parameters:
+    - points: Array of shape (Q, 3)
+    - tracks: Array of shape (S, P, 3) with S tracks of P points
+    - owner: Array of Q track numbers, the track each point is measured against
+    - neighbours: Nearest vertices whose segments are measured
+    - chunk_size: Points measured per pass, keeping the temporaries small
+
+    Returns:
+    - distance: Array of shape (Q,)
+    """
+    from scipy.spatial import cKDTree
+
+    num_tracks, num_vertices = tracks.shape[:2]
+    k = min(neighbours, num_vertices)
+    vertices = tracks.reshape(-1, 3)
+    if num_tracks > 1:
+        spacing = 4 * max(np.abs(vertices).max(), np.abs(points).max(initial=0)) + 1
+        tree = cKDTree(np.column_stack([vertices, np.repeat(np.arange(num_tracks) * spacing, num_vertices)]),
+                       balanced_tree=False)
+        _, nearest = tree.query(np.column_stack([points, owner * spacing]), k=k, workers=-1)
+    else:
+        _, nearest = cKDTree(vertices).query(points, k=k, workers=-1)
+    nearest = nearest.reshape(len(points), k)
+
+    segments = _track_segments(tracks)
+    distance = np.empty(len(points))
+    for first in range(0, len(points), chunk_size):
+        rows = slice(first, first + chunk_size)
+        distance[rows] = _nearest_segment_distance(points[rows], segments, nearest[rows], num_vertices)
+    return distance
+
+
+def _track_distance(points, tracks):
+    # Distance from every point (Q, 3) to every track (S, P, 3), as an (S, Q) array
+    owner = np.repeat(np.arange(len(tracks)), len(points))
+    return _pair_distance(np.tile(points, (len(tracks), 1)), tracks, owner).reshape(len(tracks), len(points))
+
+
+def _max_track_distance(points, tracks, step=16):
+    # Largest distance from the points (Q, 3) to each track (S, P, 3) without measuring every pair: the
+    # distance to a track changes by at most the distance between two points, so every step-th point is
+    # measured first and only the points whose bound from those could still exceed the maximum follow
+    sample = np.arange(0, len(points), step)
+    measured = _track_distance(points[sample], tracks)
+    largest = measured.max(axis=1)
+
+    below = np.arange(len(points)) // step
+    above = (below + 1) % len(sample)
+    bound = np.minimum(measured[:, below] + np.linalg.norm(points - points[sample[below]], axis=1),
+                       measured[:, above] + np.linalg.norm(points - points[sample[above]], axis=1))
+    track, point = np.nonzero(bound > largest[:, None])
+    np.maximum.at(largest, track, _pair_distance(points[point], tracks, track))
+    return largest
+
+
+def compare_orbits(actual_positions, guess_positions, noise_level=0.01, mode='index'):
     """
     Compare actual and guessed orbits and perform error analysis.
 
@@ -79,11 +167,30 @@ def compare_orbits(actual_positions, guess_positions, noise_level=0.01):
     - actual_positions: Array of [x, y, z] positions for actual orbit
     - guess_positions: Array of [x, y, z] positions for guessed orbit
     - noise_level: Assumed standard deviation of positional errors (AU)
+    - mode: 'index' compares the two arrays point by point, so both must be sampled at the same times.
+      'geometric' compares the shapes of the closed tracks and ignores phase and sampling: it measures
+      each guessed point's distance to the actual track (and the reverse for the Hausdorff distance), so
+      the tracks may have different numbers of points
 
     Returns:
-    - residuals: Array of position differences
+    - residuals: Array of position differences ('index'), or of distances from each guessed point to the
+      actual track ('geometric')
     - error_metrics: Dictionary with mean residual, std residual, chi-squared, reduced chi-squared
+      ('index'), or with the mean nearest distance and the Hausdorff distance ('geometric')
     """
+    with Instrumentation.stage('comparison'):
+        return _compare_orbits(actual_positions, guess_positions, noise_level, mode)
+
+
+def _compare_orbits(actual_positions, guess_positions, noise_level, mode):
+    if mode == 'geometric':
+        metrics = compare_orbits_batch(actual_positions, np.asarray(guess_positions)[None], noise_level, mode,
+                                       return_distances=True)
+        residuals = metrics.pop('distances')[0]
+        return residuals, {name: value[0] for name, value in metrics.items()}
+    if mode != 'index':
+        raise ValueError(f"Unknown comparison mode '{mode}'")
+
     residuals = guess_positions - actual_positions
     mean_residual = np.mean(np.abs(residuals))
     std_residual = np.std(residuals)
@@ -101,6 +208,367 @@ def compare_orbits(actual_positions, guess_positions, noise_level=0.01):
     return residuals, error_metrics
 
 
+def compare_orbits_batch(actual_positions, guess_positions, noise_level=0.01, mode='index', return_distances=False):
+    """
+    Vectorized compare_orbits for many guessed orbits against one actual orbit.
+
+    Parameters:
+    - actual_positions: Array of shape (num_points, 3) for the actual orbit
+    - guess_positions: Array of shape (num_guesses, num_points, 3) of guessed orbits; in 'geometric' mode
+      the guesses may have a different num_points from the actual orbit
+    - noise_level: Assumed standard deviation of positional errors (AU)
+    - mode: 'index' or 'geometric', see compare_orbits
+    - return_distances: In 'geometric' mode, also return the (num_guesses, num_points) distances from each
+      guessed point to the actual track under 'distances'
+
+    Returns:
+    - error_metrics: Dictionary with the compare_orbits metrics as arrays of length num_guesses
+    """
+    if mode == 'geometric':
+        actual_positions = np.asarray(actual_positions, dtype=float)
+        guess_positions = np.asarray(guess_positions, dtype=float)
+        num_guesses, num_points = guess_positions.shape[:2]
+
+        # All guessed points against the actual track in one query, then the actual points against all
+        # guessed tracks in another, where only the largest distance per guess is needed
+        forward = _track_distance(guess_positions.reshape(-1, 3), actual_positions[None])
+        forward = forward.reshape(num_guesses, num_points)
+        backward = _max_track_distance(actual_positions, guess_positions)
+
+        metrics = {
+            'mean_distance': forward.mean(axis=1),
+            'hausdorff': np.maximum(forward.max(axis=1), backward)
+        }
+        if return_distances:
+            metrics['distances'] = forward
+        return metrics
+    if mode != 'index':
+        raise ValueError(f"Unknown comparison mode '{mode}'")
+
+    residuals = guess_positions - actual_positions
+    flat = residuals.reshape(len(residuals), -1)
+    chi_squared = np.sum((flat / noise_level) ** 2, axis=1)
+    degrees_of_freedom = flat.shape[1] - 6  # 6 parameters
+
+    return {
+        'mean_residual': np.mean(np.abs(flat), axis=1),
+        'std_residual': np.std(flat, axis=1),
+        'chi_squared': chi_squared,
+        'reduced_chi_squared': chi_squared / degrees_of_freedom
+    }
+
+
+def perturb_elements(params, num_samples, perturbation=0.05, rng=None):
+    """
+    Draw perturbed element sets the same way guess_orbit does, as arrays.
+
+    Parameters:
+    - params: Actual orbital elements [e, q, i, w, Omega, TP]
+    - num_samples: Number of element sets to draw
+    - perturbation: Fractional perturbation for orbital elements (e.g., 0.05 for ±5%)
+    - rng: numpy.random.Generator to draw from (a fresh unseeded one if None)
+
+    Returns:
+    - guess_params: Array of shape (num_samples, 6) with columns [e, q, i, w, Omega, TP]
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    scale = 1 + rng.uniform(-perturbation, perturbation, size=(num_samples, 5))
+    guess_params = np.empty((num_samples, 6))
+    guess_params[:, :5] = np.asarray(params[:5], dtype=float) * scale
+    guess_params[:, 5] = params[5] + rng.uniform(-10, 10, size=num_samples)  # Perturb TP by ±10 days
+
+    # Ensure valid parameters
+    guess_params[:, 0] = np.clip(guess_params[:, 0], 0, 0.999)  # Keep eccentricity < 1
+    guess_params[:, 1] = np.maximum(guess_params[:, 1], 0.01)  # Ensure positive perihelion distance
+    return guess_params
+
+
+def _ensemble_chunk(actual_params, actual_positions, num_samples, perturbation, noise_level, seed_seq):
+    # One unit of ensemble work; module level so it can run in a worker process
+    rng = np.random.default_rng(seed_seq)
+    guess_params = perturb_elements(actual_params, num_samples, perturbation, rng)
+    with Instrumentation.stage('propagation'):
+        guess_positions = Calculations.orbit_positions_batch(*guess_params.T, num_points=len(actual_positions))
+    with Instrumentation.stage('comparison'):
+        error_metrics = compare_orbits_batch(actual_positions, guess_positions, noise_level)
+    return guess_params, guess_positions, error_metrics
+
+
+def guess_orbit_ensemble(comet_name, df, num_samples=1000, num_points=1000, perturbation=0.05, noise_level=0.01,
+                         percentiles=(5, 50, 95), seed=None, chunk_size=100, workers=None):
+    """
+    Monte Carlo version of guess_orbit: propagate many perturbed element sets and summarize the spread.
+
+    Parameters:
+    - comet_name: Name of the comet (e.g., '1P/Halley')
+    - df: CometCatalog (or DataFrame) containing comet data
+    - num_samples: Number of perturbed element sets
+    - num_points: Number of points in each orbit
+    - perturbation: Fractional perturbation for orbital elements (e.g., 0.05 for ±5%)
+    - noise_level: Assumed standard deviation of positional errors (AU), see compare_orbits
+    - percentiles: Percentiles reported for the per-point bands
+    - seed: Seed for reproducible runs (any value accepted by numpy.random.SeedSequence)
+    - chunk_size: Number of element sets propagated together in one vectorized pass
+    - workers: Number of worker processes (None or 1 runs everything in this process)
+
+    Returns:
+    - results: Dictionary with
+        'actual_positions': Array of shape (num_points, 3)
+        'actual_params': Actual orbital elements [e, q, i, w, Omega, TP]
+        'guess_params': Array of shape (num_samples, 6)
+        'position_bands': Array of shape (len(percentiles), num_points, 3) of per-point coordinate percentiles
+        'distance_bands': Array of shape (len(percentiles), num_points) of per-point distance-to-actual percentiles
+        'error_metrics': Dictionary of compare_orbits metrics as arrays of length num_samples
+    """
+    with Instrumentation.stage('catalog_lookup'):
+        catalog = Catalog.as_catalog(df)
+        actual_params = catalog.elements(comet_name)
+    e, q, i, w, Omega, TP = actual_params
+    with Instrumentation.stage('propagation'):
+        actual_positions = np.asarray(Calculations.cached_orbit_positions(e, q / (1 - e), i, w, Omega, TP, num_points))
+
+    # Every chunk gets its own child seed, so results do not depend on how chunks are spread over workers
+    sizes = [min(chunk_size, num_samples - start) for start in range(0, num_samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(actual_params, actual_positions, size, perturbation, noise_level, seed_seq)
+            for size, seed_seq in zip(sizes, seeds)]
+
+    if workers is not None and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_ensemble_chunk, *zip(*jobs)))
+    else:
+        chunks = [_ensemble_chunk(*job) for job in jobs]
+
+    guess_params = np.concatenate([chunk[0] for chunk in chunks])
+    guess_positions = np.concatenate([chunk[1] for chunk in chunks])
+    error_metrics = {name: np.concatenate([chunk[2][name] for chunk in chunks]) for name in chunks[0][2]}
+
+    distances = np.linalg.norm(guess_positions - actual_positions, axis=-1)
+
+    return {
+        'actual_positions': actual_positions,
+        'actual_params': actual_params,
+        'guess_params': guess_params,
+        'position_bands': np.percentile(guess_positions, percentiles, axis=0),
+        'distance_bands': np.percentile(distances, percentiles, axis=0),
+        'error_metrics': error_metrics
+    }
+
+
+def _model_and_jacobian(params, epochs=None, num_points=1000):
+    # Positions for params = [e, q, i, w, Omega, TP] and their analytic partial derivatives.
+    # Samples are at the given epochs (Julian dates), or at orbit_positions' uniform mean anomalies.
+    e, q, i, w, Omega, TP = params
+    if epochs is None:
+        M = np.linspace(0, 2 * np.pi, num_points)
+        dM_de = dM_dq = dM_dTP = 0.0
+    else:
+        n = Calculations.mean_motion(e, q)
+        M = n * (np.asarray(epochs, dtype=float) - TP)
+        # n is proportional to a^(-3/2) with a = q / (1 - e)
+        dM_de = -1.5 * M / (1 - e)
+        dM_dq = -1.5 * M / q
+        dM_dTP = -n
+
+    E = Calculations.solve_kepler(M, e)
+    cos_E, sin_E = np.cos(E), np.sin(E)
+    D = 1 - e * cos_E
+    a = q / (1 - e)
+    root = np.sqrt(1 - e ** 2)
+    nu = Calculations.true_anomaly(E, e)
+    r = a * D
+
+    # Partials of E, nu and r with respect to M and e
+    dE_dM = 1 / D
+    dE_de = sin_E / D
+    dnu_dM = root / D ** 2
+    dnu_de = sin_E / (root * D) + root / D * dE_de
+    dr_dM = a * e * sin_E * dE_dM
+    dr_de = a / (1 - e) * D + a * (e * sin_E * dE_de - cos_E)
+    dr_dq = r / q
+
+    i, w, Omega = np.radians(i), np.radians(w), np.radians(Omega)
+    u = w + nu
+    cos_O, sin_O = np.cos(Omega), np.sin(Omega)
+    cos_u, sin_u = np.cos(u), np.sin(u)
+    cos_i, sin_i = np.cos(i), np.sin(i)
+
+    unit = np.stack([cos_O * cos_u - sin_O * sin_u * cos_i,
+                     sin_O * cos_u + cos_O * sin_u * cos_i,
+                     sin_u * sin_i], axis=-1)
+    positions = r[:, None] * unit
+
+    # Derivatives of the position with respect to r, u (= w + nu), i and Omega
+    p_r = unit
+    p_u = r[:, None] * np.stack([-cos_O * sin_u - sin_O * cos_u * cos_i,
+                                 -sin_O * sin_u + cos_O * cos_u * cos_i,
+                                 cos_u * sin_i], axis=-1)
+    p_i = r[:, None] * np.stack([sin_O * sin_u * sin_i,
+                                 -cos_O * sin_u * sin_i,
+                                 sin_u * cos_i * np.ones_like(u)], axis=-1)
+    p_O = np.stack([-positions[:, 1], positions[:, 0], np.zeros_like(u)], axis=-1)
+
+    def chain(dr, dnu):
+        return p_r * np.atleast_1d(dr)[:, None] + p_u * np.atleast_1d(dnu)[:, None]
+
+    deg = np.pi / 180  # i, w and Omega are in degrees
+    jacobian = np.stack([chain(dr_de + dr_dM * dM_de, dnu_de + dnu_dM * dM_de),
+                         chain(dr_dq + dr_dM * dM_dq, dnu_dM * dM_dq),
+                         p_i * deg,
+                         p_u * deg,
+                         p_O * deg,
+                         chain(dr_dM * dM_dTP, dnu_dM * dM_dTP)], axis=-1)
+    return positions, jacobian
+
+
+# Limits fit_orbit clips e and q to, and how close to an e limit a fit counts as having run into it
+_FIT_E_LIMITS = (0.0, 0.9999)
+_FIT_Q_MIN = 1e-6
+_FIT_BOUND_MARGIN = 1e-3
+
+
+def _is_stationary(J, residual, tol):
+    # Chi-squared decrease predicted by an undamped Gauss-Newton step, relative to chi-squared. Residuals are in
+    # units of the noise, so the floor of one lets an exact fit (vanishing residual and gradient) count as well.
+    g = J.T @ residual
+    decrease = g @ np.linalg.pinv(J.T @ J) @ g
+    return decrease <= tol * max(residual @ residual, 1.0)
+
+
+def fit_orbit(observed_positions, initial_params, epochs=None, noise_level=0.01, max_iter=100, tol=1e-10):
+    """
+    Recover orbital elements from observed positions with a Levenberg-Marquardt least-squares fit.
+
+    Parameters:
+    - observed_positions: Array of [x, y, z] positions (AU), e.g. orbit_positions output plus noise
+    - initial_params: Starting orbital elements [e, q, i, w, Omega, TP]
+    - epochs: Julian dates of the observations. If None, the observations are assumed to be sampled
+      like orbit_positions (uniform mean anomaly), where TP has no effect and is held fixed.
+    - noise_level: Standard deviation of the positional errors (AU)
+    - max_iter: Maximum number of Levenberg-Marquardt iterations
+    - tol: Relative chi-squared change below which the fit is considered converged
+
+    Returns:
+    - results: Dictionary with
+        'params': Fitted orbital elements [e, q, i, w, Omega, TP]
+        'covariance': 6x6 covariance matrix of the fitted elements (NaN rows/columns for fixed elements)
+        'fit_positions': Positions of the fitted orbit at the observed samples
+        'residuals', 'error_metrics': compare_orbits(observed_positions, fit_positions, noise_level)
+        'iterations': Number of iterations used
+        'converged': Whether the fit ended at a minimum, i.e. a full Gauss-Newton step from the fitted
+        elements would lower chi-squared by less than tol * max(chi-squared, 1). A fit that stalls (slow creep, or no
+        downhill step left at any damping) away from a minimum reports False.
+        'at_bound': Whether e ended within _FIT_BOUND_MARGIN of the limits the fit clips it to, or q on its
+        floor; such fits have usually run off towards a degenerate orbit
+    """
+    observed_positions = np.asarray(observed_positions, dtype=float)
+    num_points = len(observed_positions)
+    free = np.array([True] * 5 + [epochs is not None])
+    params = np.asarray(initial_params, dtype=float).copy()
+
+    def evaluate(p):
+        positions, jacobian = _model_and_jacobian(p, epochs, num_points)
+        residual = (observed_positions - positions).ravel() / noise_level
+        return residual, jacobian.reshape(-1, 6)[:, free] / noise_level
+
+    residual, J = evaluate(params)
+    chi_squared = residual @ residual
+    damping = 1e-3
+    converged = False
+
+    for iteration in range(1, max_iter + 1):
+        A = J.T @ J
+        g = J.T @ residual
+        try:
+            step = np.linalg.solve(A + damping * np.diag(np.diag(A)), g)
+        except np.linalg.LinAlgError:
+            damping *= 10
+            continue
+
+        trial = params.copy()
+        trial[free] += step
+        trial[0] = np.clip(trial[0], *_FIT_E_LIMITS)  # Keep eccentricity < 1
+        trial[1] = max(trial[1], _FIT_Q_MIN)  # Keep perihelion distance positive
+
+        trial_residual, trial_J = evaluate(trial)
+        trial_chi_squared = trial_residual @ trial_residual
+        if trial_chi_squared < chi_squared:
+            change = (chi_squared - trial_chi_squared) / max(chi_squared, 1.0)
+            params, residual, J, chi_squared = trial, trial_residual, trial_J, trial_chi_squared
+            damping = max(damping / 10, 1e-12)
+            # A tiny improvement alone is not enough: a fit creeping along a valley also makes those
+            if change < tol and _is_stationary(J, residual, tol):
+                converged = True
+                break
+        else:
+            damping *= 10
+            if damping > 1e12:
+                # No downhill step left at any damping: a minimum if the gradient has vanished, else stalled
+                converged = _is_stationary(J, residual, tol)
+                break
+
+    Instrumentation.record_iterations('fit_orbit', iteration, [converged])
+    at_bound = bool(params[0] <= _FIT_E_LIMITS[0] + _FIT_BOUND_MARGIN
+                    or params[0] >= _FIT_E_LIMITS[1] - _FIT_BOUND_MARGIN or params[1] <= _FIT_Q_MIN)
+
+    covariance = np.full((6, 6), np.nan)
+    covariance[np.ix_(free, free)] = np.linalg.pinv(J.T @ J)
+
+    params[2:5] = np.mod(params[2:5], 360)
+    if params[2] > 180:
+        # Inclination -i is the same orbit as i with the node and the perihelion turned half a revolution
+        params[2] = 360 - params[2]
+        params[3:5] = np.mod(params[3:5] + 180, 360)
+        covariance[2, :] *= -1
+        covariance[:, 2] *= -1
+
+    fit_positions, _ = _model_and_jacobian(params, epochs, num_points)
+    residuals, error_metrics = compare_orbits(observed_positions, fit_positions, noise_level)
+
+    return {
+        'params': params.tolist(),
+        'covariance': covariance,
+        'fit_positions': fit_positions,
+        'residuals': residuals,
+        'error_metrics': error_metrics,
+        'iterations': iteration,
+        'converged': converged,
+        'at_bound': at_bound
+    }
+
+
+def fit_catalog(df, num_points=200, noise_level=0.01, perturbation=0.01, seed=None):
+    """
+    Batch check of fit_orbit over a whole catalog: for every comet, sample its orbit at num_points epochs
+    over one period, add Gaussian noise, and fit starting from a guess_orbit-style perturbed element set.
+    The fit is local, so for e close to 1 (where a small change in e moves the period a lot) the starting
+    perturbation has to stay small for it to find the true minimum.
+
+    Returns:
+    - results: List with one fit_orbit result dictionary per comet, each extended with 'name' and 'actual_params'
+    """
+    catalog = Catalog.as_catalog(df)
+    rng = np.random.default_rng(seed)
+    results = []
+
+    for name in catalog['Object']:
+        actual_params = catalog.elements(name)
+        e, q, i, w, Omega, TP = actual_params
+        period = 2 * np.pi / Calculations.mean_motion(e, q)
+        epochs = TP + np.linspace(0, period, num_points, endpoint=False)
+
+        observed = Calculations.ephemeris(epochs, e, q, i, w, Omega, TP)
+        observed = observed + rng.normal(0, noise_level, observed.shape)
+        initial_params = perturb_elements(actual_params, 1, perturbation, rng)[0]
+
+        result = fit_orbit(observed, initial_params, epochs=epochs, noise_level=noise_level)
+        result['name'] = name
+        result['actual_params'] = actual_params
+        results.append(result)
+
+    return results
+
+
 def plot_orbit_comparison(comet_name, actual_positions, guess_positions, residuals):
     """
     Plot actual vs. guessed orbits and residual distribution.
@@ -111,95 +579,97 @@ def plot_orbit_comparison(comet_name, actual_positions, guess_positions, residua
     - guess_positions: Array of [x, y, z] positions for guessed orbit
     - residuals: Array of position differences
     """
-    fig = plt.figure(figsize=(12, 8))
-
-    # 3D Orbit Plot
-    ax1 = fig.add_subplot(121, projection='3d')
-    ax1.plot(actual_positions[:, 0], actual_positions[:, 1], actual_positions[:, 2],
-             label='Actual Orbit', color='blue')
-    ax1.plot(guess_positions[:, 0], guess_positions[:, 1], guess_positions[:, 2],
-             label='Guessed Orbit', color='red', linestyle='--')
-    max_val = np.max(np.abs(actual_positions)) * 1.1
-    ax1.set_xlim(-max_val, max_val)
-    ax1.set_ylim(-max_val, max_val)
-    ax1.set_zlim(-max_val, max_val)
-    ax1.set_xlabel('X (AU)')
-    ax1.set_ylabel('Y (AU)')
-    ax1.set_zlabel('Z (AU)')
-    ax1.set_title(f"Orbit Comparison for {comet_name}")
-    ax1.legend()
-
-    # Residual Plot
-    ax2 = fig.add_subplot(122)
-    ax2.hist(residuals.flatten(), bins=50, color='gray', alpha=0.7)
-    ax2.set_xlabel('Residual (AU)')
-    ax2.set_ylabel('Frequency')
-    ax2.set_title('Residual Distribution')
-
-    plt.tight_layout()
+    with Instrumentation.stage('plotting'):
+        _use_gui_backend()
+        import matplotlib.pyplot as plt
+
+        fig = plt.figure(figsize=(12, 8))
+
+        # 3D Orbit Plot
+        ax1 = fig.add_subplot(121, projection='3d')
+        ax1.plot(actual_positions[:, 0], actual_positions[:, 1], actual_positions[:, 2],
+                 label='Actual Orbit', color='blue')
+        ax1.plot(guess_positions[:, 0], guess_positions[:, 1], guess_positions[:, 2],
+                 label='Guessed Orbit', color='red', linestyle='--')
+        max_val = np.max(np.abs(actual_positions)) * 1.1
+        ax1.set_xlim(-max_val, max_val)
+        ax1.set_ylim(-max_val, max_val)
+        ax1.set_zlim(-max_val, max_val)
+        ax1.set_xlabel('X (AU)')
+        ax1.set_ylabel('Y (AU)')
+        ax1.set_zlabel('Z (AU)')
+        ax1.set_title(f"Orbit Comparison for {comet_name}")
+        ax1.legend()
+
+        # Residual Plot
+        ax2 = fig.add_subplot(122)
+        ax2.hist(residuals.flatten(), bins=50, color='gray', alpha=0.7)
+        ax2.set_xlabel('Residual (AU)')
+        ax2.set_ylabel('Frequency')
+        ax2.set_title('Residual Distribution')
+
+        plt.tight_layout()
     plt.show()
 
 
 def animate(cometName):
-    df = pd.read_csv("near-earth-comets.csv")
-
     # Find the comet
-    comet_row = df[(df["Object"].str.lower() == cometName.lower()) |
-                   (df["Object_name"].str.lower() == cometName.lower())]
-
-
-    e = float(comet_row["e"].values[0])
-    q = float(comet_row["q"].values[0])
-    i = float(comet_row["i"].values[0])
-    w = float(comet_row["w"].values[0])
-    Omega = float(comet_row["Node"].values[0])
-    TP = float(comet_row["TP"].values[0])
+    with Instrumentation.stage('catalog_lookup'):
+        e, q, i, w, Omega, TP = Catalog.load_catalog().elements(cometName)
 
     # Compute semi-major axis
     a = q / (1 - e)
     num_points = 1000
 
     # Calculate orbit positions
-    positions = Calculations.orbit_positions(e, a, i, w, Omega, TP, num_points)
+    with Instrumentation.stage('propagation'):
+        positions = Calculations.cached_orbit_positions(e, a, i, w, Omega, TP, num_points)
 
     # Debug: Check positions
     if np.any(np.isnan(positions)) or np.any(np.isinf(positions)):
+        Instrumentation.debug("Invalid positions", comet=cometName, nan=int(np.isnan(positions).sum()),
+                              inf=int(np.isinf(positions).sum()))
         raise ValueError(f"Invalid positions calculated for {cometName}: contains NaN or inf values")
-    print("Positions array shape:", positions.shape)
-    print("Sample positions:", positions[:5])
-
-    # Animation setup
-    fig = plt.figure(figsize=(8, 8))
-    ax = fig.add_subplot(111, projection='3d')
-    line, = ax.plot([], [], [], lw=2, color='blue', label='Orbit Path')
-    point, = ax.plot([], [], [], 'ro', label='Comet')
-
-    # Set axis limits
-    max_val = np.max(np.abs(positions)) * 1.1
-    ax.set_xlim(-max_val, max_val)
-    ax.set_ylim(-max_val, max_val)
-    ax.set_z
-    ax.set_xlabel('X (AU)')
-    ax.set_ylabel('Y (AU)')
-    ax.set_zlabel('Z (AU)')
-    ax.set_title(f"Orbit of {cometName}")
-    ax.legend()
-
-    def init():
-        line.set_data([], [])
-        line.set_3d_properties([])
-        point.set_data([], [])
-        point.set_3d_properties([])
-        return line, point
-
-    def update(frame):
-        line.set_data(positions[:frame, 0], positions[:frame, 1])
-        line.set_3d_properties(positions[:frame, 2])
-        point.set_data([positions[frame, 0]], [positions[frame, 1]])
-        point.set_3d_properties([positions[frame, 2]])
-        return line, point
-
-    ani = FuncAnimation(fig, update, frames=len(positions), init_func=init, interval=50, blit=True)
+    if Instrumentation.enabled:
+        Instrumentation.debug("Positions array", comet=cometName, shape=positions.shape, sample=positions[:5].tolist())
+
+    with Instrumentation.stage('plotting'):
+        # Animation setup
+        _use_gui_backend()
+        import matplotlib.pyplot as plt
+        from matplotlib.animation import FuncAnimation
+
+        fig = plt.figure(figsize=(8, 8))
+        ax = fig.add_subplot(111, projection='3d')
+        line, = ax.plot([], [], [], lw=2, color='blue', label='Orbit Path')
+        point, = ax.plot([], [], [], 'ro', label='Comet')
+
+        # Set axis limits
+        max_val = np.max(np.abs(positions)) * 1.1
+        ax.set_xlim(-max_val, max_val)
+        ax.set_ylim(-max_val, max_val)
+        ax.set_zlim(-max_val, max_val)
+        ax.set_xlabel('X (AU)')
+        ax.set_ylabel('Y (AU)')
+        ax.set_zlabel('Z (AU)')
+        ax.set_title(f"Orbit of {cometName}")
+        ax.legend()
+
+        def init():
+            line.set_data([], [])
+            line.set_3d_properties([])
+            point.set_data([], [])
+            point.set_3d_properties([])
+            return line, point
+
+        def update(frame):
+            line.set_data(positions[:frame, 0], positions[:frame, 1])
+            line.set_3d_properties(positions[:frame, 2])
+            point.set_data([positions[frame, 0]], [positions[frame, 1]])
+            point.set_3d_properties([positions[frame, 2]])
+            return line, point
+
+        ani = FuncAnimation(fig, update, frames=len(positions), init_func=init, interval=50, blit=True)
 
     plt.show()
     return ani
\ No newline at end of file
@@ -0,0 +1,294 @@
+"""
+Streaming ingestion of orbital-element files into a compact binary catalog store.
+
+A store is a directory holding one append-only file per column (raw float64 for numeric columns,
+newline-separated UTF-8 for text columns) and a manifest.json with the row count and, for every ingested
+source file, its fingerprint and the range of store rows it produced. Element files are read in chunks with
+an explicit dtype schema, invalid rows are dropped in one vectorized pass per chunk, and the surviving rows
+are appended to the column files, so memory use stays flat however large the input is.
+
+Ingesting a source again skips it if its contents are unchanged, resumes after the last committed chunk if
+the previous run was interrupted, and otherwise replaces its old rows. Rows from different sources that
+share an Object name are all kept; the last one ingested wins when the store is loaded.
+
+Load the result with Catalog.CometCatalog.from_store(path).
+
+Usage:
+    python Ingest.py big-catalog.csv more-comets.csv --store comets.store
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+import Catalog
+
+STORE_PATH = os.path.splitext(Catalog.CSV_PATH)[0] + ".store"
+MANIFEST = "manifest.json"
+
+# Explicit schema of the stored columns: numbers as float64, everything else as text
+SCHEMA = {name: (str if name in Catalog.TEXT_COLUMNS else np.float64) for name in Catalog.COLUMNS}
+
+
+def column_path(store, column, generation=0):
+    # Removing rows rewrites the columns as a new generation, switched over by the manifest
+    suffix = ".txt" if column in Catalog.TEXT_COLUMNS else ".f8"
+    return os.path.join(store, f"{column}.{generation}{suffix}")
+
+
+def read_manifest(store):
+    path = os.path.join(store, MANIFEST)
+    if not os.path.exists(path):
+        return {'rows': 0, 'generation': 0, 'columns': list(Catalog.COLUMNS), 'sources': {}}
+    with open(path) as file:
+        return json.load(file)
+
+
+def _write_manifest(store, manifest):
+    # Replace the manifest atomically; it is the commit point for every change to the store
+    tmp_path = os.path.join(store, MANIFEST + ".tmp")
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(tmp_path, os.path.join(store, MANIFEST))
+
+
+def _open_store(store):
+    # The manifest, with the column files cut back to what it has committed
+    os.makedirs(store, exist_ok=True)
+    manifest = read_manifest(store)
+    current = {os.path.basename(column_path(store, column, manifest['generation'])) for column in Catalog.COLUMNS}
+    for name in os.listdir(store):
+        if name.endswith((".f8", ".txt")) and name not in current:
+            os.remove(os.path.join(store, name))  # Left over from an interrupted rewrite
+
+    rows = manifest['rows']
+    for column in Catalog.COLUMNS:
+        path = column_path(store, column, manifest['generation'])
+        if not os.path.exists(path):
+            open(path, 'wb').close()
+        elif column in Catalog.TEXT_COLUMNS:
+            with open(path, 'rb+') as file:
+                offset = 0
+                for _ in range(rows):
+                    line = file.readline()
+                    if not line:
+                        break
+                    offset += len(line)
+                file.truncate(offset)
+        else:
+            with open(path, 'rb+') as file:
+                file.truncate(rows * 8)
+    return manifest
+
+
+def _remove_rows(store, manifest, start, stop, block_rows=2 ** 20):
+    # Copy every row outside [start, stop) into the next generation of column files, block by block
+    old, new = manifest['generation'], manifest['generation'] + 1
+    rows = manifest['rows']
+    for column in Catalog.COLUMNS:
+        with open(column_path(store, column, old), 'rb') as source, \
+                open(column_path(store, column, new), 'wb') as target:
+            if column in Catalog.TEXT_COLUMNS:
+                for row, line in zip(range(rows), source):
+                    if not start <= row < stop:
+                        target.write(line)
+            else:
+                for first, last in ((0, start), (stop, rows)):
+                    source.seek(first * 8)
+                    for block in range(first, last, block_rows):
+                        target.write(source.read(min(block_rows, last - block) * 8))
+
+    removed = stop - start
+    manifest['rows'] -= removed
+    manifest['generation'] = new
+    for entry in manifest['sources'].values():
+        if entry['start'] >= stop:
+            entry['start'] -= removed
+            entry['stop'] -= removed
+    _write_manifest(store, manifest)
+    for column in Catalog.COLUMNS:
+        os.remove(column_path(store, column, old))
+
+
+def fingerprint(path, block_size=2 ** 20):
+    """
+    SHA-1 of a file's contents, read in blocks.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def valid_rows(columns):
+    """
+    Boolean mask of the rows worth keeping: a name, finite orbital elements, 0 <= e, q > 0 and
+    0 <= i <= 180.
+    """
+    mask = np.char.str_len(columns["Object"]) > 0
+    for name in Catalog.ELEMENT_COLUMNS:
+        mask &= np.isfinite(columns[name])
+    with np.errstate(invalid='ignore'):
+        mask &= (columns["e"] >= 0) & (columns["q"] > 0) & (columns["i"] >= 0) & (columns["i"] <= 180)
+    return mask
+
+
+def _chunk_columns(frame):
+    import pandas as pd
+
+    # Typed arrays for every catalog column; columns missing from the file become NaN or empty text
+    columns = {}
+    for name in Catalog.COLUMNS:
+        if name in frame:
+            values = frame[name]
+            # Unparsable numbers become NaN here (and the row is dropped) instead of failing the whole read
+            columns[name] = (values.fillna("").to_numpy().astype(str) if name in Catalog.TEXT_COLUMNS
+                             else pd.to_numeric(values, errors="coerce").to_numpy(dtype=SCHEMA[name]))
+        else:
+            columns[name] = (np.full(len(frame), "") if name in Catalog.TEXT_COLUMNS
+                             else np.full(len(frame), np.nan))
+    if "Object" in frame and "Object_name" not in frame:
+        columns["Object_name"] = columns["Object"]
+    return columns
+
+
+def ingest(path, store=STORE_PATH, chunksize=100000, progress=None):
+    """
+    Add the valid rows of one element file (CSV with catalog column names) to a store.
+
+    Parameters:
+    - path: CSV file to ingest; columns not in Catalog.COLUMNS are ignored and missing ones left empty
+    - store: Store directory (created if needed)
+    - chunksize: Rows read and appended per chunk
+    - progress: Optional function progress(rows_read) called after every chunk
+
+    Returns:
+    - summary: Dictionary with 'added' and 'dropped' (rows of this run), 'replaced' (rows of an older
+      version of the file that were removed), 'resumed' and 'skipped' (True if the contents were ingested
+      before)
+    """
+    import pandas as pd
+
+    manifest = _open_store(store)
+    summary = {'added': 0, 'dropped': 0, 'replaced': 0, 'resumed': False, 'skipped': True}
+
+    stat = os.stat(path)
+    source = os.path.abspath(path)
+    known = manifest['sources'].get(source)
+    # Same path, size and modification time: unchanged without reading it
+    if (known is not None and known['complete'] and known['size'] == stat.st_size
+            and known['mtime_ns'] == stat.st_mtime_ns):
+        return summary
+    digest = fingerprint(path)
+    if known is not None and known['complete'] and known['sha1'] == digest:
+        known['size'], known['mtime_ns'] = stat.st_size, stat.st_mtime_ns  # Touched only
+        _write_manifest(store, manifest)
+        return summary
+    if any(entry['complete'] and entry['sha1'] == digest for entry in manifest['sources'].values()):
+        return summary  # Same contents under another path
+    summary['skipped'] = False
+
+    # An interrupted run of the same contents whose rows are still the last ones in the store: carry on
+    summary['resumed'] = (known is not None and known['sha1'] == digest and known['stop'] == manifest['rows'])
+    if summary['resumed']:
+        entry = known
+    else:
+        if known is not None:
+            summary['replaced'] = known['stop'] - known['start']
+            _remove_rows(store, manifest, known['start'], known['stop'])
+        entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': digest, 'start': manifest['rows'],
+                 'stop': manifest['rows'], 'read': 0, 'added': 0, 'dropped': 0, 'complete': False}
+        manifest['sources'][source] = entry
+        _write_manifest(store, manifest)
+
+    skip = entry['read']
+    generation = manifest['generation']
+    files = {column: open(column_path(store, column, generation), 'ab') for column in Catalog.COLUMNS}
+    try:
+        reader = pd.read_csv(path, chunksize=chunksize, usecols=lambda name: name in SCHEMA,
+                             dtype={name: str for name in Catalog.TEXT_COLUMNS},
+                             skiprows=(lambda line: 0 < line <= skip) if skip else None)
+        for frame in reader:
+            columns = _chunk_columns(frame)
+            keep = valid_rows(columns)
+            for column in Catalog.COLUMNS:
+                values = columns[column][keep]
+                if column in Catalog.TEXT_COLUMNS:
+                    files[column].write("".join(value.replace("\n", " ") + "\n" for value in values).encode())
+                else:
+                    files[column].write(values.astype('<f8').tobytes())
+                files[column].flush()
+            added = int(keep.sum())
+            summary['added'] += added
+            summary['dropped'] += len(keep) - added
+
+            # Commit the chunk; a crash before this line is undone by the next ingest
+            entry['read'] += len(keep)
+            entry['added'] += added
+            entry['dropped'] += len(keep) - added
+            entry['stop'] += added
+            manifest['rows'] += added
+            _write_manifest(store, manifest)
+            if progress is not None:
+                progress(entry['read'])
+    finally:
+        for file in files.values():
+            file.close()
+
+    entry['complete'] = True
+    _write_manifest(store, manifest)
+    return summary
+
+
+def read_store(store=STORE_PATH, mmap=True):
+    """
+    Column arrays of a store, one row per ingested row. Numeric columns are memory-mapped read-only when
+    mmap is set.
+    """
+    manifest = read_manifest(store)
+    rows = manifest['rows']
+    columns = {}
+    for column in Catalog.COLUMNS:
+        path = column_path(store, column, manifest['generation'])
+        if column in Catalog.TEXT_COLUMNS:
+            with open(path, encoding='utf-8') as file:
+                columns[column] = np.array([file.readline().rstrip("\n") for _ in range(rows)], dtype=str)
+        elif mmap and rows:
+            columns[column] = np.memmap(path, dtype='<f8', mode='r', shape=(rows,))
+        else:
+            columns[column] = np.fromfile(path, dtype='<f8', count=rows)
+    return columns
+
+
+def latest_rows(columns):
+    """
+    Sorted row numbers keeping only the last row of every Object name (any case).
+    """
+    names = np.char.lower(np.asarray(columns["Object"]).astype(str))
+    _, last = np.unique(names[::-1], return_index=True)
+    return np.sort(len(names) - 1 - last)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream element files into a compact catalog store.")
+    parser.add_argument("files", nargs="+", help="CSV files with catalog column names")
+    parser.add_argument("--store", default=STORE_PATH, help="store directory")
+    parser.add_argument("--chunksize", type=int, default=100000, help="rows per chunk")
+    args = parser.parse_args(argv)
+
+    for path in args.files:
+        summary = ingest(path, args.store, args.chunksize)
+        if summary['skipped']:
+            print(f"{path}: unchanged, skipped")
+        else:
+            replaced = f", {summary['replaced']} old rows replaced" if summary['replaced'] else ""
+            resumed = " (resumed)" if summary['resumed'] else ""
+            print(f"{path}: {summary['added']} rows added, {summary['dropped']} dropped{replaced}{resumed}")
+    print(f"{args.store}: {read_manifest(args.store)['rows']} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Optional instrumentation for the orbit pipeline: stage timers, solver iteration histograms, non-convergence
+counters and debug messages, all delivered to a pluggable sink.
+
+Everything is off by default. While disabled, stage() hands back one shared no-op context manager and the
+solvers skip their bookkeeping behind a single `if Instrumentation.enabled` test, so the cost is a few
+attribute lookups per call. Turn it on with enable(), optionally passing a sink: any callable that takes
+one event dictionary, e.g. print_sink or logging_sink(logger). Totals are kept either way and can be read
+with summary() or report().
+
+    import Instrumentation
+    Instrumentation.enable(Instrumentation.print_sink)
+    GuessOrbit.guess_orbit('1P/Halley', catalog)
+    print(Instrumentation.report())
+"""
+import contextlib
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+import numpy as np
+
+enabled = False
+_sink = None
+_lock = threading.Lock()
+_stages = defaultdict(lambda: [0, 0.0])  # name -> [calls, total seconds]
+_iterations = defaultdict(Counter)  # solver -> {iterations: number of points}
+_nonconverged = Counter()  # solver -> number of points that hit the iteration cap
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def enable(sink=None):
+    """
+    Start collecting; events also go to sink(event) if a sink is given.
+    """
+    global enabled, _sink
+    _sink = sink
+    enabled = True
+
+
+def disable():
+    global enabled, _sink
+    enabled = False
+    _sink = None
+
+
+def reset():
+    """
+    Forget all collected totals.
+    """
+    with _lock:
+        _stages.clear()
+        _iterations.clear()
+        _nonconverged.clear()
+
+
+def _emit(event):
+    if _sink is not None:
+        _sink(event)
+
+
+@contextlib.contextmanager
+def _timed_stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        with _lock:
+            totals = _stages[name]
+            totals[0] += 1
+            totals[1] += seconds
+        _emit({'kind': 'stage', 'name': name, 'seconds': seconds})
+
+
+def stage(name):
+    """
+    Context manager timing one pipeline stage, e.g. `with Instrumentation.stage('propagation'):`.
+    """
+    return _timed_stage(name) if enabled else _NULL_STAGE
+
+
+def record_iterations(solver, iterations, converged=None):
+    """
+    Add per-point iteration counts of a solver to its histogram.
+
+    Parameters:
+    - solver: Name of the solver (e.g. 'solve_kepler')
+    - iterations: Array of iteration counts, one per point (or a single count)
+    - converged: Optional boolean array marking the points that met the tolerance
+    """
+    if not enabled:
+        return
+    iterations = np.atleast_1d(np.asarray(iterations, dtype=int)).ravel()
+    counts = np.bincount(iterations)
+    failed = 0 if converged is None else int(np.size(converged) - np.count_nonzero(converged))
+    with _lock:
+        histogram = _iterations[solver]
+        for value in np.nonzero(counts)[0]:
+            histogram[int(value)] += int(counts[value])
+        _nonconverged[solver] += failed
+
+    event = {'kind': 'iterations', 'name': solver, 'points': len(iterations),
+             'max_iterations': int(iterations.max()) if len(iterations) else 0, 'nonconverged': failed}
+    if failed:
+        event['nonconverged_indices'] = np.argwhere(~np.asarray(converged))[:10].tolist()
+    _emit(event)
+
+
+def debug(message, **fields):
+    """
+    A debug message for the sink; dropped while instrumentation is disabled.
+    """
+    if enabled:
+        _emit({'kind': 'debug', 'message': message, **fields})
+
+
+def summary():
+    """
+    Collected totals: {'stages': {name: {'calls', 'seconds'}}, 'iterations': {solver: {n: points}},
+    'nonconverged': {solver: points}}.
+    """
+    with _lock:
+        return {
+            'stages': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in _stages.items()},
+            'iterations': {solver: dict(sorted(histogram.items())) for solver, histogram in _iterations.items()},
+            'nonconverged': dict(_nonconverged),
+        }
+
+
+def report():
+    """
+    summary() as readable text.
+    """
+    totals = summary()
+    lines = ["Stages:"]
+    for name, stats in sorted(totals['stages'].items(), key=lambda item: -item[1]['seconds']):
+        lines.append(f"  {name:30s} {stats['calls']:6d} calls {stats['seconds'] * 1e3:10.2f} ms")
+    lines.append("Iterations:")
+    for solver, histogram in totals['iterations'].items():
+        spread = ", ".join(f"{n}: {count}" for n, count in histogram.items())
+        lines.append(f"  {solver:30s} {spread} (non-converged: {totals['nonconverged'].get(solver, 0)})")
+    return "\n".join(lines)
+
+
+def print_sink(event):
+    """
+    Sink that prints every event on one line.
+    """
+    fields = " ".join(f"{key}={value}" for key, value in event.items() if key not in ('kind', 'name', 'message'))
+    print(f"[{event['kind']}] {event.get('name', event.get('message', ''))} {fields}".rstrip())
+
+
+def logging_sink(logger=None, level=logging.DEBUG):
+    """
+    Sink that forwards events to a logging.Logger (the 'orbits' logger if None).
+    """
+    logger = logging.getLogger("orbits") if logger is None else logger
+
+    def sink(event):
+        logger.log(level, "%s", event)
+
+    return sink
@@ -0,0 +1,197 @@
+import os
+import numpy as np
+from numpy.lib.format import open_memmap
+
+# Dormand-Prince 5(4) coefficients
+_C = np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1])
+_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+_B5 = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0])
+_B4 = np.array([5179 / 57600, 0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+
+
+def integrate_to(derivative, t, state, t_target, step=None, rtol=1e-10, atol=1e-12, max_steps=1000000):
+    """
+    Advance many independent particles to t_target with an adaptive Dormand-Prince 5(4) integrator.
+
+    Every particle keeps its own step size, but all particles that still have to move are stepped
+    together in one vectorized call, so stiff particles (e.g. sungrazing comets near perihelion) do not
+    force tiny steps on the rest.
+
+    Parameters:
+    - derivative: Function derivative(t, state, index) returning d(state)/dt for the particles listed in
+      index; t is an array of their current times and state has shape (len(index), ...)
+    - t: Current time, shared by all particles, or an array of N times (one per particle)
+    - state: Array of shape (N, ...) with the particle states at t
+    - t_target: Time to integrate to (may be earlier than t; particles may move in different directions)
+    - step: Array of N starting step sizes (magnitudes), e.g. from a previous call; a guess if None
+    - rtol, atol: Relative and absolute error tolerances per step
+    - max_steps: Safety limit on the number of vectorized steps
+
+    Returns:
+    - state: Array with the states at t_target
+    - step: Array of the last accepted step sizes, to warm-start the next call
+    """
+    state = np.array(state, dtype=float)
+    num = len(state)
+    times = np.array(np.broadcast_to(np.asarray(t, dtype=float), (num,)))
+    direction = np.where(t_target >= times, 1.0, -1.0)
+    if step is None:
+        step = np.minimum(np.abs(t_target - times), 1.0)
+        step[step == 0] = 1.0
+    else:
+        step = np.array(step, dtype=float)
+
+    for _ in range(max_steps):
+        active = np.nonzero(direction * (t_target - times) > 0)[0]
+        if len(active) == 0:
+            break
+
+        t_a = times[active]
+        y = state[active]
+        h = np.minimum(step[active], np.abs(t_target - t_a)) * direction[active]
+        h_b = h.reshape((-1,) + (1,) * (y.ndim - 1))
+
+        k = [derivative(t_a, y, active)]
+        for stage in range(1, 7):
+            y_stage = y + h_b * sum(a * k_j for a, k_j in zip(_A[stage], k) if a != 0)
+            k.append(derivative(t_a + _C[stage] * h, y_stage, active))
+
+        y_new = y + h_b * sum(b * k_j for b, k_j in zip(_B5, k) if b != 0)
+        error = h_b * sum((b5 - b4) * k_j for b5, b4, k_j in zip(_B5, _B4, k) if b5 != b4)
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        norm = np.max(np.abs(error / scale).reshape(len(active), -1), axis=1)
+
+        accepted = norm <= 1
+        done = active[accepted]
+        times[done] = t_a[accepted] + h[accepted]
+        state[done] = y_new[accepted]
+        # Snap particles that reached the target within rounding onto it exactly
+        times[done] = np.where(np.abs(t_target - times[done]) < 1e-12 * max(1.0, abs(t_target)), t_target,
+                               times[done])
+
+        factor = np.clip(0.9 * np.where(norm > 0, norm, 1e-10) ** -0.2, 0.2, 5.0)
+        step[active] = np.abs(h) * factor
+    else:
+        raise RuntimeError(f"integrate_to did not reach t={t_target} within {max_steps} steps")
+
+    return state, step
+
+
+def start_times(t, num, default):
+    """
+    One start time per particle from a shared time, an array of N times or None; default replaces None
+    and NaN entries.
+    """
+    t = np.full(num, np.nan) if t is None else np.broadcast_to(np.asarray(t, dtype=float), (num,))
+    return np.where(np.isnan(t), default, t)
+
+
+def _checkpoint_paths(path):
+    # Epoch states (T, N, ...) preallocated on disk, and the flags of the epochs written so far
+    return path + ".states.npy", path + ".done.npy"
+
+
+def _load_checkpoint(path, t0, state0, epochs):
+    if path is None or not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        if not (saved['t0'] == t0 and np.array_equal(saved['epochs'], epochs)
+                and np.array_equal(saved['state0'], state0)):
+            raise ValueError(f"Checkpoint {path} was written for a different run")
+    states_path, done_path = _checkpoint_paths(path)
+    if not (os.path.exists(states_path) and os.path.exists(done_path)):
+        return None
+    return open_memmap(states_path, mode='r+'), np.load(done_path)
+
+
+def _start_checkpoint(path, t0, state0, epochs):
+    # The run's identity is written once; afterwards every epoch only touches its own slice and the flags
+    states_path, _ = _checkpoint_paths(path)
+    states = open_memmap(states_path, mode='w+', dtype=float, shape=(len(epochs),) + state0.shape)
+    _save_progress(path, np.zeros(len(epochs), dtype=bool))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as file:
+        np.savez(file, t0=t0, state0=state0, epochs=epochs)
+    os.replace(tmp_path, path)
+    return states
+
+
+def _save_progress(path, done):
+    # Write to a temporary file first so an interrupted save never destroys the previous flags
+    _, done_path = _checkpoint_paths(path)
+    tmp_path = done_path + ".tmp.npy"
+    np.save(tmp_path, done)
+    os.replace(tmp_path, done_path)
+
+
+def propagate_to_epochs(derivative, t0, state0, epochs, rtol=1e-10, atol=1e-12, checkpoint=None):
+    """
+    States of many particles at every requested epoch, starting from state0 at t0.
+
+    Epochs after t0 are reached by integrating forward and epochs before t0 by integrating backward,
+    each visited in order so the integration never repeats a stretch of time.
+
+    Parameters:
+    - derivative, rtol, atol: As for integrate_to
+    - t0: Time of the initial states, or an array of N times (one per particle). Particles starting at
+      different times are first integrated to the epoch closest to their mean start time.
+    - state0: Array of shape (N, ...) with the initial states
+    - epochs: Array of T output times
+    - checkpoint: Optional .npz path recording t0, state0 and epochs. The state of every finished epoch is
+      written into a preallocated <checkpoint>.states.npy and the finished epochs into a small
+      <checkpoint>.done.npy, so each epoch costs one O(N) write however long the run. A later call with
+      the same t0, state0 and epochs resumes from the last saved epoch instead of starting over. Long runs
+      can request intermediate epochs to checkpoint more often.
+
+    Returns:
+    - states: Array of shape (N, len(epochs), ...) with the state at each epoch
+    """
+    epochs = np.atleast_1d(np.asarray(epochs, dtype=float))
+    state0 = np.asarray(state0, dtype=float)
+    t0 = np.asarray(t0, dtype=float)
+    if t0.ndim and np.all(t0 == t0.flat[0]):
+        t0 = t0.flat[0]
+    if t0.ndim:
+        # Bring every particle to one common start; a resumed run repeats this step deterministically
+        start = float(epochs[np.argmin(np.abs(epochs - t0.mean()))])
+        state0, _ = integrate_to(derivative, t0, state0, start, None, rtol, atol)
+        t0 = start
+    t0 = float(t0)
+    states = np.empty((len(state0), len(epochs)) + state0.shape[1:])
+    done = np.zeros(len(epochs), dtype=bool)
+    disk = None
+    if checkpoint is not None:
+        saved = _load_checkpoint(checkpoint, t0, state0, epochs)
+        if saved is None:
+            disk = _start_checkpoint(checkpoint, t0, state0, epochs)
+        else:
+            disk, done = saved
+            states[:, done] = np.moveaxis(disk[done], 0, 1)
+
+    after = np.nonzero(epochs >= t0)[0]
+    before = np.nonzero(epochs < t0)[0]
+    for order in (after[np.argsort(epochs[after], kind='stable')],
+                  before[np.argsort(-epochs[before], kind='stable')]):
+        t, state, step = t0, state0, None
+        for k in order:
+            if done[k]:
+                # Already integrated in an earlier run: continue from the saved state
+                t, state, step = epochs[k], states[:, k], None
+                continue
+            state, step = integrate_to(derivative, t, state, epochs[k], step, rtol, atol)
+            t = epochs[k]
+            states[:, k] = state
+            done[k] = True
+            if disk is not None:
+                disk[k] = state
+                disk.flush()
+                _save_progress(checkpoint, done)
+    return states
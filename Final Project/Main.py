@@ -1,12 +1,42 @@
+import time
+
+# Startup profile: (stage, seconds) pairs, reported with --profile-startup
+_stage_start = time.perf_counter()
+startup_stages = []
+
+
+def mark_stage(name):
+    """
+    Record the time spent since the previous mark under name.
+    """
+    global _stage_start
+    now = time.perf_counter()
+    startup_stages.append((name, now - _stage_start))
+    _stage_start = now
+
+
+import argparse
 import tkinter as tk
 from tkinter import messagebox
-import pandas as pd
-from tkintertable import TableCanvas, TableModel
+mark_stage("import tkinter")
+import numpy as np
+mark_stage("import numpy")
 import Calculations  # Assuming this is the module with your animation code
+mark_stage("import Calculations")
 import GuessOrbit
+mark_stage("import GuessOrbit")
+import Catalog
+import Background
+import CatalogTable
+mark_stage("import Catalog, Background, CatalogTable")
+# matplotlib, its animation module and the Tk plotting backend are imported on first use by
+# Calculations.animate and GuessOrbit; pandas only when the CSV has to be parsed
+
 
 class MyGUI:
-    def __init__(self):
+    def __init__(self, profile_startup=False):
+        self.profile_startup = profile_startup
+        self.catalog = None
         self.root = tk.Tk()
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
@@ -17,6 +47,10 @@ class MyGUI:
         self.root.title("Near Earth Comet Simulator")
         self.root.configure(bg="#d8d7d3")
 
+        # Orbit computations run on worker threads; results come back through root.after polling, and a
+        # failing result handler (e.g. a plotting error) is reported like a failed computation
+        self.runner = Background.BackgroundRunner(self.root, on_callback_error=self.show_error)
+
         # Welcome label
         label = tk.Label(
             self.root,
@@ -60,6 +94,19 @@ class MyGUI:
         )
         guess_button.pack(padx=10, pady=10)
 
+        # Progress of background computations, with a button to cancel them
+        status_frame = tk.Frame(self.root, bg="#d8d7d3")
+        status_frame.pack(padx=10, pady=5)
+        self.status = tk.Label(status_frame, bg="#d8d7d3", text="Ready", font=('Arial', 12))
+        self.status.pack(side="left", padx=5)
+        cancel_button = tk.Button(
+            status_frame,
+            text="Cancel",
+            font=('Arial', 12),
+            command=self.cancel_computations
+        )
+        cancel_button.pack(side="left", padx=5)
+
         # Comet info label
         CometInfo = tk.Label(
             self.root,
@@ -70,13 +117,32 @@ class MyGUI:
         )
         CometInfo.pack(padx=10, pady=10)
 
-        # Load DataFrame
+        # The catalog table is filled in once the catalog has loaded in the background
+        self.table_frame = tk.Frame(self.root)
+        self.table_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        self.loading_label = tk.Label(self.table_frame, text="Loading comet catalog...", font=('Arial', 14))
+        self.loading_label.pack(pady=20)
+        mark_stage("build window")
+
+        # Bind Enter key to show_animation
+        self.root.bind('<Return>', self.shortcut)
+
+        # Load catalog (typed arrays + name index, cached as a binary sidecar) once the window is up
+        self.root.after_idle(self.start_catalog_load)
+        self.root.mainloop()
+
+    def start_catalog_load(self):
+        mark_stage("show window")
+        self.runner.submit('catalog', self.load_catalog, on_done=self.show_catalog, on_error=self.show_error)
+
+    def load_catalog(self, job):
+        # Runs on a worker thread: no Tk calls here
+        start = time.perf_counter()
         try:
-            self.df = pd.read_csv("near-earth-comets.csv")
-            # Handle NaN and convert to strings
-            self.df = self.df.fillna('')  # Replace NaN with empty string
-            self.df = self.df.astype(str)  # Convert all columns to strings
+            catalog = Catalog.load_catalog()
         except FileNotFoundError:
+            import pandas as pd
+
             # Fallback: Create DataFrame from provided data
             comet_data = [
                 ["1P/Halley", "49400", "2446467.395", "0.9671429085", "162.2626906", "111.3324851", "58.42008098",
@@ -88,75 +154,43 @@ class MyGUI:
             ]
             columns = ["Object", "Epoch", "TP", "e", "i", "w", "Node", "q", "Q", "P", "MOID", "A1", "A2", "A3", "DT",
                        "ref", "Object_name"]
-            self.df = pd.DataFrame(comet_data, columns=columns)
-
-        # Reset DataFrame index to ensure proper row numbering
-        self.df.reset_index(drop=True, inplace=True)
-
-        # Debug: Print DataFrame to verify contents
-        print("DataFrame contents before rendering:")
-        print(self.df)
-        print(f"Number of rows: {len(self.df)}")
-        print(f"Columns: {list(self.df.columns)}")
-
-        # Show pandas table
-        frame = tk.Frame(self.root)
-        frame.pack(fill="both", expand=True)
-
-        # Create scrollable canvas for table
-        canvas = tk.Canvas(frame)
-        scrollbar_y = tk.Scrollbar(frame, orient="vertical", command=canvas.yview)
-        scrollbar_x = tk.Scrollbar(frame, orient="horizontal", command=canvas.xview)
-        table_frame = tk.Frame(canvas)
-
-        canvas.configure(yscrollcommand=scrollbar_y.set, xscrollcommand=scrollbar_x.set)
-        scrollbar_y.pack(side="right", fill="y")
-        scrollbar_x.pack(side="bottom", fill="x")
-        canvas.pack(side="left", fill="both", expand=True)
-        canvas.create_window((0, 0), window=table_frame, anchor="nw")
-
-        # Create table using tkintertable
-        try:
-            table_model = TableModel()
-            # Convert DataFrame to dict with integer indices
-            table_dict = {i: row for i, row in self.df.to_dict(orient='index').items()}
-            table_model.importDict(table_dict)
-            print(f"Table model row count: {table_model.getRowCount()}")
-            print(f"Table model column count: {table_model.getColumnCount()}")
-
-            table = TableCanvas(
-                table_frame,
-                model=table_model,
-                width=screen_width-100,
-                height=min(len(self.df) * 25, screen_height-400),
-                readonly=True
-            )
-            # Set background and text colors
-            table.bg = '#808080'  # Hex code for grey
-            table.cellbackgr = '#808080'
-            table.background = '#808080'
-            table.textcolor = 'white'
-            table.show()
-            table.redraw()  # Force redraw to apply styling
-        except Exception as e:
-            messagebox.showerror(
-                title="Table Rendering Error",
-                message=f"Failed to render table: {str(e)}"
-            )
-            print(f"Table rendering error: {str(e)}")
+            catalog = Catalog.CometCatalog.from_frame(pd.DataFrame(comet_data, columns=columns))
+        return catalog, time.perf_counter() - start
 
-        # Update scroll region
-        table_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+    def show_catalog(self, result):
+        self.catalog, load_time = result
+        mark_stage("wait for catalog (background)")
+        startup_stages.append(("  of which catalog load on worker thread", load_time))
 
-        # Bind Enter key to show_animation
-        self.root.bind('<Return>', self.shortcut)
+        # Show catalog table (only the visible rows are drawn, straight from the typed arrays)
+        self.loading_label.destroy()
+        table = CatalogTable.CatalogTable(self.table_frame, self.catalog, on_select=self.select_comet)
+        table.pack(fill="both", expand=True)
+        mark_stage("build catalog table")
 
-        self.root.mainloop()
+        if self.profile_startup:
+            self.root.after_idle(self.report_startup)
+
+    def report_startup(self):
+        mark_stage("first draw of catalog table")
+        total = sum(seconds for name, seconds in startup_stages if not name.startswith(" "))
+        print("Startup profile:")
+        for name, seconds in startup_stages:
+            print(f"  {name:45s} {seconds * 1e3:9.1f} ms")
+        print(f"  {'total':45s} {total * 1e3:9.1f} ms")
+
+    def catalog_ready(self):
+        if self.catalog is None:
+            messagebox.showinfo(title="Please Wait", message="The comet catalog is still loading.")
+            return False
+        return True
 
     def show_animation(self):
+        if not self.catalog_ready():
+            return
         comet = self.txtbox.get().strip()
         if self.check_state.get() == 1:  # Random comet selected
-            comet = self.df['Object'].sample().iloc[0]  # Pick a random comet
+            comet = np.random.choice(self.catalog['Object'])  # Pick a random comet
             self.txtbox.delete(0, tk.END)
             self.txtbox.insert(0, comet)  # Update textbox with random comet name
         if not comet:
@@ -166,40 +200,74 @@ class MyGUI:
             )
         else:
             # Check both Object and Object_name columns
-            comet_row = self.df[
-                (self.df['Object'].str.lower() == comet.lower()) |
-                (self.df['Object_name'].str.lower() == comet.lower())
-            ]
-            if not comet_row.empty:
-                Calculations.animate(comet)
+            if comet in self.catalog:
+                # Repeated clicks for the same comet join the computation already running
+                self.runner.submit(
+                    ('animate', comet.lower()), self.compute_track, comet,
+                    on_done=lambda positions: self.finish_animation(comet, positions),
+                    on_error=self.show_error,
+                    on_progress=self.show_progress
+                )
             else:
                 messagebox.showinfo(
                     title="Comet Not Found",
                     message=f"No comet named '{comet}' found in the dataset."
                 )
 
+    def select_comet(self, row):
+        self.txtbox.delete(0, tk.END)
+        self.txtbox.insert(0, self.catalog['Object'][row])
+
     def shortcut(self, event):
         if event.keysym == "Return":
             self.show_animation()
 
     def guess_comet_orbit(self):
+        if not self.catalog_ready():
+            return
         comet = self.txtbox.get().strip()
         if self.check_state.get() == 1:  # Random comet selected
-            comet = self.df['Object'].sample().iloc[0]  # Pick a random comet
+            comet = np.random.choice(self.catalog['Object'])  # Pick a random comet
             self.txtbox.delete(0, tk.END)
             self.txtbox.insert(0, comet)  # Update textbox with random comet name
-        comet_row = self.df[
-            (self.df['Object'].str.lower() == comet.lower()) |
-            (self.df['Object_name'].str.lower() == comet.lower())
-            ]
 
+        self.runner.submit(
+            ('guess', comet.lower()), self.compute_guess, comet,
+            on_done=lambda result: self.finish_guess(comet, *result),
+            on_error=self.show_error,
+            on_progress=self.show_progress
+        )
+
+    def compute_track(self, job, comet):
+        # Runs on a worker thread: no Tk calls here
+        job.report(0.0, f"Computing orbit of {comet}...")
+        e, q, i, w, Omega, TP = self.catalog.elements(comet)
+        positions = Calculations.cached_orbit_positions(e, q / (1 - e), i, w, Omega, TP, 1000)
+        job.report(1.0, f"Orbit of {comet} ready")
+        return positions
+
+    def finish_animation(self, comet, positions):
+        self.status.config(text="Ready")
+        Calculations.animate(comet, positions=positions)
+
+    def compute_guess(self, job, comet):
+        # Runs on a worker thread: no Tk calls here
+        job.report(0.0, f"Guessing orbit of {comet}...")
         # Generate actual and guessed orbits
         actual_positions, guess_positions, actual_params, guess_params = GuessOrbit.guess_orbit(
-            comet, self.df, num_points=1000, perturbation=0.05
+            comet, self.catalog, num_points=1000, perturbation=0.05
         )
+        job.check_cancelled()
 
         # Compare orbits
+        job.report(0.5, f"Comparing orbits of {comet}...")
         residuals, error_metrics = GuessOrbit.compare_orbits(actual_positions, guess_positions, noise_level=0.01)
+        job.report(1.0, f"Orbit guess for {comet} ready")
+        return actual_positions, guess_positions, actual_params, guess_params, residuals, error_metrics
+
+    def finish_guess(self, comet, actual_positions, guess_positions, actual_params, guess_params, residuals,
+                     error_metrics):
+        self.status.config(text="Ready")
 
         # Plot comparison
         GuessOrbit.plot_orbit_comparison(comet, actual_positions, guess_positions, residuals)
@@ -231,6 +299,23 @@ class MyGUI:
             message=message
         )
 
+    def show_progress(self, fraction, message):
+        self.status.config(text=f"{message} ({fraction:.0%})")
+
+    def show_error(self, error):
+        self.status.config(text="Ready")
+        messagebox.showerror(title="Computation Error", message=str(error))
+
+    def cancel_computations(self):
+        # The catalog load is not a computation: cancelling it would leave the app without a catalog
+        self.runner.cancel(keep=('catalog',))
+        self.status.config(text="Cancelled")
+
 
 # Main
-MyGUI()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Near Earth Comet Simulator")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print the time spent in each import and initialization stage")
+    args = parser.parse_args()
+    MyGUI(profile_startup=args.profile_startup)
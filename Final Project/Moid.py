@@ -0,0 +1,127 @@
+import numpy as np
+import Calculations
+import Catalog
+
+# Earth's mean orbit at J2000 (ecliptic), used as the second orbit for catalog MOIDs
+EARTH_ELEMENTS = {
+    'e': 0.01671123,
+    'q': 1.00000261 * (1 - 0.01671123),
+    'i': 0.0,
+    'w': 102.93768193,
+    'Node': 0.0,
+}
+
+
+def moid_batch(elements_a, elements_b, grid_size=72, num_starts=3, refine_iter=60, chunk_size=512):
+    """
+    Minimum orbit intersection distance for many pairs of orbits.
+
+    Parameters:
+    - elements_a, elements_b: Dictionaries (or CometCatalog-like mappings) with 'e', 'q', 'i', 'w', 'Node'
+      entries, each a scalar or an array of length N. Angles are in degrees.
+    - grid_size: Number of true-anomaly samples per orbit in the coarse grid
+    - num_starts: Number of best grid cells refined for each pair
+    - refine_iter: Maximum number of refinement iterations
+    - chunk_size: Number of pairs processed together
+
+    Returns:
+    - moid: Array of length N with the minimum distance (AU)
+    - nu_a, nu_b: Arrays of length N with the true anomalies (radians) where it is reached
+    """
+    keys = ['e', 'q', 'i', 'w', 'Node']
+    elements_a = [np.asarray(elements_a[k], dtype=float) for k in keys]
+    elements_b = [np.asarray(elements_b[k], dtype=float) for k in keys]
+    arrays = np.broadcast_arrays(*elements_a, *elements_b)
+    num_pairs = arrays[0].size
+    arrays = [np.radians(x.ravel()) if k % 5 >= 2 else x.ravel() for k, x in enumerate(arrays)]
+
+    moid = np.empty(num_pairs)
+    best_nu_a = np.empty(num_pairs)
+    best_nu_b = np.empty(num_pairs)
+    grid = np.linspace(-1, 1, grid_size, endpoint=False)
+
+    for start in range(0, num_pairs, chunk_size):
+        chunk = slice(start, min(start + chunk_size, num_pairs))
+        a = [x[chunk, None] for x in arrays[:5]]
+        b = [x[chunk, None] for x in arrays[5:]]
+        limit_a = Calculations.max_true_anomaly(a[0])
+        limit_b = Calculations.max_true_anomaly(b[0])
+
+        # Coarse grid: squared distance between every sample of orbit a and every sample of orbit b
+        nu_a = limit_a * grid
+        nu_b = limit_b * grid
+        points_a = Calculations.conic_positions(nu_a, *a)
+        points_b = Calculations.conic_positions(nu_b, *b)
+        d2 = (np.sum(points_a ** 2, axis=-1)[:, :, None] + np.sum(points_b ** 2, axis=-1)[:, None, :]
+              - 2 * np.matmul(points_a, points_b.transpose(0, 2, 1)))
+
+        # Start the refinement from the few best cells of each pair
+        flat = d2.reshape(len(d2), -1)
+        starts = np.argpartition(flat, num_starts - 1, axis=1)[:, :num_starts]
+        rows = np.arange(len(d2))[:, None]
+        u = nu_a[rows, starts // grid_size]
+        v = nu_b[rows, starts % grid_size]
+
+        # Pattern search on a shrinking 3x3 stencil around each start, all starts at once
+        a = [x[:, :, None] for x in a]
+        b = [x[:, :, None] for x in b]
+        lim_a, lim_b = limit_a[:, :, None], limit_b[:, :, None]
+        step_a = np.broadcast_to(2 * limit_a / grid_size, u.shape).copy()
+        step_b = np.broadcast_to(2 * limit_b / grid_size, v.shape).copy()
+        offsets = np.array([-1, 0, 1])
+        du = np.repeat(offsets, 3)
+        dv = np.tile(offsets, 3)
+
+        for _ in range(refine_iter):
+            trial_u = np.clip(u[:, :, None] + du * step_a[:, :, None], -lim_a, lim_a)
+            trial_v = np.clip(v[:, :, None] + dv * step_b[:, :, None], -lim_b, lim_b)
+            d = np.sum((Calculations.conic_positions(trial_u, *a) - Calculations.conic_positions(trial_v, *b)) ** 2,
+                       axis=-1)
+            best = np.argmin(d, axis=-1)
+            stay = best == 4  # The centre of the stencil is still the best point
+            u = np.take_along_axis(trial_u, best[:, :, None], axis=-1)[:, :, 0]
+            v = np.take_along_axis(trial_v, best[:, :, None], axis=-1)[:, :, 0]
+            step_a = np.where(stay, step_a / 2, step_a)
+            step_b = np.where(stay, step_b / 2, step_b)
+            if np.all(step_a < 1e-10):
+                break
+
+        a = [x[:, :, 0] for x in a]
+        b = [x[:, :, 0] for x in b]
+        d = np.linalg.norm(Calculations.conic_positions(u, *a) - Calculations.conic_positions(v, *b), axis=-1)
+        best = np.argmin(d, axis=1)
+        rows = np.arange(len(d))
+        moid[chunk] = d[rows, best]
+        best_nu_a[chunk] = u[rows, best]
+        best_nu_b[chunk] = v[rows, best]
+
+    return moid, best_nu_a, best_nu_b
+
+
+def moid(elements_a, elements_b, **kwargs):
+    """
+    Minimum orbit intersection distance (AU) between two orbits, see moid_batch.
+    """
+    return float(moid_batch(elements_a, elements_b, **kwargs)[0][0])
+
+
+def earth_moid_catalog(df=None, **kwargs):
+    """
+    Compute the MOID against Earth for every comet in the catalog and compare it with the MOID column.
+
+    Parameters:
+    - df: CometCatalog (or DataFrame) containing comet data; the default catalog if None
+    - kwargs: Passed on to moid_batch
+
+    Returns:
+    - results: Dictionary with 'name', 'computed', 'catalog' and 'difference' (computed - catalog) arrays
+    """
+    catalog = Catalog.as_catalog(df)
+
+    computed, _, _ = moid_batch(catalog, EARTH_ELEMENTS, **kwargs)
+    return {
+        'name': catalog['Object'],
+        'computed': computed,
+        'catalog': catalog['MOID'],
+        'difference': computed - catalog['MOID'],
+    }
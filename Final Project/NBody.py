@@ -0,0 +1,163 @@
+import numpy as np
+import Calculations
+import Catalog
+import Integrators
+
+J2000 = 2451545.0
+DAYS_PER_CENTURY = 36525.0
+
+# Keplerian elements of the planets (Standish, "Approximate Positions of the Planets", JPL, Table 1,
+# valid 1800-2050): a (AU), e, I, L, long. of perihelion, long. of node (degrees) at J2000 and their
+# rates per Julian century. The Earth entry is the Earth-Moon barycenter.
+PLANET_ELEMENTS = {
+    'Mercury': ([0.38709927, 0.20563593, 7.00497902, 252.25032350, 77.45779628, 48.33076593],
+                [0.00000037, 0.00001906, -0.00594749, 149472.67411175, 0.16047689, -0.12534081]),
+    'Venus': ([0.72333566, 0.00677672, 3.39467605, 181.97909950, 131.60246718, 76.67984255],
+              [0.00000390, -0.00004107, -0.00078890, 58517.81538729, 0.00268329, -0.27769418]),
+    'Earth': ([1.00000261, 0.01671123, -0.00001531, 100.46457166, 102.93768193, 0.0],
+              [0.00000562, -0.00004392, -0.01294668, 35999.37244981, 0.32327364, 0.0]),
+    'Mars': ([1.52371034, 0.09339410, 1.84969142, -4.55343205, -23.94362959, 49.55953891],
+             [0.00001847, 0.00007882, -0.00813131, 19140.30268499, 0.44441088, -0.29257343]),
+    'Jupiter': ([5.20288700, 0.04838624, 1.30439695, 34.39644051, 14.72847983, 100.47390909],
+                [-0.00011607, -0.00013253, -0.00183714, 3034.74612775, 0.21252668, 0.20469106]),
+    'Saturn': ([9.53667594, 0.05386179, 2.48599187, 49.95424423, 92.59887831, 113.66242448],
+               [-0.00125060, -0.00050991, 0.00193609, 1222.49362201, -0.41897216, -0.28867794]),
+    'Uranus': ([19.18916464, 0.04725744, 0.77263783, 313.23810451, 170.95427630, 74.01692503],
+               [-0.00196176, -0.00004397, -0.00242939, 428.48202785, 0.40805281, 0.04240589]),
+    'Neptune': ([30.06992276, 0.00859048, 1.77004347, -55.12002969, 44.96476227, 131.78422574],
+                [0.00026291, 0.00005105, 0.00035372, 218.45945325, -0.32241464, -0.00508664]),
+}
+
+# Sun-to-planet mass ratios (IAU 2009; the Earth entry includes the Moon)
+SUN_MASS_RATIOS = {
+    'Mercury': 6023600.0,
+    'Venus': 408523.71,
+    'Earth': 328900.56,
+    'Mars': 3098708.0,
+    'Jupiter': 1047.3486,
+    'Saturn': 3497.898,
+    'Uranus': 22902.98,
+    'Neptune': 19412.24,
+}
+
+
+class AnalyticEphemeris:
+    """
+    Offline planetary ephemeris from JPL's approximate Keplerian elements (accurate to roughly 1e-3 AU
+    for the inner planets and a few 1e-3 AU for the giants between 1800 and 2050).
+
+    Any object with the same three attributes can be passed to propagate instead, e.g. one that
+    interpolates a table exported from JPL Horizons:
+    - names: List of the P planet names
+    - gm: Array of P gravitational parameters (AU^3/day^2)
+    - positions(jd): Heliocentric ecliptic J2000 positions for an array of n Julian dates, shape (n, P, 3)
+    """
+
+    def __init__(self, planets=None):
+        self.names = list(PLANET_ELEMENTS) if planets is None else list(planets)
+        elements = np.array([PLANET_ELEMENTS[name][0] for name in self.names])
+        rates = np.array([PLANET_ELEMENTS[name][1] for name in self.names])
+        self._elements, self._rates = elements.T, rates.T  # Shape (6, P)
+        self.gm = Calculations.GM_SUN / np.array([SUN_MASS_RATIOS[name] for name in self.names])
+
+    def positions(self, jd):
+        jd = np.atleast_1d(np.asarray(jd, dtype=float))
+        # Integrators evaluate many particles at the same time, so each distinct time is computed once
+        times, inverse = np.unique(jd, return_inverse=True)
+        centuries = (times[:, None] - J2000) / DAYS_PER_CENTURY
+        a, e, I, L, perihelion, node = (x0 + rate * centuries for x0, rate in zip(self._elements, self._rates))
+
+        E = Calculations.solve_kepler(np.radians(L - perihelion), e)
+        x_orb = a * (np.cos(E) - e)
+        y_orb = a * np.sqrt(1 - e ** 2) * np.sin(E)
+        positions = Calculations.perifocal_to_ecliptic(x_orb, y_orb, np.radians(I), np.radians(perihelion - node),
+                                                       np.radians(node))
+        return positions[inverse.ravel()]
+
+
+def planetary_acceleration(position, planet_positions, gm):
+    """
+    Heliocentric acceleration of massless particles from the planets, including the indirect term for the
+    planets' pull on the Sun.
+
+    Parameters:
+    - position: Array of shape (n, 3) with the particle positions (AU)
+    - planet_positions: Array of shape (n, P, 3) with the planet positions at each particle's time (AU)
+    - gm: Array of P gravitational parameters (AU^3/day^2)
+
+    Returns:
+    - acceleration: Array of shape (n, 3) (AU/day^2)
+    """
+    offset = planet_positions - position[:, None, :]
+    direct = offset / np.linalg.norm(offset, axis=-1, keepdims=True) ** 3
+    indirect = planet_positions / np.linalg.norm(planet_positions, axis=-1, keepdims=True) ** 3
+    return np.einsum('p,npk->nk', gm, direct - indirect)
+
+
+def propagate(jd, e, q, i, w, Node, TP, ephemeris=None, epoch=None, checkpoint=None, rtol=1e-10, atol=1e-12):
+    """
+    Heliocentric positions of many comets at the requested epochs under the Sun and the major planets.
+
+    The comets are massless test particles sharing one (N, 6) Cartesian state array, advanced by an
+    adaptive Dormand-Prince integrator. The given elements are taken as osculating at epoch.
+
+    Parameters:
+    - jd: Array of T Julian dates
+    - e, q, i, w, Node, TP: Orbital elements (arrays of N comets; q in AU, angles in degrees)
+    - ephemeris: Source of planet positions (see AnalyticEphemeris); all eight planets from
+      AnalyticEphemeris if None
+    - epoch: Julian date at which the elements are osculating, one for all comets or an array with one
+      per comet (NaN entries fall back to the earliest jd); the earliest jd if None
+    - checkpoint: Optional .npz path used to save progress after every epoch and resume an interrupted run
+    - rtol, atol: Integrator tolerances
+
+    Returns:
+    - positions: Array of shape (T, 3) for a single comet or (N, T, 3) for N comets (AU)
+    """
+    jd = np.atleast_1d(np.asarray(jd, dtype=float))
+    single = np.ndim(e) == 0
+    ephemeris = AnalyticEphemeris() if ephemeris is None else ephemeris
+    gm = np.asarray(ephemeris.gm, dtype=float)
+    elements = [np.atleast_1d(np.asarray(x, dtype=float)) for x in (e, q, i, w, Node, TP)]
+    epoch = Integrators.start_times(epoch, len(elements[0]), jd.min())
+
+    position, velocity = Calculations.universal_ephemeris(epoch[:, None], *elements, return_velocity=True)
+    state0 = np.concatenate([position[:, 0], velocity[:, 0]], axis=1)
+
+    def derivative(t, state, index):
+        r_vec, v_vec = state[:, :3], state[:, 3:]
+        r = np.linalg.norm(r_vec, axis=1)
+        acceleration = -Calculations.GM_SUN * r_vec / r[:, None] ** 3
+        acceleration += planetary_acceleration(r_vec, ephemeris.positions(t), gm)
+        return np.concatenate([v_vec, acceleration], axis=1)
+
+    states = Integrators.propagate_to_epochs(derivative, epoch, state0, jd, rtol, atol, checkpoint)
+    positions = states[:, :, :3]
+    return positions[0] if single else positions
+
+
+def compare_two_body(jd, df=None, names=None, ephemeris=None, epoch=None, checkpoint=None):
+    """
+    How far the planetary perturbations move each comet away from its two-body orbit.
+
+    Parameters:
+    - jd: Array of T Julian dates
+    - df: CometCatalog (or DataFrame) containing comet data; the default catalog if None
+    - names: Comets to compare; every comet if None
+    - ephemeris, checkpoint: As for propagate
+    - epoch: Osculation epoch(s) as for propagate; the catalog's Epoch column (MJD) if None
+
+    Returns:
+    - names: The comets compared
+    - distances: Array of shape (N, T) with the distance between the N-body and two-body positions (AU)
+    """
+    catalog = Catalog.as_catalog(df)
+    rows = np.arange(len(catalog)) if names is None else np.array([catalog.lookup(name) for name in names], dtype=int)
+
+    elements = [catalog[column][rows] for column in Catalog.ELEMENT_COLUMNS]
+    if epoch is None:
+        epoch = catalog["Epoch"][rows] + Catalog.MJD_OFFSET
+    perturbed = propagate(jd, *elements, ephemeris=ephemeris, epoch=epoch, checkpoint=checkpoint)
+    two_body = Calculations.universal_ephemeris(jd, *elements)
+    distances = np.linalg.norm(perturbed - two_body, axis=-1)
+    return [str(name) for name in catalog["Object"][rows]], distances
@@ -0,0 +1,126 @@
+import numpy as np
+import Calculations
+import Catalog
+import Integrators
+
+NONGRAV_COLUMNS = ["A1", "A2", "A3", "DT"]
+
+# Marsden et al. (1973) water-ice sublimation law g(r) = ALPHA (r/R0)^-M (1 + (r/R0)^N)^-K, with g(1 AU) = 1
+ALPHA = 0.1112620426
+R0 = 2.808
+M = 2.15
+N = 5.093
+K = 4.6142
+
+
+def g_marsden(r):
+    """
+    Marsden's sublimation scaling of the non-gravitational acceleration at heliocentric distance r (AU).
+    """
+    x = np.asarray(r, dtype=float) / R0
+    return ALPHA * x ** -M * (1 + x ** N) ** -K
+
+
+def nongrav_acceleration(position, velocity, A1, A2, A3, g):
+    """
+    Radial/transverse/normal non-gravitational acceleration A1*g*R + A2*g*T + A3*g*N.
+
+    Parameters:
+    - position, velocity: Arrays of shape (N, 3) (AU, AU/day)
+    - A1, A2, A3: Arrays of N parameters (AU/day^2); NaN counts as zero
+    - g: Array of N values of g(r)
+
+    Returns:
+    - acceleration: Array of shape (N, 3) (AU/day^2)
+    """
+    radial = position / np.linalg.norm(position, axis=-1, keepdims=True)
+    normal = np.cross(position, velocity)
+    normal /= np.linalg.norm(normal, axis=-1, keepdims=True)
+    transverse = np.cross(normal, radial)
+    A1, A2, A3 = (np.nan_to_num(np.asarray(x, dtype=float)) * g for x in (A1, A2, A3))
+    return A1[:, None] * radial + A2[:, None] * transverse + A3[:, None] * normal
+
+
+def propagate(jd, e, q, i, w, Node, TP, A1, A2, A3, DT=None, epoch=None, rtol=1e-10, atol=1e-12):
+    """
+    Heliocentric positions of many comets at the requested epochs, integrating the two-body motion plus
+    the Marsden non-gravitational accelerations.
+
+    All comets share one (N, 6) Cartesian state array that is advanced by an adaptive Dormand-Prince
+    integrator. The initial states are taken from the two-body elements at epoch, so with A1 = A2 = A3 = 0
+    the result reproduces Calculations.universal_ephemeris.
+
+    Parameters:
+    - jd: Array of T Julian dates
+    - e, q, i, w, Node, TP: Orbital elements (arrays of N comets; q in AU, angles in degrees)
+    - A1, A2, A3: Non-gravitational parameters (AU/day^2; NaN counts as zero)
+    - DT: Perihelion offset of the outgassing peak (days); g is evaluated at the two-body distance at t - DT
+    - epoch: Julian date at which the elements are osculating, one for all comets or an array with one
+      per comet (NaN entries fall back to the earliest jd); the earliest jd if None
+    - rtol, atol: Integrator tolerances
+
+    Returns:
+    - positions: Array of shape (T, 3) for a single comet or (N, T, 3) for N comets (AU)
+    """
+    jd = np.atleast_1d(np.asarray(jd, dtype=float))
+    single = np.ndim(e) == 0
+    e, q, i, w, Node, TP, A1, A2, A3 = (np.atleast_1d(np.asarray(x, dtype=float))
+                                        for x in (e, q, i, w, Node, TP, A1, A2, A3))
+    DT = np.zeros_like(e) if DT is None else np.nan_to_num(np.atleast_1d(np.asarray(DT, dtype=float)))
+    epoch = Integrators.start_times(epoch, len(e), jd.min())
+
+    position, velocity = Calculations.universal_ephemeris(epoch[:, None], e, q, i, w, Node, TP, return_velocity=True)
+    state0 = np.concatenate([position[:, 0], velocity[:, 0]], axis=1)
+    delayed = np.any(DT != 0)
+
+    def derivative(t, state, index):
+        r_vec, v_vec = state[:, :3], state[:, 3:]
+        r = np.linalg.norm(r_vec, axis=1)
+        if delayed:
+            # Distance each comet had DT days earlier on its two-body orbit (one epoch per comet)
+            delayed_position = Calculations.universal_ephemeris(
+                (t - DT[index])[:, None], e[index], q[index], i[index], w[index], Node[index], TP[index])
+            r_g = np.linalg.norm(delayed_position[:, 0], axis=-1)
+        else:
+            r_g = r
+        acceleration = -Calculations.GM_SUN * r_vec / r[:, None] ** 3
+        acceleration += nongrav_acceleration(r_vec, v_vec, A1[index], A2[index], A3[index], g_marsden(r_g))
+        return np.concatenate([v_vec, acceleration], axis=1)
+
+    states = Integrators.propagate_to_epochs(derivative, epoch, state0, jd, rtol, atol)
+    positions = states[:, :, :3]
+    return positions[0] if single else positions
+
+
+def compare_two_body(jd, df=None, names=None, epoch=None):
+    """
+    How far the non-gravitational forces move each comet away from its two-body orbit.
+
+    Parameters:
+    - jd: Array of T Julian dates
+    - df: CometCatalog (or DataFrame) containing comet data; the default catalog if None
+    - names: Comets to compare; every comet with a non-zero A1, A2 or A3 if None
+    - epoch: Osculation epoch(s) as for propagate; the catalog's Epoch column (MJD) if None
+
+    Returns:
+    - names: The comets compared
+    - distances: Array of shape (N, T) with the distance between the two propagations (AU)
+    """
+    catalog = Catalog.as_catalog(df)
+
+    if names is None:
+        active = np.zeros(len(catalog), dtype=bool)
+        for column in ("A1", "A2", "A3"):
+            active |= np.nan_to_num(catalog[column]) != 0
+        rows = np.nonzero(active)[0]
+    else:
+        rows = np.array([catalog.lookup(name) for name in names], dtype=int)
+
+    elements = [catalog[column][rows] for column in Catalog.ELEMENT_COLUMNS]
+    nongrav = [catalog[column][rows] for column in NONGRAV_COLUMNS]
+    if epoch is None:
+        epoch = catalog["Epoch"][rows] + Catalog.MJD_OFFSET
+    with_forces = propagate(jd, *elements, *nongrav, epoch=epoch)
+    without = propagate(jd, *elements, *(np.zeros(len(rows)) for _ in range(4)), epoch=epoch)
+    distances = np.linalg.norm(with_forces - without, axis=-1)
+    return [str(name) for name in catalog["Object"][rows]], distances
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Next to this module, so GUI, batch and benchmark runs share one cache wherever they are started from
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".orbit_cache")
+
+
+class OrbitCache:
+    """
+    Two-tier cache for computed orbit tracks.
+
+    The first tier is an in-memory LRU holding at most max_entries arrays. The second tier is a
+    directory of .npy files that survives process restarts; disk hits are opened memory-mapped
+    (read-only), so a large track is paged in lazily instead of being read up front. The directory is
+    capped at max_disk_bytes: after every write the least recently used files (by modification time,
+    which disk hits refresh) are deleted until it fits again. Arrays stored in the memory tier are
+    marked read-only as well, so every hit behaves the same and no caller can change a cached track in
+    place. The cache is safe to share between threads.
+    """
+
+    def __init__(self, max_entries=32, cache_dir=CACHE_DIR, max_disk_bytes=256 * 2 ** 20):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_evictions': 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(namespace, *params):
+        """
+        Stable key for a set of numeric parameters (e.g. orbital elements and num_points).
+        """
+        digest = hashlib.sha1(namespace.encode())
+        digest.update(np.asarray(params, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key + ".npy")
+
+    def get(self, key):
+        """
+        Cached array for key, or None. Memory hits are promoted to most recently used and disk hits are
+        promoted into the memory tier.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self._memory[key]
+
+        if self.cache_dir is not None and os.path.exists(self._disk_path(key)):
+            try:
+                value = np.load(self._disk_path(key), mmap_mode='r')
+            except (OSError, ValueError):
+                value = None  # Truncated or corrupt file, treat as a miss
+            if value is not None:
+                try:
+                    os.utime(self._disk_path(key))  # Recently used, so evicted last
+                except OSError:
+                    pass
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+                    self._remember(key, value)
+                return value
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, key, value):
+        """
+        Store value in both tiers. value is marked read-only; pass a copy to keep a writable one.
+        """
+        value = np.asarray(value)
+        value.setflags(write=False)
+        with self._lock:
+            self._remember(key, value)
+        if self.cache_dir is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a per-process, per-thread temporary file first so readers never see a partial array
+            tmp_path = f"{self._disk_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+            np.save(tmp_path, value)
+            os.replace(tmp_path, self._disk_path(key))
+            self._trim_disk()
+        except OSError:
+            pass  # Disk tier is best effort
+
+    def _trim_disk(self):
+        # Delete the least recently used files until the directory fits in max_disk_bytes
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npy") and not entry.name.endswith(".tmp.npy"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # Removed by another process meanwhile
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # Still mapped elsewhere (Windows) or already gone
+            total -= size
+            with self._lock:
+                self.stats['disk_evictions'] += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Cached array for key, calling compute() and storing its result on a miss.
+        """
+        value = self.get(key)
+        if value is None:
+            value = np.asarray(compute())
+            self.put(key, value)
+        return value
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def clear(self, disk=False):
+        """
+        Drop the memory tier, and the disk tier too if disk is True.
+        """
+        with self._lock:
+            self._memory.clear()
+        if disk and self.cache_dir is not None and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".npy"):
+                    os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,283 @@
+import os
+from collections import namedtuple
+import numpy as np
+import Calculations
+import Catalog
+
+# One comet found by a query: catalog row, name and closest distance of its track (AU)
+TrackHit = namedtuple("TrackHit", ["index", "name", "distance"])
+
+INDEX_PATH = os.path.splitext(Catalog.CSV_PATH)[0] + ".tracks.npz"
+
+# Cell coordinates are packed into one int64 key, 21 bits per axis
+_BITS = 21
+_OFFSET = 2 ** (_BITS - 1)
+
+
+def sample_track(e, q, i, w, Node, resolution=0.01, max_distance=50.0):
+    """
+    Points along one orbit, spaced evenly in arc length at no more than resolution apart.
+
+    Parameters:
+    - e, q, i, w, Node: Orbital elements (q in AU, angles in degrees)
+    - resolution: Largest allowed spacing between neighbouring points (AU)
+    - max_distance: Open (parabolic and hyperbolic) orbits are cut off at this heliocentric distance (AU)
+
+    Returns:
+    - points: Array of shape (P, 3) (AU)
+    """
+    angles = np.radians([i, w, Node])
+    limit = float(Calculations.max_true_anomaly(e))
+    if e >= 1:
+        # Stop the open branches where they leave max_distance
+        cos_nu = (q * (1 + e) / max_distance - 1) / e
+        limit = min(limit, float(np.arccos(np.clip(cos_nu, -1, 1))))
+
+    # Arc length along a dense true-anomaly grid, then resample it evenly
+    nu = np.linspace(-limit, limit, 8193)
+    dense = Calculations.conic_positions(nu, e, q, *angles)
+    arc = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(dense, axis=0), axis=1))])
+    # The dense polyline slightly underestimates the arc, so aim a little below resolution
+    num_points = int(np.ceil(arc[-1] / (0.98 * resolution))) + 1
+    nu = np.interp(np.linspace(0, arc[-1], num_points), arc, nu)
+    if e < 1:
+        nu = nu[:-1]  # Closed orbit: the last point repeats the first
+    return Calculations.conic_positions(nu, e, q, *angles)
+
+
+def _cell_keys(cells):
+    cells = cells.astype(np.int64) + _OFFSET
+    return (cells[..., 0] << (2 * _BITS)) | (cells[..., 1] << _BITS) | cells[..., 2]
+
+
+class TrackIndex:
+    """
+    Uniform-grid spatial index over the sampled orbit tracks of a whole catalog.
+
+    Every track is sampled at most resolution AU apart (sample_track) and its points are bucketed into
+    cubic cells of cell_size AU, sorted by cell so a query only visits the cells its search sphere
+    overlaps. Queries return distinct comets with the closest distance of their sampled track, which is
+    within resolution / 2 of the distance to the true orbit.
+
+    Changing a comet's elements (update or refresh) does not rebuild the grid: the comet's old points are
+    masked out and its new track goes into a small delta set that queries search by brute force. The delta
+    set is merged into the grid once it grows past compact_fraction of the indexed points.
+    """
+
+    def __init__(self, elements, names, resolution=0.01, cell_size=0.25, max_distance=50.0, compact_fraction=0.1):
+        self.resolution = resolution
+        self.cell_size = cell_size
+        self.max_distance = max_distance
+        self.compact_fraction = compact_fraction
+        self.elements = np.array(elements, dtype=float).reshape(-1, 5)
+        self.names = np.asarray(names).astype(str)
+
+        tracks = [sample_track(*row, resolution, max_distance) for row in self.elements]
+        self._set_grid(np.concatenate(tracks) if tracks else np.empty((0, 3)),
+                       np.repeat(np.arange(len(tracks)), [len(t) for t in tracks]))
+
+    @classmethod
+    def from_catalog(cls, df=None, **kwargs):
+        """
+        Index over every comet of a CometCatalog (or DataFrame); the default catalog if None.
+        """
+        catalog = Catalog.as_catalog(df)
+        return cls(_catalog_elements(catalog), catalog["Object"], **kwargs)
+
+    def _set_grid(self, points, owner):
+        keys = _cell_keys(np.floor(points / self.cell_size))
+        order = np.argsort(keys, kind='stable')
+        self.points, self.owner, self.keys = points[order], owner[order], keys[order]
+        self.stale = np.zeros(len(self.points), dtype=bool)
+        self.delta_points = np.empty((0, 3))
+        self.delta_owner = np.empty(0, dtype=int)
+
+    def __len__(self):
+        return len(self.elements)
+
+    # Incremental updates
+
+    def update(self, row, elements):
+        """
+        Replace the elements (e, q, i, w, Node) of the comet at row, or append a comet if row == len(self).
+        """
+        elements = np.asarray(elements, dtype=float)
+        if row == len(self.elements):
+            self.elements = np.vstack([self.elements, elements])
+            self.names = np.append(self.names, f"#{row}")
+        else:
+            self.elements[row] = elements
+            self.stale |= self.owner == row
+            keep = self.delta_owner != row
+            self.delta_points, self.delta_owner = self.delta_points[keep], self.delta_owner[keep]
+
+        track = sample_track(*elements, self.resolution, self.max_distance)
+        self.delta_points = np.concatenate([self.delta_points, track])
+        self.delta_owner = np.concatenate([self.delta_owner, np.full(len(track), row)])
+        if len(self.delta_points) > self.compact_fraction * max(len(self.points), 1):
+            self.compact()
+
+    def refresh(self, df=None):
+        """
+        Bring the index in line with a catalog, resampling only the comets whose elements changed or that
+        were added. Returns the rows that were updated.
+        """
+        catalog = Catalog.as_catalog(df)
+        elements = _catalog_elements(catalog)
+        known = min(len(elements), len(self.elements))
+        same = np.all((elements[:known] == self.elements[:known])
+                      | (np.isnan(elements[:known]) & np.isnan(self.elements[:known])), axis=1)
+        changed = np.concatenate([np.nonzero(~same)[0], np.arange(known, len(elements))])
+        for row in changed:
+            self.update(row, elements[row])
+        if len(elements) < len(self.elements):
+            # Rows were removed: resampling nothing, just drop their points
+            self.elements = self.elements[:len(elements)]
+            self.stale |= self.owner >= len(elements)
+            keep = self.delta_owner < len(elements)
+            self.delta_points, self.delta_owner = self.delta_points[keep], self.delta_owner[keep]
+            self.compact()
+        self.names = catalog["Object"].astype(str)
+        return changed
+
+    def compact(self):
+        """
+        Merge the delta set into the grid and drop masked points.
+        """
+        live = ~self.stale
+        self._set_grid(np.concatenate([self.points[live], self.delta_points]),
+                       np.concatenate([self.owner[live], self.delta_owner]))
+
+    # Queries
+
+    def _candidates(self, points, radius):
+        # Pairs (query point, indexed point) whose cells lie within radius of each other
+        reach = int(np.ceil(radius / self.cell_size))
+        steps = np.arange(-reach, reach + 1)
+        offsets = np.stack(np.meshgrid(steps, steps, steps, indexing='ij'), axis=-1).reshape(-1, 3)
+        cells = np.floor(points / self.cell_size).astype(np.int64)
+        keys = _cell_keys(cells[:, None, :] + offsets[None, :, :])
+
+        starts = np.searchsorted(self.keys, keys.ravel(), side='left')
+        stops = np.searchsorted(self.keys, keys.ravel(), side='right')
+        lengths = stops - starts
+        query = np.repeat(np.repeat(np.arange(len(points)), len(offsets)), lengths)
+        # Expand every [start, stop) range into its indices
+        first = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        indexed = first + np.arange(lengths.sum())
+        return query, indexed
+
+    @staticmethod
+    def _min_distance(points, targets, max_pairs=2 ** 20):
+        # Distance from every target to the closest query point, in chunks of query points
+        best = np.full(len(targets), np.inf)
+        step = max(1, max_pairs // max(len(targets), 1))
+        for start in range(0, len(points), step):
+            chunk = points[start:start + step]
+            distance = np.linalg.norm(targets[None, :, :] - chunk[:, None, :], axis=-1)
+            best = np.minimum(best, distance.min(axis=0))
+        return best
+
+    def _nearest_per_comet(self, points, radius):
+        # Closest distance of every comet whose track comes within radius of any query point
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        num_cells = (2 * int(np.ceil(radius / self.cell_size)) + 1) ** 3
+        if num_cells * len(points) > len(self.points):
+            # The search spheres cover most of the grid: scanning every point is cheaper
+            distance = np.where(self.stale, np.inf, self._min_distance(points, self.points))
+            owner = self.owner
+        else:
+            query, indexed = self._candidates(points, radius)
+            live = ~self.stale[indexed]
+            query, indexed = query[live], indexed[live]
+            distance = np.linalg.norm(self.points[indexed] - points[query], axis=1)
+            owner = self.owner[indexed]
+
+        if len(self.delta_points):
+            distance = np.concatenate([distance, self._min_distance(points, self.delta_points)])
+            owner = np.concatenate([owner, self.delta_owner])
+
+        inside = distance <= radius
+        best = np.full(len(self.elements), np.inf)
+        np.minimum.at(best, owner[inside], distance[inside])
+        return best
+
+    def _hits(self, best, limit=None):
+        rows = np.nonzero(np.isfinite(best))[0]
+        rows = rows[np.argsort(best[rows], kind='stable')][:limit]
+        return [TrackHit(int(row), str(self.names[row]), float(best[row])) for row in rows]
+
+    def within(self, points, radius):
+        """
+        Comets whose tracks pass within radius (AU) of a point, or of any of several points (an array of
+        shape (Q, 3), e.g. a sampled spacecraft trajectory or Earth's orbit). Returns TrackHits, nearest
+        first.
+        """
+        return self._hits(self._nearest_per_comet(points, radius))
+
+    def nearest(self, points, k=1):
+        """
+        The k comets whose tracks come closest to a point (or to any of several points), nearest first.
+        """
+        span = np.max(np.abs(self.points)) if len(self.points) else self.max_distance
+        radius = self.cell_size
+        while True:
+            best = self._nearest_per_comet(points, radius)
+            # Every comet closer than radius has been seen, so the k best are final
+            if np.count_nonzero(np.isfinite(best)) >= k or radius > 2 * (span + self.max_distance):
+                return self._hits(best, k)
+            radius *= 2
+
+    # Persistence
+
+    def save(self, path=INDEX_PATH):
+        """
+        Write the index to an .npz file (compacting it first).
+        """
+        self.compact()
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, elements=self.elements, names=self.names, points=self.points, owner=self.owner,
+                 keys=self.keys, settings=[self.resolution, self.cell_size, self.max_distance, self.compact_fraction])
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        index = cls.__new__(cls)
+        with np.load(path, allow_pickle=False) as saved:
+            index.resolution, index.cell_size, index.max_distance, index.compact_fraction = saved['settings']
+            index.elements, index.names = saved['elements'], saved['names']
+            index.points, index.owner, index.keys = saved['points'], saved['owner'], saved['keys']
+        index.stale = np.zeros(len(index.points), dtype=bool)
+        index.delta_points = np.empty((0, 3))
+        index.delta_owner = np.empty(0, dtype=int)
+        return index
+
+
+def _catalog_elements(catalog):
+    return np.column_stack([catalog[column] for column in ("e", "q", "i", "w", "Node")])
+
+
+def load_index(df=None, path=INDEX_PATH, resolution=0.01, cell_size=0.25):
+    """
+    The track index for a catalog, read from path when a saved index exists.
+
+    A saved index built with other settings is rebuilt; one built from older elements is refreshed for the
+    comets that changed. Whenever the index changes it is saved back to path.
+    """
+    catalog = Catalog.as_catalog(df)
+    index = None
+    if os.path.exists(path):
+        try:
+            index = TrackIndex.load(path)
+        except (OSError, KeyError, ValueError):
+            index = None  # Unreadable file, rebuild
+    if index is None or index.resolution != resolution or index.cell_size != cell_size:
+        index = TrackIndex.from_catalog(catalog, resolution=resolution, cell_size=cell_size)
+    elif not len(index.refresh(catalog)):
+        return index
+
+    try:
+        index.save(path)
+    except OSError:
+        pass  # Read-only location, the index still works in memory
+    return index
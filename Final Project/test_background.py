@@ -0,0 +1,128 @@
+"""
+Tests for BackgroundRunner, driven without Tk through a stand-in root that runs root.after callbacks on demand.
+"""
+import threading
+import time
+import Background
+
+
+class FakeRoot:
+    def __init__(self):
+        self.pending = []
+
+    def after(self, delay, callback):
+        self.pending.append(callback)
+
+    def poll(self, runner, timeout=5.0):
+        # Run the scheduled polls, as the Tk main loop would, until the runner has nothing left
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            callbacks, self.pending = self.pending, []
+            for callback in callbacks:
+                callback()
+            time.sleep(0.001)
+        assert not runner.busy()
+
+
+def test_repeated_submit_joins_running_job():
+    root = FakeRoot()
+    runner = Background.BackgroundRunner(root)
+    release = threading.Event()
+    runs, results = [], []
+
+    def work(job, value):
+        runs.append(value)
+        release.wait(5)
+        return value * 2
+
+    first = runner.submit('track', work, 21, on_done=results.append)
+    second = runner.submit('track', work, 21, on_done=results.append)
+    release.set()
+    root.poll(runner)
+
+    assert second is first
+    assert runs == [21] and results == [42]
+    runner.shutdown()
+
+
+def test_cancelled_job_reports_nothing():
+    root = FakeRoot()
+    runner = Background.BackgroundRunner(root)
+    started, release = threading.Event(), threading.Event()
+    results, errors = [], []
+
+    def work(job):
+        started.set()
+        release.wait(5)
+        job.check_cancelled()
+        return "result"
+
+    runner.submit('track', work, on_done=results.append, on_error=errors.append)
+    started.wait(5)
+    runner.cancel('track')
+    release.set()
+    root.poll(runner)
+
+    assert results == [] and errors == []
+    runner.shutdown()
+
+
+def test_failing_callback_does_not_stop_polling():
+    root = FakeRoot()
+    callback_errors, results = [], []
+    runner = Background.BackgroundRunner(root, on_callback_error=callback_errors.append)
+
+    def broken(result):
+        raise RuntimeError("callback failed")
+
+    runner.submit('first', lambda job: 1, on_done=broken)
+    runner.submit('second', lambda job: 2, on_done=results.append)
+    root.poll(runner)
+
+    assert [str(error) for error in callback_errors] == ["callback failed"]
+    assert results == [2]
+    runner.shutdown()
+
+
+def test_job_errors_reach_on_error():
+    root = FakeRoot()
+    runner = Background.BackgroundRunner(root)
+    errors = []
+
+    def work(job):
+        raise ValueError("bad comet")
+
+    runner.submit('guess', work, on_error=errors.append)
+    root.poll(runner)
+
+    assert [str(error) for error in errors] == ["bad comet"]
+    runner.shutdown()
+
+
+def test_cancel_keeps_catalog_load():
+    # Cancel pressed while the catalog is still loading and a track is computing, as Main.cancel_computations does
+    root = FakeRoot()
+    runner = Background.BackgroundRunner(root)
+    started, release = threading.Event(), threading.Event()
+    loaded, tracks = [], []
+
+    def load_catalog(job):
+        release.wait(5)
+        return "catalog"
+
+    def compute_track(job):
+        started.set()
+        release.wait(5)
+        job.check_cancelled()
+        return "track"
+
+    runner.submit('catalog', load_catalog, on_done=loaded.append)
+    runner.submit(('animate', '1p/halley'), compute_track, on_done=tracks.append)
+    started.wait(5)
+    runner.cancel(keep=('catalog',))
+    release.set()
+    root.poll(runner)
+
+    assert loaded == ["catalog"]
+    assert tracks == []
+    runner.shutdown()
@@ -0,0 +1,63 @@
+"""
+Tests for the headless batch CLI.
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import BatchRun
+import Calculations
+import Catalog
+import OrbitCache
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), Catalog.CSV_PATH)
+
+
+@pytest.fixture
+def shared_cache(tmp_path, monkeypatch):
+    cache = OrbitCache.OrbitCache(cache_dir=str(tmp_path / "shared"))
+    monkeypatch.setattr(Calculations, "track_cache", cache)
+    return cache
+
+
+def test_process_comet_record(tmp_path, shared_cache):
+    record = BatchRun.process_comet("1P/Halley", CSV_PATH, num_points=100, positions_dir=str(tmp_path))
+
+    assert 'error' not in record
+    actual_params = Catalog.load_catalog(CSV_PATH).elements("1P/Halley")
+    assert record['actual_params'] == dict(zip(Catalog.ELEMENT_COLUMNS, actual_params))
+    assert record['metrics']['chi_squared'] > 0
+    assert record['positions'] == os.path.join(str(tmp_path), "1P_Halley.npz")
+    with np.load(record['positions']) as saved:
+        assert saved['actual_positions'].shape == saved['guess_positions'].shape == (100, 3)
+    assert len(os.listdir(shared_cache.cache_dir)) == 2
+
+
+def test_process_comet_without_cache(shared_cache):
+    record = BatchRun.process_comet("2P/Encke", CSV_PATH, num_points=100, use_cache=False)
+
+    assert 'error' not in record
+    assert Calculations.track_cache is shared_cache
+    assert shared_cache.stats == {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_evictions': 0}
+    assert not os.path.exists(shared_cache.cache_dir)
+
+
+def test_run_writes_records_in_order(shared_cache):
+    output = io.StringIO()
+    failures = BatchRun.run(["2P/Encke", "No Such Comet", "1P/Halley"], output, workers=1, catalog_path=CSV_PATH,
+                            num_points=50, use_cache=False)
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record['name'] for record in records] == ["2P/Encke", "No Such Comet", "1P/Halley"]
+    assert failures == 1
+    assert records[1]['error'] == "ValueError: No comet found with name No Such Comet"
+
+
+def test_batch_run_does_not_import_matplotlib():
+    code = "import sys, BatchRun; print(any(name.startswith('matplotlib') for name in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,31 @@
+"""
+Tests for the benchmark regression gate.
+"""
+import json
+import Benchmark
+
+
+def test_compare_thresholds():
+    baseline = {'fast': {'time': 1e-4, 'peak_bytes': 1000},
+                'slow': {'time': 1.0, 'peak_bytes': 10 ** 6},
+                'memory': {'time': 1.0, 'peak_bytes': 10 ** 6},
+                'kepler': {'time': 1.0, 'peak_bytes': 10 ** 6, 'iterations': 4}}
+    results = {'fast': {'time': 5e-4, 'peak_bytes': 1000},  # 5x slower, but by less than min_slowdown
+               'slow': {'time': 2.0, 'peak_bytes': 10 ** 6},
+               'memory': {'time': 1.0, 'peak_bytes': 2 * 10 ** 6},
+               'kepler': {'time': 1.0, 'peak_bytes': 10 ** 6, 'iterations': 5},
+               'new': {'time': 9.0, 'peak_bytes': 0}}  # Not in the baseline yet
+
+    assert Benchmark.compare(results, baseline, tolerance=0.5) == ['slow', 'memory', 'kepler']
+
+
+def test_first_run_writes_machine_baseline(tmp_path, monkeypatch):
+    results = {'case': {'time': 1.0, 'peak_bytes': 100}}
+    monkeypatch.setattr(Benchmark, "run_cases", lambda quick=False: results)
+    path = tmp_path / "baseline.json"
+
+    assert Benchmark.main(["--baseline", str(path)]) == 0
+    assert json.loads(path.read_text()) == results
+
+    results['case'] = {'time': 3.0, 'peak_bytes': 100}
+    assert Benchmark.main(["--baseline", str(path)]) == 1
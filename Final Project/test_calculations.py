@@ -0,0 +1,137 @@
+"""
+Tests for the Calculations orbit geometry and Kepler solvers.
+
+Run from this directory with: python -m pytest -q
+"""
+import os
+import numpy as np
+import pytest
+from scipy.optimize import brentq, newton
+import Calculations
+import Catalog
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), Catalog.CSV_PATH)
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return Catalog.load_catalog(CSV_PATH)
+
+
+def _newton_anomaly(M, e):
+    # The per-point scipy loop orbit_positions used before it was vectorized
+    return np.array([newton(Calculations.kepler_eq, m, fprime=lambda E, m, e: 1 - e * np.cos(E), args=(m, e),
+                            tol=1e-14) for m in M])
+
+
+@pytest.mark.parametrize("e", [0.0, 0.2, 0.5, 0.7, 0.9])
+def test_solve_kepler_matches_newton_loop(e):
+    M = np.linspace(0, 2 * np.pi, 200)
+    np.testing.assert_allclose(Calculations.solve_kepler(M, e), _newton_anomaly(M, e), rtol=0, atol=1e-10)
+
+
+def test_solve_kepler_near_parabolic():
+    M = np.linspace(-20, 20, 2001)
+    e = np.array([0.99, 0.999, 0.9999])[:, None]
+    E = Calculations.solve_kepler(M, e)
+    assert np.max(np.abs(Calculations.kepler_eq(E, M, e))) < 1e-12
+
+
+def test_orbit_positions_matches_newton_loop(catalog):
+    for name in ["2P/Encke", "1P/Halley", "55P/Tempel-Tuttle"]:
+        e, q, i, w, Omega, TP = catalog.elements(name)
+        a = q / (1 - e)
+        nu = Calculations.true_anomaly(_newton_anomaly(np.linspace(0, 2 * np.pi, 300), e), e)
+        r = a * (1 - e ** 2) / (1 + e * np.cos(nu))
+        expected = Calculations.perifocal_to_ecliptic(r * np.cos(nu), r * np.sin(nu), *np.radians([i, w, Omega]))
+        np.testing.assert_allclose(Calculations.orbit_positions(e, a, i, w, Omega, TP, 300), expected, rtol=0,
+                                   atol=1e-9 * a)
+
+
+def test_universal_ephemeris_matches_ephemeris(catalog):
+    elements = catalog.element_table[catalog["e"] < 0.99]
+    TP = elements["TP"]
+    jd = np.linspace(TP.min() - 4000, TP.max() + 4000, 50)
+    np.testing.assert_allclose(Calculations.universal_ephemeris(jd, elements), Calculations.ephemeris(jd, elements),
+                               rtol=0, atol=1e-8)
+
+
+@pytest.mark.parametrize("e", [1.0001, 1.05, 1.5, 3.0])
+def test_universal_ephemeris_hyperbolic(e):
+    # Reference positions from e*sinh(H) - H = M, solved by bisection, in the orbital plane (i = w = Node = 0)
+    q, TP = 0.8, 2460000.5
+    a = q / (e - 1)
+    dt = np.array([-3000, -400, -30, -1, 0, 0.5, 20, 365, 5000])
+    M = np.sqrt(Calculations.GM_SUN / a ** 3) * dt
+    H = np.array([brentq(lambda h: e * np.sinh(h) - h - m, -50, 50, xtol=1e-15) for m in M])
+    expected = np.stack([a * (e - np.cosh(H)), a * np.sqrt(e ** 2 - 1) * np.sinh(H), np.zeros_like(H)], axis=-1)
+
+    positions = Calculations.universal_ephemeris(TP + dt, e, q, 0.0, 0.0, 0.0, TP)
+    np.testing.assert_allclose(positions, expected, rtol=1e-9, atol=1e-10)
+
+
+def test_universal_ephemeris_flags_unconverged():
+    positions = Calculations.universal_ephemeris([2460000.5, 2470000.5], 1.5, 0.8, 10.0, 20.0, 30.0, 2460000.5,
+                                                 max_iter=1)
+    assert np.isnan(positions[1]).all()
+
+
+def test_compact_positions_error_bound():
+    positions = np.random.default_rng(0).uniform(-35, 35, (1000, 3))
+    compact, error_bound = Calculations.compact_positions(positions)
+    assert compact.dtype == np.float32
+    assert np.max(np.linalg.norm(compact - positions, axis=-1)) <= error_bound
+    assert error_bound * Calculations.AU_KM < 580  # The figure the docstring quotes for 35 AU
+
+
+def test_conic_positions_matches_orbit_positions():
+    e, a, i, w, Omega = 0.7, 2.0, 20.0, 50.0, 80.0
+    M = np.linspace(0, 2 * np.pi, 100)
+    nu = Calculations.true_anomaly(Calculations.solve_kepler(M, e), e)
+    positions = Calculations.conic_positions(nu, e, a * (1 - e), *np.radians([i, w, Omega]))
+    np.testing.assert_allclose(positions, Calculations.orbit_positions(e, a, i, w, Omega, 0.0, 100), atol=1e-12)
+
+
+def test_max_true_anomaly():
+    limit = Calculations.max_true_anomaly(np.array([0.0, 0.9, 1.0, 2.0]))
+    np.testing.assert_allclose(limit, [np.pi, np.pi, np.pi, 2 * np.pi / 3], rtol=1e-5)
+    # Just inside the asymptote, where the radius is large but finite
+    radius = np.linalg.norm(Calculations.conic_positions(limit[3], 2.0, 1.0, 0.0, 0.0, 0.0))
+    assert 1e3 < radius < np.inf
+
+
+def _polyline_error(positions, e, a, samples=64):
+    # Brute force: distance from many ellipse points inside every segment to that segment's chord, for an
+    # orbit in its own plane (i = w = Omega = 0)
+    b = a * np.sqrt(1 - e ** 2)
+    E = np.unwrap(np.arctan2(positions[:, 1] / b, positions[:, 0] / a + e))
+    fractions = np.linspace(0, 1, samples)
+    E_inside = E[:-1, None] + fractions * np.diff(E)[:, None]
+    arc = np.stack([a * (np.cos(E_inside) - e), b * np.sin(E_inside)], axis=-1)
+    start, chord = positions[:-1, None, :2], np.diff(positions[:, :2], axis=0)[:, None, :]
+    t = np.clip(np.sum((arc - start) * chord, axis=-1) / np.sum(chord ** 2, axis=-1), 0, 1)
+    return np.max(np.linalg.norm(arc - start - t[..., None] * chord, axis=-1))
+
+
+@pytest.mark.parametrize("e, a, tolerance", [(0.0, 1.0, 1e-4), (0.5, 2.0, 1e-3), (0.967, 17.8, 1e-3),
+                                             (0.995, 100.0, 1e-2)])
+def test_adaptive_orbit_positions_meets_tolerance(e, a, tolerance):
+    positions, achieved_error = Calculations.adaptive_orbit_positions(e, a, 0.0, 0.0, 0.0, 0.0, tolerance)
+
+    np.testing.assert_allclose(positions[0], positions[-1], atol=1e-12)
+    assert positions[0] == pytest.approx([a * (1 - e), 0, 0], abs=1e-12)  # Starts at perihelion
+    measured = _polyline_error(positions, e, a)
+    assert measured <= tolerance
+    assert achieved_error == pytest.approx(measured, rel=1e-3)
+
+    if e > 0.9:
+        # Uniform sampling in mean anomaly with as many points misses the tolerance by far
+        uniform = Calculations.orbit_positions(e, a, 0.0, 0.0, 0.0, 0.0, len(positions))
+        assert _polyline_error(np.vstack([uniform, uniform[:1]]), e, a) > 10 * tolerance
+
+
+def test_adaptive_orbit_positions_orientation():
+    flat, _ = Calculations.adaptive_orbit_positions(0.6, 3.0, 0.0, 0.0, 0.0, 0.0)
+    positions, _ = Calculations.adaptive_orbit_positions(0.6, 3.0, 25.0, 40.0, 110.0, 0.0)
+    expected = Calculations.perifocal_to_ecliptic(flat[:, 0], flat[:, 1], *np.radians([25.0, 40.0, 110.0]))
+    np.testing.assert_allclose(positions, expected, atol=1e-12)
@@ -0,0 +1,87 @@
+"""
+Tests for the load-once comet catalog and its .npz sidecar.
+"""
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+import Catalog
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), Catalog.CSV_PATH)
+
+
+@pytest.fixture
+def csv_copy(tmp_path):
+    path = str(tmp_path / "comets.csv")
+    shutil.copy(CSV_PATH, path)
+    return path
+
+
+def test_matches_pandas(csv_copy):
+    df = pd.read_csv(csv_copy)
+    catalog = Catalog.CometCatalog.from_csv(csv_copy, use_cache=False)
+
+    assert len(catalog) == len(df)
+    np.testing.assert_array_equal(catalog["e"], df["e"])
+    np.testing.assert_array_equal(catalog["A3"], pd.to_numeric(df["A3"], errors="coerce"))
+    assert list(catalog["Object"]) == list(df["Object"])
+    assert catalog.element_table["q"].base is catalog["q"].base  # Element columns are views into one table
+    assert not os.path.exists(os.path.splitext(csv_copy)[0] + ".npz")
+
+
+def test_lookup_by_either_name_any_case(csv_copy):
+    catalog = Catalog.CometCatalog.from_csv(csv_copy, use_cache=False)
+
+    row = catalog.lookup(" 1p/HALLEY ")
+    assert catalog["Object"][row] == "1P/Halley"
+    assert "2p/encke" in catalog and "No Such Comet" not in catalog
+    assert catalog.find("No Such Comet") is None
+    with pytest.raises(ValueError, match="No comet found with name No Such Comet"):
+        catalog.elements("No Such Comet")
+    assert catalog.elements("1P/Halley") == [0.9671429085, 0.5859781115, 162.2626906, 111.3324851, 58.42008098,
+                                             2446467.395]
+
+
+def test_sidecar_is_reused_until_the_csv_changes(csv_copy, monkeypatch):
+    cache_path = os.path.splitext(csv_copy)[0] + ".npz"
+    first = Catalog.CometCatalog.from_csv(csv_copy)
+    assert os.path.exists(cache_path)
+
+    # A fresh sidecar is read without parsing the CSV
+    monkeypatch.setattr(pd, "read_csv", lambda path: pytest.fail("CSV parsed despite a fresh sidecar"))
+    second = Catalog.CometCatalog.from_csv(csv_copy)
+    for name in Catalog.COLUMNS:
+        np.testing.assert_array_equal(second[name], first[name])
+    monkeypatch.undo()
+
+    # Editing the CSV changes its size and mtime, so the sidecar is stale and rebuilt
+    with open(csv_copy) as f:
+        lines = f.readlines()
+    with open(csv_copy, "w") as f:
+        f.writelines(lines[:1] + [lines[1].replace("1P/Halley", "1P/Halley-edited", 1)] + lines[2:])
+    third = Catalog.CometCatalog.from_csv(csv_copy)
+    assert third["Object"][0] == "1P/Halley-edited"
+    assert Catalog.CometCatalog.from_csv(csv_copy)["Object"][0] == "1P/Halley-edited"
+
+
+def test_unreadable_sidecar_falls_back_to_csv(csv_copy):
+    with open(os.path.splitext(csv_copy)[0] + ".npz", "wb") as f:
+        f.write(b"not an npz file")
+
+    assert len(Catalog.CometCatalog.from_csv(csv_copy)) == len(pd.read_csv(csv_copy))
+
+
+def test_from_frame_and_back(csv_copy):
+    df = pd.read_csv(csv_copy, dtype=str)  # Numbers as strings, as a table editor hands them back
+    catalog = Catalog.as_catalog(df)
+
+    assert catalog["e"].dtype == np.float64
+    frame = catalog.to_frame()
+    assert list(frame.columns) == Catalog.COLUMNS
+    np.testing.assert_array_equal(frame["q"], pd.read_csv(csv_copy)["q"])
+    assert Catalog.as_catalog(catalog) is catalog
+
+
+def test_load_catalog_loads_once(csv_copy):
+    assert Catalog.load_catalog(csv_copy) is Catalog.load_catalog(csv_copy)
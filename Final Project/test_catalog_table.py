@@ -0,0 +1,67 @@
+"""
+Tests for the catalog table's vectorized filtering and sorting (no window is opened).
+"""
+import os
+import numpy as np
+import pytest
+import Catalog
+
+CatalogTable = pytest.importorskip("CatalogTable")  # Needs tkinter installed, not a display
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), Catalog.CSV_PATH)
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return Catalog.load_catalog(CSV_PATH)
+
+
+@pytest.fixture(scope="module")
+def frame(catalog):
+    return catalog.to_frame()
+
+
+@pytest.mark.parametrize("expression, query", [
+    ("q < 1 and MOID < 0.05", "q < 1 and MOID < 0.05"),
+    ("q<1 & MOID<=0.1, e >= 0.5", "q < 1 and MOID <= 0.1 and e >= 0.5"),
+    ("i > 90 AND e != 0.5", "i > 90 and e != 0.5"),
+    ("A3 > -1", "A3 > -1"),  # Missing values never match
+])
+def test_filter_mask_matches_pandas(catalog, frame, expression, query):
+    mask = CatalogTable.filter_mask(catalog, expression)
+    np.testing.assert_array_equal(mask, frame.eval(query).to_numpy())
+
+
+def test_filter_mask_text_columns(catalog):
+    mask = CatalogTable.filter_mask(catalog, "Object == '1p/halley'")
+    assert list(np.nonzero(mask)[0]) == [catalog.lookup("1P/Halley")]
+    assert CatalogTable.filter_mask(catalog, "Object != 1P/Halley").sum() == len(catalog) - 1
+    assert CatalogTable.filter_mask(catalog, "  ").all()
+
+
+@pytest.mark.parametrize("expression, message", [
+    ("q <", "Cannot parse"),
+    ("size > 1", "Unknown column"),
+    ("Object < b", "only supports == and !="),
+    ("q < one", "is not a number"),
+])
+def test_filter_mask_rejects_bad_clauses(catalog, expression, message):
+    with pytest.raises(ValueError, match=message):
+        CatalogTable.filter_mask(catalog, expression)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_sort_rows_numeric_missing_last(catalog, frame, descending):
+    rows = np.nonzero(CatalogTable.filter_mask(catalog, "q < 2"))[0]
+    ordered = CatalogTable.sort_rows(catalog, rows, "A3", descending)
+
+    expected = frame.iloc[rows].sort_values("A3", ascending=not descending, kind="stable", na_position="last")
+    np.testing.assert_array_equal(ordered, expected.index)  # The frame's index is the row number
+
+
+def test_sort_rows_text_ignores_case(catalog):
+    rows = np.arange(len(catalog))
+    names = [name.lower() for name in catalog["Object"][CatalogTable.sort_rows(catalog, rows, "Object")]]
+    assert names == sorted(names)
+    reverse = CatalogTable.sort_rows(catalog, rows, "Object", descending=True)
+    assert [name.lower() for name in catalog["Object"][reverse]] == names[::-1]
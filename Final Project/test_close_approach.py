@@ -0,0 +1,69 @@
+"""
+Tests for the streaming close-approach search.
+"""
+import os
+import numpy as np
+import pytest
+import Calculations
+import Catalog
+import CloseApproach
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), Catalog.CSV_PATH)
+START_JD = 2460000.5
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return Catalog.load_catalog(CSV_PATH)
+
+
+def _grazing_catalog(catalog, tp):
+    # One comet whose perihelion (1 AU, in the ecliptic) is where Earth is at tp
+    frame = catalog.to_frame().iloc[:1].copy()
+    longitude = np.degrees(np.arctan2(*CloseApproach.earth_position(tp)[1::-1]))
+    frame[["e", "q", "i", "w", "Node", "TP"]] = [0.6, 1.0, 0.0, longitude, 0.0, tp]
+    return Catalog.CometCatalog.from_frame(frame)
+
+
+def test_finds_known_encounter(catalog):
+    tp = START_JD + 123.4
+    found = list(CloseApproach.close_approaches(START_JD, START_JD + 400, 0.05, _grazing_catalog(catalog, tp)))
+
+    assert len(found) == 1
+    assert found[0].index == 0 and found[0].name == catalog["Object"][0]
+    assert found[0].jd == pytest.approx(tp, abs=1e-3)
+    assert found[0].distance < 1e-6
+
+
+def test_matches_fine_grid_scan(catalog):
+    end_jd = START_JD + 730
+    found = list(CloseApproach.close_approaches(START_JD, end_jd, 0.5, catalog, chunk_days=200))
+
+    # Brute force: local minima on a grid 20 times finer
+    times = np.arange(START_JD, end_jd, 0.05)
+    elements = [catalog[k] for k in Catalog.ELEMENT_COLUMNS]
+    distance = np.linalg.norm(Calculations.ephemeris(times, *elements) - CloseApproach.earth_position(times), axis=-1)
+    is_min = (distance[:, 1:-1] < distance[:, :-2]) & (distance[:, 1:-1] <= distance[:, 2:])
+    rows, cols = np.nonzero(is_min & (distance[:, 1:-1] < 0.5))
+
+    assert len(found) > 0
+    assert sorted(a.index for a in found) == sorted(rows)
+    for row, jd in zip(rows, times[cols + 1]):
+        assert any(a.index == row and abs(a.jd - jd) <= 0.05 for a in found)
+    for approach in found:
+        nearby = np.abs(times - approach.jd) < 1
+        assert approach.distance <= distance[approach.index, nearby].min() + 1e-12
+        assert approach.distance < 0.5 and START_JD <= approach.jd < end_jd
+
+
+def test_chunking_does_not_change_results(catalog):
+    whole = list(CloseApproach.close_approaches(START_JD, START_JD + 1000, 0.3, catalog, chunk_days=5000))
+    chunked = list(CloseApproach.close_approaches(START_JD, START_JD + 1000, 0.3, catalog, chunk_days=97))
+
+    key = lambda approach: (approach.index, approach.jd)
+    assert len(whole) > 0
+    for a, b in zip(sorted(whole, key=key), sorted(chunked, key=key)):
+        assert a.index == b.index
+        assert a.jd == pytest.approx(b.jd, abs=1e-6)
+        assert a.distance == pytest.approx(b.distance, abs=1e-12)
+    assert len(whole) == len(chunked)
@@ -0,0 +1,62 @@
+"""
+Tests for the memory-mapped ephemeris export.
+"""
+import os
+import numpy as np
+import pytest
+import Calculations
+import Catalog
+import EphemerisExport
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), Catalog.CSV_PATH)
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return Catalog.load_catalog(CSV_PATH)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_export_ephemeris_resume(tmp_path, catalog):
+    names = ["1P/Halley", "2P/Encke", "55P/Tempel-Tuttle"]
+    path = str(tmp_path / "table.npy")
+    arguments = dict(step=10.0, df=catalog, names=names, chunk_size=7)
+    start_jd, end_jd = 2460000.5, 2460500.5
+
+    def interrupt(fraction):
+        if fraction > 0.3:
+            raise Interrupted
+
+    with pytest.raises(Interrupted):
+        EphemerisExport.export_ephemeris(path, start_jd, end_jd, progress=interrupt, **arguments)
+    with pytest.raises(ValueError):
+        EphemerisExport.EphemerisTable(path)
+    partial = EphemerisExport.EphemerisTable(path, allow_partial=True)
+    chunks_done = partial.header['chunks_done']
+    del partial
+    assert chunks_done > 0
+
+    fractions = []
+    table = EphemerisExport.export_ephemeris(path, start_jd, end_jd, progress=fractions.append, **arguments)
+    num_chunks = -(-table.header['num_times'] // 7)
+    assert len(fractions) == num_chunks - chunks_done
+
+    rows = [catalog.lookup(name) for name in names]
+    expected = Calculations.universal_ephemeris(table.jd, catalog.element_table[rows])
+    np.testing.assert_array_equal(np.asarray(table.positions), expected)
+
+
+def test_export_window_and_float32(tmp_path, catalog):
+    path = str(tmp_path / "compact.npy")
+    table = EphemerisExport.export_ephemeris(path, 2460000.5, 2460100.5, step=5.0, df=catalog, names=["2P/Encke"],
+                                             dtype=np.float32)
+    jd, positions = table.window("2p/encke", 2460020.5, 2460040.5)
+
+    np.testing.assert_array_equal(jd, [2460020.5, 2460025.5, 2460030.5, 2460035.5, 2460040.5])
+    exact = Calculations.universal_ephemeris(jd, *catalog.elements("2P/Encke"))
+    _, error_bound = Calculations.compact_positions(exact)
+    assert positions.dtype == np.float32
+    assert np.max(np.linalg.norm(positions - exact, axis=-1)) <= error_bound
@@ -0,0 +1,116 @@
+"""
+Tests for streaming ingestion into the binary catalog store.
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import Catalog
+import Ingest
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), Catalog.CSV_PATH)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return str(tmp_path / "comets.store")
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return pd.read_csv(CSV_PATH, dtype={name: str for name in Catalog.TEXT_COLUMNS})
+
+
+def _write(frame, path):
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def _assert_same_rows(catalog, frame):
+    assert list(catalog["Object"]) == list(frame["Object"])
+    for name in Catalog.NUMERIC_COLUMNS:
+        np.testing.assert_array_equal(catalog[name], frame[name].to_numpy(dtype=float))
+
+
+def test_store_matches_csv_and_drops_bad_rows(tmp_path, store, frame):
+    bad = frame.iloc[:4].copy()
+    bad["Object"] = ["bad e", "bad q", "bad i", ""]
+    bad["e"] = ["-0.5", "0.5", "0.5", "0.5"]
+    bad["q"] = ["1", "not a number", "1", "1"]
+    bad["i"] = ["10", "10", "200", "10"]
+    path = _write(pd.concat([frame.iloc[:50], bad, frame.iloc[50:]]), tmp_path / "mixed.csv")
+
+    read = []
+    summary = Ingest.ingest(path, store, chunksize=37, progress=read.append)
+
+    assert summary == {'added': len(frame), 'dropped': 4, 'replaced': 0, 'resumed': False, 'skipped': False}
+    assert read == list(range(37, len(frame) + 4, 37)) + [len(frame) + 4]
+    _assert_same_rows(Catalog.CometCatalog.from_store(store), frame)
+    assert isinstance(Ingest.read_store(store)["e"], np.memmap)
+
+
+def test_unchanged_contents_are_skipped(tmp_path, store, frame):
+    path = _write(frame, tmp_path / "comets.csv")
+    Ingest.ingest(path, store)
+
+    assert Ingest.ingest(path, store)['skipped']
+    os.utime(path, ns=(0, 0))  # Touched but not changed: fingerprinted, then skipped
+    assert Ingest.ingest(path, store)['skipped']
+    copy = _write(frame, tmp_path / "copy.csv")  # Same contents under another name
+    assert Ingest.ingest(copy, store)['skipped']
+    assert Ingest.read_manifest(store)['rows'] == len(frame)
+
+
+def test_reingest_replaces_old_rows(tmp_path, store, frame):
+    first = _write(frame.iloc[:100], tmp_path / "first.csv")
+    second = _write(frame.iloc[100:], tmp_path / "second.csv")
+    Ingest.ingest(first, store)
+    Ingest.ingest(second, store)
+
+    edited = frame.iloc[:100].copy()
+    edited["q"] = edited["q"].astype(float) * 1.01
+    summary = Ingest.ingest(_write(edited.iloc[:90], first), store)
+
+    assert summary['replaced'] == 100 and summary['added'] == 90
+    # Expect the numbers as pandas parses them back from the rewritten file
+    expected = pd.concat([frame.iloc[100:], pd.read_csv(first, dtype={name: str for name in Catalog.TEXT_COLUMNS})])
+    _assert_same_rows(Catalog.CometCatalog.from_store(store), expected)
+    assert Ingest.read_manifest(store)['generation'] == 1
+    assert sorted(os.listdir(store)) == sorted([Ingest.MANIFEST] + [os.path.basename(Ingest.column_path(store, c, 1))
+                                                                   for c in Catalog.COLUMNS])
+
+
+def test_interrupted_ingest_resumes(tmp_path, store, frame):
+    path = _write(frame, tmp_path / "comets.csv")
+
+    def interrupt(rows_read):
+        if rows_read >= 64:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        Ingest.ingest(path, store, chunksize=32, progress=interrupt)
+    assert Ingest.read_manifest(store)['rows'] == 64
+    # Half-written rows past the last commit are cut off when the store is opened again
+    with open(Ingest.column_path(store, "e", 0), 'ab') as file:
+        file.write(b"\0" * 12)
+    with open(Ingest.column_path(store, "Object", 0), 'ab') as file:
+        file.write(b"partial")
+
+    summary = Ingest.ingest(path, store, chunksize=32)
+
+    assert summary['resumed'] and summary['added'] == len(frame) - 64
+    _assert_same_rows(Catalog.CometCatalog.from_store(store), frame)
+
+
+def test_last_ingested_row_wins(tmp_path, store, frame):
+    Ingest.ingest(_write(frame, tmp_path / "comets.csv"), store)
+    update = frame[frame["Object"] == "2P/Encke"].copy()
+    update["Object"] = "2p/ENCKE"
+    update["q"] = "0.34"
+    Ingest.ingest(_write(update, tmp_path / "update.csv"), store)
+
+    columns = Ingest.read_store(store, mmap=False)
+    assert list(Ingest.latest_rows(columns)) == [row for row in range(len(frame) + 1) if row != 1]
+    catalog = Catalog.CometCatalog.from_store(store)
+    assert len(catalog) == len(frame)
+    assert catalog.elements("2P/Encke")[1] == 0.34
@@ -0,0 +1,64 @@
+"""
+Tests for the Dormand-Prince integrator and checkpointed multi-epoch propagation.
+"""
+import numpy as np
+import pytest
+import Integrators
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _oscillator(t, state, index):
+    # Unit harmonic oscillator, state [x, v]
+    return np.stack([state[:, 1], -state[:, 0]], axis=-1)
+
+
+def test_propagate_checkpoint_resume(tmp_path):
+    state0 = np.array([[1.0, 0.0], [0.0, 2.0], [0.5, -0.5]])
+    epochs = np.linspace(-6, 6, 13)
+    checkpoint = str(tmp_path / "run.npz")
+    calls = []
+
+    def failing(t, state, index):
+        calls.append(None)
+        if len(calls) > 300:
+            raise Interrupted
+        return _oscillator(t, state, index)
+
+    with pytest.raises(Interrupted):
+        Integrators.propagate_to_epochs(failing, 0.0, state0, epochs, checkpoint=checkpoint)
+    done = np.load(checkpoint + ".done.npy")
+    assert 0 < done.sum() < len(epochs)
+
+    resumed_calls, fresh_calls = [], []
+
+    def counting(log):
+        def derivative(t, state, index):
+            log.append(None)
+            return _oscillator(t, state, index)
+        return derivative
+
+    states = Integrators.propagate_to_epochs(counting(resumed_calls), 0.0, state0, epochs, checkpoint=checkpoint)
+    fresh = Integrators.propagate_to_epochs(counting(fresh_calls), 0.0, state0, epochs)
+    np.testing.assert_allclose(states, fresh, rtol=0, atol=1e-8)
+
+    x0, v0 = state0[:, :1], state0[:, 1:]
+    np.testing.assert_allclose(states[..., 0], x0 * np.cos(epochs) + v0 * np.sin(epochs), rtol=0, atol=1e-8)
+    assert len(resumed_calls) < len(fresh_calls)  # Finished epochs were not integrated again
+
+    with pytest.raises(ValueError):
+        Integrators.propagate_to_epochs(_oscillator, 0.0, state0 * 2, epochs, checkpoint=checkpoint)
+
+
+def test_propagate_per_particle_start_times():
+    state0 = np.array([[1.0, 0.0], [0.0, 2.0], [0.5, -0.5]])
+    t0 = np.array([-1.0, 0.5, 2.0])
+    epochs = np.linspace(-4, 4, 9)
+
+    states = Integrators.propagate_to_epochs(_oscillator, t0, state0, epochs)
+
+    x0, v0 = state0[:, :1], state0[:, 1:]
+    dt = epochs - t0[:, None]
+    np.testing.assert_allclose(states[..., 0], x0 * np.cos(dt) + v0 * np.sin(dt), rtol=0, atol=1e-8)
@@ -0,0 +1,49 @@
+"""
+Tests for the vectorized MOID calculator.
+"""
+import os
+import numpy as np
+import pytest
+import Catalog
+import Moid
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), Catalog.CSV_PATH)
+
+
+def _orbit(e, q, i, w, Node):
+    return {'e': e, 'q': q, 'i': i, 'w': w, 'Node': Node}
+
+
+def test_catalog_moid_matches_moid_column():
+    results = Moid.earth_moid_catalog(Catalog.load_catalog(CSV_PATH))
+
+    difference = np.abs(results['difference'])
+    assert np.all(np.isfinite(results['computed']))
+    # The column was computed against the real, perturbed Earth orbit rather than the J2000 mean one
+    assert np.median(difference) < 1e-3
+    assert difference.max() < 2e-3
+
+
+def test_known_distances():
+    # Coplanar circles are always their radius difference apart
+    assert Moid.moid(_orbit(0, 1, 0, 0, 0), _orbit(0, 2.5, 0, 40, 0)) == pytest.approx(1.5, abs=1e-9)
+    # Equal circles in different planes cross at the nodes
+    assert Moid.moid(_orbit(0, 1, 0, 0, 0), _orbit(0, 1, 30, 0, 80)) == pytest.approx(0, abs=1e-8)
+    # A coplanar ellipse from 0.5 to 1.5 AU crosses the unit circle
+    assert Moid.moid(_orbit(0, 1, 0, 0, 0), _orbit(0.5, 0.5, 0, 10, 0)) == pytest.approx(0, abs=1e-8)
+    # Open orbits work as well: a coplanar parabola comes closest at perihelion
+    assert Moid.moid(_orbit(0, 1, 0, 0, 0), _orbit(1.0, 2.0, 0, 10, 20)) == pytest.approx(1.0, abs=1e-8)
+
+
+def test_symmetric_and_batched():
+    a = _orbit(0.1, 1.0, 10, 20, 30)
+    b = _orbit(0.5, 0.8, 50, 60, 70)
+    assert Moid.moid(a, b) == pytest.approx(Moid.moid(b, a), abs=1e-10)
+
+    rng = np.random.default_rng(0)
+    many = _orbit(rng.uniform(0, 0.9, 20), rng.uniform(0.3, 2, 20), rng.uniform(0, 180, 20),
+                  rng.uniform(0, 360, 20), rng.uniform(0, 360, 20))
+    batch, nu_a, nu_b = Moid.moid_batch(many, Moid.EARTH_ELEMENTS, chunk_size=7)
+    single = [Moid.moid({k: v[n] for k, v in many.items()}, Moid.EARTH_ELEMENTS) for n in range(20)]
+    np.testing.assert_allclose(batch, single, atol=1e-12)
+    assert nu_a.shape == nu_b.shape == (20,)
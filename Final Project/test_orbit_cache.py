@@ -0,0 +1,73 @@
+"""
+Tests for the two-tier orbit track cache.
+"""
+import os
+import numpy as np
+import pytest
+import OrbitCache
+
+
+def test_memory_tier_is_lru():
+    cache = OrbitCache.OrbitCache(max_entries=2, cache_dir=None)
+    for key in "abc":
+        if key == "c":
+            cache.get("a")  # Touch a so b is the least recently used
+        cache.put(key, np.full(3, ord(key)))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats['evictions'] == 1
+
+
+def test_cached_arrays_are_read_only(tmp_path):
+    cache = OrbitCache.OrbitCache(cache_dir=str(tmp_path))
+    value = cache.get_or_compute("track", lambda: np.arange(6.0))
+    with pytest.raises(ValueError):
+        value[0] = 1.0
+
+    disk_value = OrbitCache.OrbitCache(cache_dir=str(tmp_path)).get("track")
+    np.testing.assert_array_equal(disk_value, np.arange(6.0))
+    with pytest.raises(ValueError):
+        disk_value[0] = 1.0
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    calls = []
+
+    def compute():
+        calls.append(None)
+        return np.arange(4.0)
+
+    OrbitCache.OrbitCache(cache_dir=str(tmp_path)).get_or_compute("track", compute)
+    cache = OrbitCache.OrbitCache(cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(cache.get_or_compute("track", compute), np.arange(4.0))
+
+    assert len(calls) == 1
+    assert cache.stats['disk_hits'] == 1
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp.npy")]
+
+
+def test_corrupt_disk_file_is_a_miss(tmp_path):
+    cache = OrbitCache.OrbitCache(cache_dir=str(tmp_path))
+    with open(os.path.join(tmp_path, "broken.npy"), 'wb') as file:
+        file.write(b"not an array")
+    assert cache.get("broken") is None
+    assert cache.stats['misses'] == 1
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    track = np.zeros(1000)
+    cache = OrbitCache.OrbitCache(cache_dir=str(tmp_path))
+    for number, key in enumerate(["a", "b", "c"]):
+        cache.put(key, track)
+        os.utime(os.path.join(tmp_path, key + ".npy"), ns=(number * 10 ** 9, number * 10 ** 9))
+    cache.max_disk_bytes = 3 * os.path.getsize(os.path.join(tmp_path, "a.npy"))  # Room for three tracks
+    OrbitCache.OrbitCache(cache_dir=str(tmp_path)).get("a")  # A disk hit marks a as recently used
+    cache.put("d", track)
+
+    assert sorted(os.listdir(tmp_path)) == ["a.npy", "c.npy", "d.npy"]
+    assert cache.stats['disk_evictions'] == 1
+
+
+def test_default_directory_is_next_to_module():
+    assert OrbitCache.CACHE_DIR == os.path.join(os.path.dirname(os.path.abspath(OrbitCache.__file__)), ".orbit_cache")
@@ -0,0 +1,87 @@
+"""
+Tests for the spatial index over orbit tracks, checked against brute-force distances.
+"""
+import os
+import numpy as np
+import pytest
+import Catalog
+import TrackIndex
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), Catalog.CSV_PATH)
+RESOLUTION = 0.05
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return Catalog.load_catalog(CSV_PATH)
+
+
+@pytest.fixture(scope="module")
+def index(catalog):
+    return TrackIndex.TrackIndex.from_catalog(catalog, resolution=RESOLUTION)
+
+
+def _brute_force(elements, points):
+    # Closest distance of every comet's sampled track to any of the points
+    points = np.atleast_2d(points)
+    return np.array([np.min(np.linalg.norm(TrackIndex.sample_track(*row, RESOLUTION)[:, None] - points, axis=-1))
+                     for row in elements])
+
+
+def _query_points():
+    rng = np.random.default_rng(0)
+    return rng.uniform(-3, 3, (5, 3))
+
+
+@pytest.mark.parametrize("e, q", [(0.0, 1.0), (0.967, 0.586), (1.0, 0.5), (1.8, 2.0)])
+def test_sample_track_spacing_and_shape(e, q):
+    points = TrackIndex.sample_track(e, q, 30.0, 60.0, 90.0, resolution=RESOLUTION, max_distance=20.0)
+    spacing = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    radius = np.linalg.norm(points, axis=1)
+
+    assert spacing.max() <= RESOLUTION
+    assert radius.min() == pytest.approx(q, rel=1e-3)
+    if e < 1:
+        assert radius.max() == pytest.approx(q * (1 + e) / (1 - e), rel=1e-3)  # Closed orbits reach aphelion
+    else:
+        assert radius.max() <= 20.0 * (1 + 1e-9)  # Open ones are cut at max_distance
+
+
+def test_within_matches_brute_force(index, catalog):
+    points = _query_points()
+    expected = _brute_force(TrackIndex._catalog_elements(catalog), points)
+
+    hits = index.within(points, 0.3)
+
+    rows = np.nonzero(expected <= 0.3)[0]
+    assert sorted(hit.index for hit in hits) == sorted(rows)
+    for hit in hits:
+        assert hit.distance == pytest.approx(expected[hit.index], abs=1e-12)
+        assert hit.name == catalog["Object"][hit.index]
+    assert [hit.distance for hit in hits] == sorted(hit.distance for hit in hits)
+
+
+def test_nearest_matches_brute_force(index, catalog):
+    point = np.array([0.2, -1.4, 0.3])
+    expected = _brute_force(TrackIndex._catalog_elements(catalog), point)
+
+    hits = index.nearest(point, k=5)
+
+    np.testing.assert_allclose([hit.distance for hit in hits], np.sort(expected)[:5], atol=1e-12)
+
+
+def test_update_matches_rebuilt_index(catalog, tmp_path):
+    elements = TrackIndex._catalog_elements(catalog)[:20].copy()
+    names = catalog["Object"][:20]
+    index = TrackIndex.TrackIndex(elements, names, resolution=RESOLUTION, compact_fraction=10.0)
+    elements[3] = [0.2, 1.0, 5.0, 10.0, 20.0]
+    index.update(3, elements[3])
+    assert len(index.delta_points)  # Still in the delta set, not merged into the grid
+
+    rebuilt = TrackIndex.TrackIndex(elements, names, resolution=RESOLUTION)
+    point = TrackIndex.sample_track(*elements[3], RESOLUTION)[7]
+    assert index.nearest(point, k=3) == rebuilt.nearest(point, k=3)
+
+    path = str(tmp_path / "tracks.npz")
+    index.save(path)
+    assert TrackIndex.TrackIndex.load(path).within(point, 0.5) == rebuilt.within(point, 0.5)